@@ -0,0 +1,399 @@
+"""
+Cold-history archival of trip and fuel months to Parquet.
+
+archive_history moves every month older than ARCHIVE_AFTER_MONTHS out of the
+database into ARCHIVE_DIR/<table>/<YYYY-MM>.parquet (zstd-compressed,
+columnar). On a partitioned PostgreSQL table the month's partition is
+detached first, then exported and dropped; elsewhere the table is locked
+against writes while the month is exported and deleted. Either way it is one
+transaction, which only commits when the exported and removed row counts
+agree. A trip month is only archived once none of its trips is still draft
+or dispatched. A month that
+gains rows again later (a back-dated import) is archived to an extra
+<YYYY-MM>.<n>.parquet file next to the first.
+
+The rollup tables keep their totals, so the analytics endpoints built on them
+are unaffected. Readers of the raw history (stats rebuild/verify, the
+exports, /analytics/history, driver rescoring, the fuel anomaly backfill and
+the service schedule rebuild) union the live tables with the archive through
+read_archive, which memory-maps the files of the months asked for and pushes
+column and row filters down to the Parquet reader.
+
+Needs pyarrow (in requirements.txt) to write or read archives; without any
+archive files nothing here imports it.
+
+Configuration:
+    ARCHIVE_DIR           directory for the Parquet files (archive, relative to backend/)
+    ARCHIVE_AFTER_MONTHS  months kept in the database, counting the current one (12)
+"""
+import os
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, delete, func, select, text
+from sqlalchemy import column as sql_column, table as sql_table
+from sqlmodel import SQLModel
+
+from app.partitions import (
+    PARTITIONED, add_months, detach_partition, ensure_partitions, is_partitioned, month_range, month_start,
+)
+
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "archive"))
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "12"))
+
+CHUNK_SIZE = 50_000
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("History archives need the 'pyarrow' package (pip install pyarrow)")
+
+    return pyarrow
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime(value.year, value.month, value.day)
+
+
+def _schema(table):
+    pa = _pyarrow()
+
+    def arrow_type(column_type):
+        if isinstance(column_type, Boolean):
+            return pa.bool_()
+        if isinstance(column_type, Integer):
+            return pa.int64()
+        if isinstance(column_type, Float):
+            return pa.float64()
+        if isinstance(column_type, DateTime):
+            return pa.timestamp("us")
+        if isinstance(column_type, Date):
+            return pa.date32()
+        return pa.string()
+
+    return pa.schema([(c.name, arrow_type(c.type)) for c in table.columns])
+
+
+# =========================
+# READING
+# =========================
+def archive_files(table: str, date_from=None, date_to=None) -> list:
+    """Archive files of table whose month overlaps [date_from, date_to), oldest first."""
+    directory = ARCHIVE_DIR / table
+    if not directory.is_dir():
+        return []
+
+    first = month_start(date_from) if date_from else None
+    last = _as_datetime(date_to)
+    files = []
+    for path in sorted(directory.glob("*.parquet")):
+        month = date.fromisoformat(path.name[:7] + "-01")
+        if first and month < first:
+            continue
+        if last and _as_datetime(month) >= last:
+            continue
+        files.append(path)
+
+    return files
+
+
+def read_archive_file(path, table: str, columns=None, date_from=None, date_to=None, filters=()):
+    """
+    One archive file as a pyarrow Table, memory-mapped, with only the given
+    columns and the rows in [date_from, date_to) that match filters
+    (pyarrow (column, op, value) tuples).
+    """
+    pa = _pyarrow()
+    column = PARTITIONED[table]
+
+    conditions = list(filters)
+    if date_from:
+        conditions.append((column, ">=", _as_datetime(date_from)))
+    if date_to:
+        conditions.append((column, "<", _as_datetime(date_to)))
+
+    return pa.parquet.read_table(path, columns=columns, filters=conditions or None, memory_map=True)
+
+
+def read_archive(table: str, columns=None, date_from=None, date_to=None, filters=()):
+    """Every matching archived row of table as one pyarrow Table, or None without archive files."""
+    files = archive_files(table, date_from, date_to)
+    if not files:
+        return None
+
+    return _pyarrow().concat_tables([
+        read_archive_file(path, table, columns, date_from, date_to, filters) for path in files
+    ])
+
+
+def iter_archive(table: str, columns, sort_by, filters=(), chunk_size: int = CHUNK_SIZE):
+    """
+    Archived rows of table as tuples of columns, ordered by the sort_by
+    columns, for merging with a live query sorted the same way. The selected
+    columns are sorted in memory; rows become Python tuples chunk by chunk.
+    """
+    rows = read_archive(table, columns=sorted({*columns, *sort_by}), filters=filters)
+    if rows is None:
+        return
+
+    rows = rows.sort_by([(column, "ascending") for column in sort_by]).select(list(columns))
+    for batch in rows.to_batches(chunk_size):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def archived_last_odometers(service_dates: dict) -> dict:
+    """
+    {vehicle_id: highest end_odometer of its archived completed trips
+    dispatched on or before service_dates[vehicle_id]}, for vehicles that
+    have one.
+    """
+    if not service_dates:
+        return {}
+
+    rows = read_archive(
+        "trip", columns=["vehicle_id", "created_at", "end_odometer"],
+        filters=[("status", "=", "completed"), ("vehicle_id", "in", list(service_dates))],
+    )
+    if rows is None or rows.num_rows == 0:
+        return {}
+
+    pa = _pyarrow()
+    pc = pa.compute
+    limits = pa.table({
+        "vehicle_id": pa.array(list(service_dates), pa.int64()),
+        "service_date": pa.array(list(service_dates.values()), pa.timestamp("us")),
+    })
+    rows = rows.join(limits, "vehicle_id")
+    rows = rows.filter(pc.less_equal(rows["created_at"], rows["service_date"]))
+    grouped = rows.group_by("vehicle_id").aggregate([("end_odometer", "max")])
+
+    return {
+        vehicle_id: km
+        for vehicle_id, km in zip(grouped["vehicle_id"].to_pylist(), grouped["end_odometer_max"].to_pylist())
+        if km is not None
+    }
+
+
+def _key_column(rows, key: str, timestamp_column: str):
+    pa = _pyarrow()
+    pc = pa.compute
+
+    if key == "day":
+        return pc.cast(rows[timestamp_column], pa.date32())
+    if key == "month":
+        return pc.cast(pc.floor_temporal(rows[timestamp_column], unit="month"), pa.date32())
+    return rows[key]
+
+
+def _group_sums(rows, keys, timestamp_column: str, sums: dict) -> list:
+    """Rows of (*keys, *sums) with sums = {name: column} summed per group and count last."""
+    pa = _pyarrow()
+    if rows is None or rows.num_rows == 0:
+        return []
+
+    grouped = pa.table({
+        **{key: _key_column(rows, key, timestamp_column) for key in keys},
+        **sums,
+    }).group_by(list(keys)).aggregate([(name, "sum") for name in sums] + [(keys[0], "count")])
+
+    columns = [grouped[key].to_pylist() for key in keys]
+    columns += [grouped[f"{name}_sum"].to_pylist() for name in sums]
+    columns.append(grouped[f"{keys[0]}_count"].to_pylist())
+    return list(zip(*columns))
+
+
+def archived_trip_totals(*keys, date_from=None, date_to=None, vehicle_ids=None) -> list:
+    """
+    Completed archived trips grouped by keys (column names, or "day"/"month"
+    of created_at), as rows of (*keys, km, revenue, count, overspeed,
+    harsh_brake, accidents), summed like app.stats.completed_trip_totals.
+    """
+    filters = [("status", "=", "completed")]
+    if vehicle_ids is not None:
+        filters.append(("vehicle_id", "in", list(vehicle_ids)))
+
+    rows = read_archive(
+        "trip",
+        columns=sorted({"created_at", "start_odometer", "end_odometer", "revenue", "overspeed_count",
+                        "harsh_brake_count", "accident_reported", *(k for k in keys if k not in ("day", "month"))}),
+        date_from=date_from, date_to=date_to, filters=filters,
+    )
+    if rows is None or rows.num_rows == 0:
+        return []
+
+    pa = _pyarrow()
+    pc = pa.compute
+    start, end = rows["start_odometer"], rows["end_odometer"]
+    counted = pc.and_(pc.is_valid(end), pc.and_(pc.not_equal(end, 0), pc.not_equal(start, 0)))
+
+    grouped = _group_sums(rows, keys, "created_at", {
+        "km": pc.if_else(counted, pc.subtract(end, start), pa.scalar(None, pa.float64())),
+        "revenue": rows["revenue"],
+        "overspeed": rows["overspeed_count"],
+        "harsh_brake": rows["harsh_brake_count"],
+        "accidents": pc.cast(rows["accident_reported"], pa.int64()),
+    })
+
+    n = len(keys)
+    return [
+        (*row[:n], row[n], row[n + 1], row[-1], row[n + 2], row[n + 3], row[n + 4])
+        for row in grouped
+    ]
+
+
+def archived_fuel_totals(*keys, date_from=None, date_to=None, vehicle_ids=None) -> list:
+    """Archived fuel logs grouped by keys, as rows of (*keys, liters, cost)."""
+    filters = []
+    if vehicle_ids is not None:
+        filters.append(("vehicle_id", "in", list(vehicle_ids)))
+
+    rows = read_archive(
+        "fuel",
+        columns=sorted({"fuel_date", "liters", "cost", *(k for k in keys if k not in ("day", "month"))}),
+        date_from=date_from, date_to=date_to, filters=filters,
+    )
+    if rows is None:
+        return []
+
+    grouped = _group_sums(rows, keys, "fuel_date", {"liters": rows["liters"], "cost": rows["cost"]})
+    return [row[:-1] for row in grouped]
+
+
+# =========================
+# ARCHIVING
+# =========================
+def archive_cutoff(now=None) -> date:
+    """First month kept in the database; everything before it is archived."""
+    return add_months(month_start(now or datetime.utcnow()), 1 - ARCHIVE_AFTER_MONTHS)
+
+
+def _archive_path(table: str, month: date) -> Path:
+    directory = ARCHIVE_DIR / table
+    directory.mkdir(parents=True, exist_ok=True)
+
+    path = directory / f"{month:%Y-%m}.parquet"
+    n = 1
+    while path.exists():
+        path = directory / f"{month:%Y-%m}.{n}.parquet"
+        n += 1
+    return path
+
+
+def _lock_month(conn, table: str, month: date):
+    """
+    Keep the month from changing until the transaction ends; returns the
+    table to read it from.
+    """
+    model_table = SQLModel.metadata.tables[table]
+
+    if conn.dialect.name == "postgresql":
+        name = is_partitioned(conn, table) and detach_partition(conn, table, month)
+        if name:
+            return sql_table(name, *(sql_column(c.name, c.type) for c in model_table.columns))
+        # No partition of its own: hold off writers to the whole table instead.
+        conn.execute(text(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE"))
+    elif conn.dialect.name == "sqlite":
+        # Take the write lock up front rather than at the DELETE.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return model_table
+
+
+def archive_month(engine, table: str, month: date) -> dict:
+    """
+    Move table's rows for month to a Parquet file, in one transaction that
+    first detaches the month's partition (or locks the table), so nothing
+    written meanwhile is lost. Returns {"table", "month", "rows", "path"};
+    "skipped" explains a month that was left in place.
+    """
+    pa = _pyarrow()
+    column = PARTITIONED[table]
+    result = {"table": table, "month": f"{month:%Y-%m}", "rows": 0, "path": None}
+
+    path = _archive_path(table, month)
+    tmp = path.with_suffix(".tmp")
+    moved = False
+
+    try:
+        with engine.connect() as conn, conn.begin() as transaction:
+            source = _lock_month(conn, table, month)
+            low, high = _as_datetime(month), _as_datetime(add_months(month, 1))
+            in_month = (source.c[column] >= low) & (source.c[column] < high)
+
+            if table == "trip":
+                open_trips = conn.execute(
+                    select(func.count()).select_from(source)
+                    .where(in_month, source.c.status.in_(("draft", "dispatched")))
+                ).scalar()
+                if open_trips:
+                    transaction.rollback()
+                    return {**result, "skipped": f"{open_trips} trips still open"}
+
+            schema = _schema(SQLModel.metadata.tables[table])
+            rows = conn.execute(
+                select(source).where(in_month).order_by(source.c.id)
+                .execution_options(stream_results=True, yield_per=CHUNK_SIZE)
+            )
+            writer = None
+            try:
+                for chunk in rows.partitions(CHUNK_SIZE):
+                    if writer is None:
+                        writer = pa.parquet.ParquetWriter(tmp, schema, compression="zstd")
+                    writer.write_batch(pa.RecordBatch.from_pylist([dict(r._mapping) for r in chunk], schema))
+                    result["rows"] += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            if source.name != table:
+                removed = conn.execute(select(func.count()).select_from(source)).scalar()
+                conn.execute(text(f"DROP TABLE {source.name}"))
+            else:
+                removed = conn.execute(delete(source).where(in_month)).rowcount
+
+            if removed != result["rows"]:
+                raise RuntimeError(
+                    f"{table} {month:%Y-%m}: exported {result['rows']} rows but would remove {removed}"
+                )
+
+            # The file only takes its final name inside the transaction that
+            # removes the rows, so a failure on either side leaves the month
+            # in one place.
+            if result["rows"]:
+                os.replace(tmp, path)
+                moved = True
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        if moved:
+            path.unlink(missing_ok=True)
+        raise
+
+    return {**result, "path": str(path) if moved else None}
+
+
+def archive_history(engine, tables=tuple(PARTITIONED), before: date = None) -> list:
+    """Archive every month of tables older than before (default archive_cutoff())."""
+    before = month_start(before) if before else archive_cutoff()
+    results = []
+
+    for table in tables:
+        column = SQLModel.metadata.tables[table].c[PARTITIONED[table]]
+        with engine.connect() as conn:
+            oldest = conn.execute(select(func.min(column)).where(column < _as_datetime(before))).scalar()
+        if oldest is None:
+            continue
+
+        # Give every month its own partition first, so each one is dropped
+        # rather than deleted row by row.
+        ensure_partitions(engine, oldest, add_months(before, -1))
+
+        for month in month_range(oldest, add_months(before, -1)):
+            results.append(archive_month(engine, table, month))
+
+    return results
@@ -0,0 +1,202 @@
+"""
+In-memory index of vehicle and driver availability.
+
+Holds every vehicle and driver row, grouped by status (vehicles also by
+region and vehicle type), plus a capacity-sorted list of the available
+vehicles of each region/type. It is loaded at startup and kept current from
+the status events the write routes publish (app.events), so /vehicles/available,
+/drivers/available, /dispatch/plan and the trip dispatch pre-checks are
+answered without a query.
+
+The index only ever short-cuts reads. Dispatching still claims the vehicle
+and driver with a conditional UPDATE, and a vehicle or driver the index does
+not show as available is re-read from the database before a request is
+rejected. Changes made outside this worker (other uvicorn workers, manage.py,
+direct SQL) are picked up by a full reload every
+AVAILABILITY_RECONCILE_INTERVAL seconds (60).
+"""
+import asyncio
+import logging
+import os
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlmodel import select
+
+from app.db import async_session_factory
+from app.events import event_broker
+from app.models.driver import Driver
+from app.models.vehicle import Vehicle
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL = float(os.getenv("AVAILABILITY_RECONCILE_INTERVAL", "60"))
+
+
+class AvailabilityIndex:
+    def __init__(self, reconcile_interval: float = RECONCILE_INTERVAL):
+        self.reconcile_interval = reconcile_interval
+        self.warm = False
+        self.reconciles = 0
+        self.corrections = 0
+
+        self._clear()
+        self._task = None
+        self._pending = None  # events seen while a reload is reading
+
+    def _clear(self):
+        self._vehicles = {}
+        self._drivers = {}
+        self._vehicle_ids = defaultdict(lambda: defaultdict(set))  # status -> (region, type) -> ids
+        self._driver_ids = defaultdict(set)  # status -> ids
+        self._capacity = defaultdict(list)  # (region, type) -> sorted [(max_capacity, id)], available only
+
+    # ---------------------------
+    # MAINTENANCE
+    # ---------------------------
+    def _remove_vehicle(self, vehicle_id: int):
+        row = self._vehicles.pop(vehicle_id, None)
+        if row is None:
+            return
+        key = row["region"], row["vehicle_type"]
+        self._vehicle_ids[row["status"]][key].discard(vehicle_id)
+        if row["status"] == "available":
+            pool = self._capacity[key]
+            i = bisect_left(pool, (row["max_capacity"], vehicle_id))
+            if i < len(pool) and pool[i][1] == vehicle_id:
+                del pool[i]
+
+    def _put_vehicle(self, row: dict):
+        self._remove_vehicle(row["id"])
+        self._vehicles[row["id"]] = row
+        key = row["region"], row["vehicle_type"]
+        self._vehicle_ids[row["status"]][key].add(row["id"])
+        if row["status"] == "available":
+            insort(self._capacity[key], (row["max_capacity"], row["id"]))
+
+    def _put_driver(self, row: dict):
+        previous = self._drivers.get(row["id"])
+        if previous is not None:
+            self._driver_ids[previous["status"]].discard(row["id"])
+        self._drivers[row["id"]] = row
+        self._driver_ids[row["status"]].add(row["id"])
+
+    def apply(self, events):
+        """Event listener: take the vehicle and driver rows carried by status events."""
+        if self._pending is not None:
+            self._pending.extend(events)
+
+        for event_type, data in events:
+            if event_type == "vehicle.status":
+                self._put_vehicle({k: v for k, v in data.items() if k != "previous"})
+            elif event_type == "driver.status":
+                self._put_driver({k: v for k, v in data.items() if k != "previous"})
+
+    async def reconcile(self):
+        """Reload everything from the database; returns the number of rows that had drifted."""
+        self._pending = []
+        try:
+            async with async_session_factory() as session:
+                vehicles = (await session.exec(select(Vehicle))).all()
+                drivers = (await session.exec(select(Driver))).all()
+            events = self._pending
+        finally:
+            self._pending = None
+
+        before = self._vehicles, self._drivers
+        self._clear()
+        for vehicle in vehicles:
+            self._put_vehicle(vehicle.model_dump())
+        for driver in drivers:
+            self._put_driver(driver.model_dump())
+
+        # Transitions published while the rows were being read may be newer
+        # than what the read saw.
+        self.apply(events)
+
+        corrections = 0
+        if self.warm:
+            corrections = sum(
+                1 for old, new in ((before[0], self._vehicles), (before[1], self._drivers))
+                for row_id in old.keys() | new.keys()
+                if (old.get(row_id) or {}).get("status") != (new.get(row_id) or {}).get("status")
+            )
+            self.corrections += corrections
+
+        self.warm = True
+        self.reconciles += 1
+        return corrections
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("Availability reconcile failed")
+
+    async def start(self):
+        await self.reconcile()
+        if self._task is None and self.reconcile_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---------------------------
+    # LOOKUPS
+    # ---------------------------
+    def available_vehicle(self, vehicle_id: int) -> Optional[Vehicle]:
+        row = self._vehicles.get(vehicle_id)
+        return Vehicle(**row) if row and row["status"] == "available" else None
+
+    def available_driver(self, driver_id: int) -> Optional[Driver]:
+        row = self._drivers.get(driver_id)
+        return Driver(**row) if row and row["status"] == "available" else None
+
+    def available_vehicles_by_id(self, vehicle_ids: Iterable[int]) -> dict:
+        return {i: v for i in vehicle_ids if (v := self.available_vehicle(i)) is not None}
+
+    def available_drivers_by_id(self, driver_ids: Iterable[int]) -> dict:
+        return {i: d for i in driver_ids if (d := self.available_driver(i)) is not None}
+
+    def available_vehicles(self, region: Optional[str] = None, vehicle_type: Optional[str] = None,
+                           min_capacity: Optional[float] = None) -> list:
+        """Available vehicle rows, in id order (capacity order when min_capacity is given)."""
+        keys = [
+            key for key in self._capacity
+            if (region is None or key[0] == region) and (vehicle_type is None or key[1] == vehicle_type)
+        ]
+
+        if min_capacity is None:
+            ids = sorted(i for key in keys for i in self._vehicle_ids["available"][key])
+            return [self._vehicles[i] for i in ids]
+
+        fitting = []
+        for key in keys:
+            pool = self._capacity[key]
+            fitting.extend(pool[bisect_left(pool, (min_capacity, -1)):])
+        return [self._vehicles[i] for _, i in sorted(fitting)]
+
+    def available_drivers(self) -> list:
+        return [self._drivers[i] for i in sorted(self._driver_ids["available"])]
+
+    def stats(self) -> dict:
+        return {
+            "warm": self.warm,
+            "vehicles": {s: sum(map(len, by_key.values())) for s, by_key in self._vehicle_ids.items()},
+            "drivers": {s: len(ids) for s, ids in self._driver_ids.items()},
+            "reconciles": self.reconciles,
+            "corrections": self.corrections,
+        }
+
+
+availability = AvailabilityIndex()
+event_broker.add_listener(availability.apply)
@@ -0,0 +1,169 @@
+"""
+Database bootstrap for worker startup and manage.py.
+
+Every uvicorn worker calls prepare_database() at startup. It compares the
+stored SchemaVersion with a fingerprint of the tables, columns and indexes
+declared on the models and returns at once when they match, so restarting N
+workers costs N one-row SELECTs instead of N create_all passes. When they
+differ, one worker takes a PostgreSQL advisory lock, creates what is missing
+(app.partitions.create_schema) and stores the new version; the others wait
+on the lock and then find the version current. create_schema skips tables
+that already exist, so indexes added to their models later are built by
+app.migrations.create_missing_indexes before the version is stored. Other dialects run without
+the lock.
+
+Demo users are not created at startup; run `python manage.py users demo`.
+
+Configuration:
+    SCHEMA_ON_STARTUP  auto: bring the schema up to date when the version
+                       differs (default); skip: never touch it, run
+                       `python manage.py db migrate` when deploying
+"""
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import SQLModel, Session, select
+
+# Every table, so the fingerprint and create_schema see the whole schema
+from app.models.vehicle import Vehicle  # noqa: F401
+from app.models.driver import Driver  # noqa: F401
+from app.models.trip import Trip  # noqa: F401
+from app.models.maintenance import Maintenance  # noqa: F401
+from app.models.fuel import Fuel  # noqa: F401
+from app.models.user import User
+from app.models.vehicle_stats import VehicleStats  # noqa: F401
+from app.models.driver_stats import DriverStats  # noqa: F401
+from app.models.vehicle_daily import VehicleDaily  # noqa: F401
+from app.models.trip_event import TripEvent  # noqa: F401
+from app.models.fuel_baseline import FuelBaseline  # noqa: F401
+from app.models.fuel_anomaly import FuelAnomaly  # noqa: F401
+from app.models.service_schedule import ServiceSchedule  # noqa: F401
+from app.models.schema_version import SchemaVersion
+from app.migrations import create_missing_indexes
+from app.partitions import create_schema, ensure_partitions
+from app.security import hash_password_sync
+
+SCHEMA_ON_STARTUP = os.getenv("SCHEMA_ON_STARTUP", "auto")
+
+# pg_advisory_lock key shared by every worker and manage.py
+LOCK_KEY = int.from_bytes(hashlib.sha256(b"fleetflow:schema").digest()[:8], "big", signed=True)
+
+DEMO_USERS = [
+    ("admin@fleetflow.com", "admin123", "manager"),
+    ("dispatch@fleetflow.com", "user123", "dispatcher"),
+]
+
+
+def schema_fingerprint() -> str:
+    """Hash of every table's columns, keys, indexes and dialect options."""
+    parts = []
+    for table in SQLModel.metadata.sorted_tables:
+        parts.append(f"table {table.name} {sorted(table.dialect_kwargs.items())}")
+        for column in table.columns:
+            foreign_keys = sorted(fk.target_fullname for fk in column.foreign_keys)
+            parts.append(
+                f"  {column.name} {column.type} null={column.nullable} pk={column.primary_key} "
+                f"unique={column.unique} fk={foreign_keys}"
+            )
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            parts.append(f"  index {index.name} {[c.name for c in index.columns]} unique={index.unique}")
+
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def stored_version(engine):
+    """The recorded schema version, or None when there is none yet."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(SchemaVersion.version).where(SchemaVersion.id == 1)).scalar()
+    except SQLAlchemyError:
+        # No schemaversion table: a new database, or one from before it existed.
+        return None
+
+
+@contextmanager
+def schema_lock(engine, wait: bool = True):
+    """
+    Hold the schema advisory lock for the block and yield True, or yield
+    False at once when wait is False and another process holds it.
+    Without PostgreSQL there is no lock and this always yields True.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if wait:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+        elif not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOCK_KEY}).scalar():
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+
+
+def migrate(engine, version: str = None) -> list:
+    """
+    Create missing tables, partitions and indexes and record version; call
+    under schema_lock. Returns the names of the indexes it built.
+    """
+    create_schema(engine)
+    created = create_missing_indexes(engine)
+
+    with Session(engine) as session:
+        session.merge(SchemaVersion(id=1, version=version or schema_fingerprint(), applied_at=datetime.utcnow()))
+        session.commit()
+
+    return created
+
+
+def prepare_database(engine, mode: str = None) -> str:
+    """
+    Make sure the schema matches the models before a worker serves requests.
+    Returns "current", "migrated" or "skipped".
+    """
+    if (mode or SCHEMA_ON_STARTUP) == "skip":
+        return "skipped"
+
+    version = schema_fingerprint()
+    if stored_version(engine) == version:
+        # New months still need their partitions; one worker is enough, and
+        # the rest need not wait for it.
+        with schema_lock(engine, wait=False) as locked:
+            if locked:
+                ensure_partitions(engine)
+        return "current"
+
+    with schema_lock(engine):
+        # Another worker may have finished while this one waited.
+        if stored_version(engine) == version:
+            return "current"
+        migrate(engine, version)
+
+    return "migrated"
+
+
+def seed_demo_users(engine) -> int:
+    """Create the demo logins used by the frontend and benchmarks; returns how many were added."""
+    added = 0
+    with Session(engine) as session:
+        existing = set(session.exec(
+            select(User.email).where(User.email.in_([email for email, _, _ in DEMO_USERS]))
+        ).all())
+
+        for email, password, role in DEMO_USERS:
+            if email in existing:
+                continue
+            session.add(User(email=email, password_hash=hash_password_sync(password), role=role))
+            added += 1
+
+        session.commit()
+
+    return added
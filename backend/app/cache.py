@@ -0,0 +1,165 @@
+"""
+Response cache for the analytics endpoints.
+
+Entries are keyed by endpoint, filters and the current generation of every
+table the endpoint reads. Write paths call invalidate() with the tables they
+changed, which bumps those generations, so later reads miss and recompute
+while the old entries age out of the LRU or hit their TTL. A result computed
+while a write commits is stored under the old generation and never served.
+A result read from a lagging replica may predate the write that bumped the
+generation, so callers cap its TTL with max_ttl (see app.db.ReplicaRouter).
+
+The default backend is an in-process LRU, so each uvicorn worker has its own
+entries and only sees its own invalidations (other workers catch up within
+ANALYTICS_CACHE_TTL). Point ANALYTICS_CACHE_URL at Redis to share entries and
+generations between workers, or pass another CacheBackend subclass to
+configure(); one that misses a method fails when it is built.
+
+Configuration:
+    ANALYTICS_CACHE_TTL   seconds an entry lives, 0 disables caching (30)
+    ANALYTICS_CACHE_SIZE  entries kept by the in-process backend (1024)
+    ANALYTICS_CACHE_URL   redis://host:port/db for the shared backend
+"""
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+
+KEY_PREFIX = "fleetflow:analytics"
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str):
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value, ttl: float):
+        ...
+
+    @abstractmethod
+    async def generations(self, tables) -> list:
+        ...
+
+    @abstractmethod
+    async def bump(self, tables):
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = defaultdict(int)
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def generations(self, tables):
+        return [self._generations[t] for t in tables]
+
+    async def bump(self, tables):
+        for t in tables:
+            self._generations[t] += 1
+
+
+class RedisBackend(CacheBackend):
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("ANALYTICS_CACHE_URL needs the 'redis' package (pip install redis)")
+
+        self._client = redis.from_url(url)
+
+    async def get(self, key):
+        value = await self._client.get(key)
+        return None if value is None else json.loads(value)
+
+    async def set(self, key, value, ttl):
+        await self._client.set(key, json.dumps(value), px=int(ttl * 1000))
+
+    async def generations(self, tables):
+        values = await self._client.mget([f"{KEY_PREFIX}:gen:{t}" for t in tables])
+        return [int(v or 0) for v in values]
+
+    async def bump(self, tables):
+        async with self._client.pipeline(transaction=False) as pipe:
+            for t in tables:
+                pipe.incr(f"{KEY_PREFIX}:gen:{t}")
+            await pipe.execute()
+
+
+class AnalyticsCache:
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def configure(self, backend: CacheBackend = None, ttl: float = None):
+        if backend is not None:
+            self.backend = backend
+        if ttl is not None:
+            self.ttl = ttl
+
+    async def get_or_compute(self, endpoint: str, params: dict, tables, compute, max_ttl: float = None):
+        """
+        Return the cached result for endpoint+params, or await compute() and
+        store it for at most max_ttl seconds (not at all when it is 0).
+        """
+        if self.ttl <= 0:
+            return await compute()
+
+        generations = await self.backend.generations(tables)
+        filters = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+        key = f"{KEY_PREFIX}:{endpoint}:{filters}:{'.'.join(map(str, generations))}"
+
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits[endpoint] += 1
+            return value
+
+        self.misses[endpoint] += 1
+        value = await compute()
+        ttl = self.ttl if max_ttl is None else min(self.ttl, max_ttl)
+        if ttl > 0:
+            await self.backend.set(key, value, ttl)
+        return value
+
+    async def invalidate(self, *tables):
+        if self.ttl > 0:
+            await self.backend.bump(tables)
+
+    def counters(self) -> dict:
+        return {
+            endpoint: {"hits": self.hits[endpoint], "misses": self.misses[endpoint]}
+            for endpoint in sorted(self.hits.keys() | self.misses.keys())
+        }
+
+
+def _backend_from_env() -> CacheBackend:
+    url = os.getenv("ANALYTICS_CACHE_URL")
+    if url:
+        return RedisBackend(url)
+    return MemoryBackend(int(os.getenv("ANALYTICS_CACHE_SIZE", "1024")))
+
+
+analytics_cache = AnalyticsCache(_backend_from_env(), float(os.getenv("ANALYTICS_CACHE_TTL", "30")))
@@ -1,13 +1,28 @@
 from fastapi import Request, HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from app.security import request_token, verify_token
 
-def require_login(request: Request):
-    if not request.session.get("user_id"):
+def current_user(request: Request):
+    """Claims of the request's access token ({"user_id", "role", ...}) or None; no DB access."""
+    return verify_token(request_token(request.headers, request.cookies))
+
+async def require_login(request: Request):
+    if not current_user(request):
         raise HTTPException(status_code=401, detail="Login required")
 
-def require_manager(request: Request):
-    if request.session.get("role") != "manager":
+async def require_manager(request: Request):
+    if (current_user(request) or {}).get("role") != "manager":
         raise HTTPException(status_code=403, detail="Manager access required")
 
-def require_dispatcher_or_manager(request: Request):
-    if request.session.get("role") not in ["manager", "dispatcher"]:
-        raise HTTPException(status_code=403, detail="Unauthorized")
\ No newline at end of file
+async def require_dispatcher_or_manager(request: Request):
+    if (current_user(request) or {}).get("role") not in ["manager", "dispatcher"]:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+def validated(obj):
+    # Table models are built from the request body without validation, so
+    # dates arrive as strings; asyncpg only accepts real date/datetime values.
+    try:
+        return type(obj).model_validate(obj, from_attributes=True)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
@@ -0,0 +1,117 @@
+"""
+Batch vehicle/driver matching for POST /dispatch/plan.
+
+Loads are matched best-fit decreasing: the heaviest load is served first and
+gets the smallest available vehicle of its region (and vehicle type, if
+given) that can carry it. Because a vehicle that fits a load also fits every
+lighter one, for loads drawing on the same pool this order never strands a
+lighter load that could have been carried, and it keeps the total wasted
+capacity (capacity - cargo over all assignments) minimal. Each pool is a
+capacity-sorted list searched with bisect, so a load costs O(log V) plus the
+removal of the vehicle it takes.
+
+Drivers are not tied to a region. Those whose license expires before the
+trip date are left out; the rest sit in a heap ordered by risk level and then
+safety score, so the heaviest loads get the lowest-risk drivers.
+
+The planner only reads: the result can be posted to /trips/bulk, which
+re-checks and claims every vehicle and driver.
+"""
+import heapq
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+RISK_RANK = {"Low": 0, "Medium": 1, "High": 2}
+
+
+class VehiclePool:
+    """Available vehicles per (region, vehicle_type), sorted by capacity."""
+
+    def __init__(self, vehicles: Iterable[Tuple[int, float, str, str]]):
+        # (id, max_capacity, region, vehicle_type)
+        pools = defaultdict(list)
+        for vehicle_id, capacity, region, vehicle_type in vehicles:
+            pools[region, vehicle_type].append((capacity, vehicle_id))
+        self._pools = {key: sorted(rows) for key, rows in pools.items()}
+
+        self._types = defaultdict(list)
+        for region, vehicle_type in self._pools:
+            self._types[region].append(vehicle_type)
+
+    def take(self, cargo_weight: float, region: str, vehicle_type: Optional[str] = None):
+        """Remove and return the smallest (capacity, id) that carries `cargo_weight`, or None."""
+        types = [vehicle_type] if vehicle_type else self._types.get(region, ())
+
+        best = None
+        for key in ((region, t) for t in types):
+            pool = self._pools.get(key)
+            if not pool:
+                continue
+            i = bisect_left(pool, (cargo_weight, -1))
+            if i < len(pool) and (best is None or pool[i] < best[0]):
+                best = pool[i], key, i
+
+        if best is None:
+            return None
+        vehicle, key, i = best
+        del self._pools[key][i]
+        return vehicle
+
+
+def driver_heap(drivers: Iterable[Tuple[int, Optional[float], str, date]], trip_date: date) -> list:
+    # (id, safety_score, risk_level, license_expiry)
+    heap = [
+        (RISK_RANK.get(risk_level, len(RISK_RANK)), -(safety_score or 0), driver_id)
+        for driver_id, safety_score, risk_level, license_expiry in drivers
+        if license_expiry >= trip_date
+    ]
+    heapq.heapify(heap)
+    return heap
+
+
+def plan_assignments(loads: List[Tuple[float, str, Optional[str]]], vehicles, drivers,
+                     trip_date: date) -> dict:
+    """
+    Match loads ((cargo_weight, region, vehicle_type or None), ...) to
+    available vehicles and drivers. Returns assignments and the loads left
+    unassigned, both by index into `loads`.
+    """
+    pool = VehiclePool(vehicles)
+    heap = driver_heap(drivers, trip_date)
+
+    assignments = []
+    unassigned = []
+    order = sorted(range(len(loads)), key=lambda i: loads[i][0], reverse=True)
+
+    for index in order:
+        cargo_weight, region, vehicle_type = loads[index]
+
+        if not heap:
+            unassigned.append({"index": index, "reason": "No available driver"})
+            continue
+
+        vehicle = pool.take(cargo_weight, region, vehicle_type)
+        if vehicle is None:
+            unassigned.append({"index": index, "reason": "No available vehicle in region with enough capacity"})
+            continue
+
+        capacity, vehicle_id = vehicle
+        _, _, driver_id = heapq.heappop(heap)
+        assignments.append({
+            "index": index,
+            "vehicle_id": vehicle_id,
+            "driver_id": driver_id,
+            "cargo_weight": cargo_weight,
+            "max_capacity": capacity,
+            "wasted_capacity": capacity - cargo_weight,
+        })
+
+    assignments.sort(key=lambda a: a["index"])
+    unassigned.sort(key=lambda u: u["index"])
+    return {
+        "assignments": assignments,
+        "unassigned": unassigned,
+        "wasted_capacity": sum(a["wasted_capacity"] for a in assignments),
+    }
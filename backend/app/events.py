@@ -0,0 +1,227 @@
+"""
+In-process fan-out of change events to GET /events/stream subscribers.
+
+Write routes describe what they changed in a ChangeSet (trip dispatched,
+completed or cancelled, vehicle and driver status transitions, vehicle
+services) and publish it after their commit. The ChangeSet also folds the
+vehicle transitions into per-region KPI deltas matching the
+/analytics/dashboard counters, so a dashboard can be kept current without
+re-reading it.
+
+In-process listeners (the availability index, the maintenance schedule) get
+the events before they are serialised. Every event is serialised once into
+its SSE text and put on each subscriber's bounded queue. A subscriber that
+falls QUEUE_SIZE events behind is dropped with a `resync` event instead of
+slowing the writers down. The last HISTORY_SIZE events are kept so a
+reconnecting EventSource (which sends Last-Event-ID) gets what it missed; if
+that is no longer available it is told to resync, i.e. reload its lists once.
+
+Like the analytics cache, the broker lives in the worker process: with
+several uvicorn workers a subscriber only sees writes handled by its own
+worker.
+
+Configuration:
+    EVENTS_QUEUE_SIZE    events buffered per subscriber (1000)
+    EVENTS_HISTORY_SIZE  events kept for Last-Event-ID replay (5000)
+    EVENTS_HEARTBEAT     seconds between keep-alive comments (15)
+"""
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict, deque
+from datetime import date, datetime
+
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+HISTORY_SIZE = int(os.getenv("EVENTS_HISTORY_SIZE", "5000"))
+HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+# The empty id stops the browser from sending a stale Last-Event-ID when it reconnects.
+RESYNC = "id\nevent: resync\ndata: {}\n\n"
+
+# Vehicle status -> /analytics/dashboard counter it is part of.
+KPI_BY_STATUS = {"on_trip": "active_vehicles", "in_shop": "in_shop", "available": "available_vehicles"}
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def trip_fields(trip) -> dict:
+    return {
+        "id": trip.id,
+        "vehicle_id": trip.vehicle_id,
+        "driver_id": trip.driver_id,
+        "cargo_weight": trip.cargo_weight,
+        "origin": trip.origin,
+        "destination": trip.destination,
+        "created_at": trip.created_at,
+    }
+
+
+class ChangeSet:
+    """Events produced by one write, in the order they happened."""
+
+    def __init__(self):
+        self._events = []
+        self._kpi = defaultdict(lambda: defaultdict(int))
+
+    def trip(self, action: str, trip, **extra):
+        self._events.append((f"trip.{action}", {**trip_fields(trip), **extra}))
+
+    def vehicle(self, vehicle, previous, status: str):
+        """A vehicle moved from `previous` (None when it was just created) to `status`."""
+        if previous == status:
+            return
+        # The whole row, so listeners such as the availability index can keep a copy.
+        self._events.append(("vehicle.status", {**vehicle.model_dump(), "previous": previous, "status": status}))
+
+        kpi = self._kpi[vehicle.region]
+        if previous is None:
+            kpi["total_vehicles"] += 1
+        if previous in KPI_BY_STATUS:
+            kpi[KPI_BY_STATUS[previous]] -= 1
+        if status in KPI_BY_STATUS:
+            kpi[KPI_BY_STATUS[status]] += 1
+
+    def driver(self, driver, previous, status: str):
+        if previous == status:
+            return
+        self._events.append(("driver.status", {**driver.model_dump(), "previous": previous, "status": status}))
+
+    def serviced(self, vehicle, service_date):
+        """A vehicle's service interval restarted (maintenance logged, or the vehicle registered)."""
+        self._events.append(("vehicle.serviced", {
+            "vehicle_id": vehicle.id, "service_date": service_date, "odometer": vehicle.odometer,
+        }))
+
+    def pending_trips(self, region: str, delta: int):
+        self._kpi[region]["pending_trips"] += delta
+
+    def events(self) -> list:
+        kpi = [
+            ("kpi", {"region": region, "deltas": {k: v for k, v in deltas.items() if v}})
+            for region, deltas in self._kpi.items()
+            if any(deltas.values())
+        ]
+        return self._events + kpi
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = QUEUE_SIZE, history_size: int = HISTORY_SIZE,
+                 heartbeat: float = HEARTBEAT):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+
+        # Event ids are "<epoch>-<seq>" so ids from before a restart never
+        # match this process's sequence.
+        self._epoch = f"{int(time.time() * 1000):x}"
+        self._seq = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._listeners = []
+
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def add_listener(self, listener):
+        """Call `listener(events)` with the (type, data) list of every publish, in-process."""
+        self._listeners.append(listener)
+
+    def publish(self, changes: ChangeSet):
+        events = changes.events()
+        if not events:
+            return
+
+        for listener in self._listeners:
+            listener(events)
+
+        texts = []
+        for event_type, data in events:
+            self._seq += 1
+            text = (
+                f"id: {self._epoch}-{self._seq}\nevent: {event_type}\n"
+                f"data: {json.dumps(data, default=_json_default)}\n\n"
+            )
+            self._history.append((self._seq, text))
+            texts.append(text)
+        self.published += len(texts)
+
+        for queue in list(self._subscribers):
+            try:
+                for text in texts:
+                    queue.put_nowait(text)
+            except asyncio.QueueFull:
+                self._drop(queue)
+
+    def _drop(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        self.dropped_subscribers += 1
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def _replay(self, last_event_id: str):
+        """Events after `last_event_id`, or None when some of them are gone."""
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+
+        seq = int(seq)
+        if seq >= self._seq:
+            return []
+        if not self._history or self._history[0][0] > seq + 1:
+            return None
+        return [text for event_seq, text in self._history if event_seq > seq]
+
+    async def stream(self, last_event_id: str = None):
+        """SSE text for one subscriber; ends after a resync."""
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        backlog = self._replay(last_event_id) if last_event_id else []
+
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is None:
+                yield RESYNC
+                return
+            if backlog:
+                yield "".join(backlog)
+
+            while True:
+                try:
+                    text = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if text is None:
+                    yield RESYNC
+                    return
+
+                # Send whatever else is already queued in the same write.
+                texts = [text]
+                while not queue.empty():
+                    text = queue.get_nowait()
+                    if text is None:
+                        break
+                    texts.append(text)
+                yield "".join(texts)
+                if text is None:
+                    yield RESYNC
+                    return
+        finally:
+            self._subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped_subscribers,
+            "last_event_id": f"{self._epoch}-{self._seq}",
+        }
+
+
+event_broker = EventBroker()
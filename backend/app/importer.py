@@ -0,0 +1,260 @@
+"""
+Bulk loader for historical fuel and maintenance logs.
+
+Input is CSV (with a header row) or NDJSON. Rows are parsed and checked in
+chunks: the vehicle (and trip) ids referenced by a chunk are looked up with a
+single query, bad rows are set aside with their line number, and the good ones
+are written with COPY on PostgreSQL (psycopg2) or an executemany INSERT
+elsewhere. Each chunk commits together with its VehicleStats and VehicleDaily
+increments, so the rollups stay in step with the raw tables.
+
+Historical records do not touch vehicle status: unlike POST /maintenance/,
+importing a workshop record does not move the vehicle to in_shop.
+
+Imported rows are usually back-dated, so they are not fed one by one through
+the live fuel anomaly detector or the service schedule. Once every chunk is
+in, the state derived from that history is rebuilt for the vehicles the
+import touched: their fuel baselines and anomalies (backfill_fuel_anomalies)
+or their last service (rebuild_service_schedule).
+"""
+import csv
+import io
+import json
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from app.db import naive_utc
+from app.models.vehicle import Vehicle
+from app.models.trip import Trip
+from app.models.fuel import Fuel
+from app.models.maintenance import Maintenance
+from app.models.vehicle_stats import VehicleStats
+from app.fuel_anomalies import backfill_fuel_anomalies
+from app.maintenance_schedule import rebuild_service_schedule
+from app.stats import daily_rows, daily_upsert, rollup_rows, rollup_upsert
+
+CHUNK_SIZE = 10_000
+
+# Rejected rows beyond this are counted but not listed in the report.
+MAX_REPORTED_ERRORS = 1_000
+
+
+def _number(value, name, allow_zero=False):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a number")
+    if number < 0 and allow_zero:
+        raise ValueError(f"{name} must not be negative")
+    if number <= 0 and not allow_zero:
+        raise ValueError(f"{name} must be greater than 0")
+    return number
+
+
+def _id(value, name, required=True):
+    if value in (None, ""):
+        if required:
+            raise ValueError(f"{name} is required")
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+
+
+def _date(value, name):
+    if value in (None, ""):
+        return datetime.utcnow()
+    if isinstance(value, datetime):
+        return naive_utc(value)
+    try:
+        # Stored as naive UTC, like the API's writes; an offset is applied, not dropped.
+        return naive_utc(datetime.fromisoformat(str(value)))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date")
+
+
+def _parse_fuel(raw):
+    return {
+        "vehicle_id": _id(raw.get("vehicle_id"), "vehicle_id"),
+        "trip_id": _id(raw.get("trip_id"), "trip_id", required=False),
+        "liters": _number(raw.get("liters"), "liters"),
+        "cost": _number(raw.get("cost"), "cost"),
+        "fuel_date": _date(raw.get("fuel_date"), "fuel_date"),
+    }
+
+
+def _parse_maintenance(raw):
+    description = raw.get("description")
+    if not description:
+        raise ValueError("description is required")
+    return {
+        "vehicle_id": _id(raw.get("vehicle_id"), "vehicle_id"),
+        "description": str(description),
+        "cost": _number(raw.get("cost"), "cost", allow_zero=True),
+        "service_date": _date(raw.get("service_date"), "service_date"),
+    }
+
+
+# kind -> (table, row parser, {VehicleStats field: source column}, date column,
+#          rebuild of derived state for the imported vehicles)
+IMPORTS = {
+    "fuel": (
+        Fuel.__table__, _parse_fuel, {"total_liters": "liters", "fuel_cost": "cost"}, "fuel_date",
+        backfill_fuel_anomalies,
+    ),
+    "maintenance": (
+        Maintenance.__table__, _parse_maintenance, {"maintenance_cost": "cost"}, "service_date",
+        rebuild_service_schedule,
+    ),
+}
+
+
+def read_records(stream, fmt: str):
+    """Yield (line number, dict) pairs from a text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        yield line_number, record
+
+
+def _existing_ids(conn, column, ids):
+    if not ids:
+        return set()
+    return set(conn.execute(select(column).where(column.in_(list(ids)))).scalars())
+
+
+def _copy_rows(conn, table, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _record_stats(conn, rows, stats_fields, date_column):
+    deltas = defaultdict(lambda: dict.fromkeys(stats_fields, 0))
+    daily_deltas = defaultdict(lambda: dict.fromkeys(stats_fields, 0))
+    for row in rows:
+        for field, column in stats_fields.items():
+            deltas[row["vehicle_id"]][field] += row[column]
+            daily_deltas[(row["vehicle_id"], row[date_column].date())][field] += row[column]
+
+    conn.execute(daily_upsert(conn.dialect.name, list(stats_fields)), daily_rows(daily_deltas))
+    conn.execute(
+        rollup_upsert(conn.dialect.name, VehicleStats, ("vehicle_id",), list(stats_fields)),
+        rollup_rows("vehicle_id", deltas),
+    )
+
+
+def _load_chunk(engine, kind, chunk, report) -> set:
+    """Load one chunk; returns the ids of the vehicles it wrote rows for."""
+    table, parse, stats_fields, date_column, _ = IMPORTS[kind]
+
+    parsed = []
+    for line_number, record in chunk:
+        if not isinstance(record, dict):
+            _reject(report, line_number, "Malformed record")
+            continue
+        try:
+            parsed.append((line_number, parse(record)))
+        except ValueError as e:
+            _reject(report, line_number, str(e))
+
+    with engine.begin() as conn:
+        vehicle_ids = _existing_ids(conn, Vehicle.__table__.c.id, {r["vehicle_id"] for _, r in parsed})
+        trip_ids = _existing_ids(
+            conn, Trip.__table__.c.id, {r["trip_id"] for _, r in parsed if r.get("trip_id") is not None}
+        )
+
+        rows = []
+        for line_number, row in parsed:
+            if row["vehicle_id"] not in vehicle_ids:
+                _reject(report, line_number, "Vehicle not found")
+            elif row.get("trip_id") is not None and row["trip_id"] not in trip_ids:
+                _reject(report, line_number, "Trip not found")
+            else:
+                rows.append(row)
+
+        if not rows:
+            return set()
+
+        columns = list(rows[0])
+        if conn.dialect.driver == "psycopg2":
+            _copy_rows(conn, table, columns, rows)
+        else:
+            conn.execute(insert(table), rows)
+
+        _record_stats(conn, rows, stats_fields, date_column)
+
+    report["imported"] += len(rows)
+    return {row["vehicle_id"] for row in rows}
+
+
+def _reject(report, line_number, error):
+    report["rejected"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line_number, "error": error})
+
+
+def import_logs(engine, kind: str, stream, fmt: str = "csv", chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Load fuel or maintenance records from a text stream.
+
+    Returns {"imported", "rejected", "errors": [{"line", "error"}]}. Chunks
+    commit independently, so a failure part way through keeps earlier chunks;
+    the fuel baselines or service schedule of the imported vehicles are
+    rebuilt at the end.
+    """
+    if kind not in IMPORTS:
+        raise ValueError(f"Unknown import '{kind}'")
+    if fmt not in ("csv", "ndjson"):
+        raise ValueError(f"Unknown format '{fmt}'")
+
+    report = {"imported": 0, "rejected": 0, "errors": []}
+    vehicle_ids = set()
+
+    try:
+        chunk = []
+        for item in read_records(stream, fmt):
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                vehicle_ids |= _load_chunk(engine, kind, chunk, report)
+                chunk = []
+
+        if chunk:
+            vehicle_ids |= _load_chunk(engine, kind, chunk, report)
+    finally:
+        # Committed chunks stay, so their vehicles need the rebuild either way.
+        if vehicle_ids:
+            rebuild = IMPORTS[kind][-1]
+            rebuild(engine, vehicle_ids=vehicle_ids)
+
+    report["errors"].sort(key=lambda e: e["line"])
+
+    return report
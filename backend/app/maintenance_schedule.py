@@ -0,0 +1,307 @@
+"""
+Odometer- and calendar-driven maintenance schedule.
+
+A vehicle is due for service once it has driven MAINTENANCE_INTERVAL_KM
+since its last service, or once MAINTENANCE_INTERVAL_DAYS have passed since
+it, whichever comes first. Its due ratio is the larger of the two fractions:
+1.0 means due now, 1.5 means half an interval overdue.
+
+MaintenanceSchedule keeps every scheduled vehicle in two sorted lists: km
+driven since its last service, and its last service date. The lists are kept
+current from the events the write routes publish (app.events): a completed
+trip moves the vehicle in the km list, and a maintenance log puts it back at
+the start of both. The ratio is the max of the two fractions, so the N most
+overdue vehicles are always among the top N of one list or the other.
+most_due() therefore reads at most 2N entries. The day fraction grows with
+the clock without anything being re-sorted.
+
+A vehicle's last service (date and odometer) is stored in ServiceSchedule,
+so loading the schedule reads one row per vehicle, not maintenance history.
+A new vehicle starts its first interval when it is registered. Vehicles with
+no service on record (registered before the schedule existed, with no
+maintenance logged) are not scheduled until
+`python manage.py maintenance schedule` or their next maintenance log.
+
+Dispatch refuses a vehicle whose due ratio has reached
+MAINTENANCE_BLOCK_RATIO, and /dispatch/plan leaves it out. Like the
+availability index, the schedule is reloaded from the database every
+AVAILABILITY_RECONCILE_INTERVAL seconds to pick up other workers' writes.
+
+Configuration:
+    MAINTENANCE_INTERVAL_KM    km between services (10000)
+    MAINTENANCE_INTERVAL_DAYS  days between services (180)
+    MAINTENANCE_BLOCK_RATIO    due ratio at which dispatch refuses a vehicle (1.5, 0 = never)
+"""
+import asyncio
+import logging
+import os
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select as sa_select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.archive import archived_last_odometers
+from app.availability import RECONCILE_INTERVAL
+from app.db import async_session_factory, naive_utc
+from app.events import event_broker
+from app.models.maintenance import Maintenance
+from app.models.service_schedule import ServiceSchedule
+from app.models.trip import Trip
+from app.models.vehicle import Vehicle
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_KM = float(os.getenv("MAINTENANCE_INTERVAL_KM", "10000"))
+INTERVAL_DAYS = float(os.getenv("MAINTENANCE_INTERVAL_DAYS", "180"))
+BLOCK_RATIO = float(os.getenv("MAINTENANCE_BLOCK_RATIO", "1.5"))
+
+SECONDS_PER_DAY = 86_400
+
+VEHICLE_FIELDS = ("id", "name", "license_plate", "region", "vehicle_type", "status", "odometer")
+
+
+async def record_service(session: AsyncSession, vehicle: Vehicle, service_date: datetime) -> bool:
+    """
+    Restart the vehicle's service interval at `service_date` and its current
+    odometer, unless a later service is already on record. Returns whether
+    it did; the caller commits.
+    """
+    service_date = naive_utc(service_date)
+    schedule = await session.get(ServiceSchedule, vehicle.id, with_for_update=True)
+
+    if schedule is None:
+        session.add(ServiceSchedule(
+            vehicle_id=vehicle.id, last_service_date=service_date, last_service_odometer=vehicle.odometer,
+        ))
+        return True
+
+    if service_date < schedule.last_service_date:
+        return False
+
+    schedule.last_service_date = service_date
+    schedule.last_service_odometer = vehicle.odometer
+    session.add(schedule)
+    return True
+
+
+class MaintenanceSchedule:
+    def __init__(self, reconcile_interval: float = RECONCILE_INTERVAL):
+        self.reconcile_interval = reconcile_interval
+        self.warm = False
+        self.reconciles = 0
+
+        self._clear()
+        self._task = None
+        self._pending = None  # events seen while a reload is reading
+
+    def _clear(self):
+        self._vehicles = {}  # id -> vehicle fields + service_date, service_odometer
+        self._unscheduled = {}  # same rows, for vehicles with no service on record
+        self._by_km = []  # sorted [(km since service, id)]
+        self._by_date = []  # sorted [(last service date, id)]
+
+    # ---------------------------
+    # MAINTENANCE
+    # ---------------------------
+    @staticmethod
+    def _km(row) -> float:
+        return row["odometer"] - row["service_odometer"]
+
+    @staticmethod
+    def _discard(pool: list, entry: tuple):
+        i = bisect_left(pool, entry)
+        if i < len(pool) and pool[i] == entry:
+            del pool[i]
+
+    def _remove(self, vehicle_id: int):
+        self._unscheduled.pop(vehicle_id, None)
+        row = self._vehicles.pop(vehicle_id, None)
+        if row is not None:
+            self._discard(self._by_km, (self._km(row), vehicle_id))
+            self._discard(self._by_date, (row["service_date"], vehicle_id))
+
+    def _put(self, row: dict):
+        self._remove(row["id"])
+        if row["status"] == "retired":
+            return
+        if row["service_date"] is None:
+            self._unscheduled[row["id"]] = row
+            return
+        self._vehicles[row["id"]] = row
+        insort(self._by_km, (self._km(row), row["id"]))
+        insort(self._by_date, (row["service_date"], row["id"]))
+
+    def _row(self, vehicle_id: int) -> Optional[dict]:
+        return self._vehicles.get(vehicle_id) or self._unscheduled.get(vehicle_id)
+
+    def apply(self, events):
+        """Event listener: follow odometer, status and service changes."""
+        if self._pending is not None:
+            self._pending.extend(events)
+
+        for event_type, data in events:
+            if event_type == "vehicle.status":
+                row = self._row(data["id"]) or {"service_date": None, "service_odometer": 0}
+                self._put({**row, **{f: data[f] for f in VEHICLE_FIELDS}})
+            elif event_type == "vehicle.serviced":
+                row = self._row(data["vehicle_id"])
+                # Listeners run after the commit: an exception here would turn
+                # a saved write into a 500, so compare naive UTC like the rows.
+                service_date = naive_utc(data["service_date"])
+                if row is None or (row["service_date"] is not None and service_date < row["service_date"]):
+                    continue
+                self._put({**row, "odometer": data["odometer"], "service_date": service_date,
+                           "service_odometer": data["odometer"]})
+
+    async def reconcile(self):
+        """Reload every active vehicle and its last service from the database."""
+        self._pending = []
+        try:
+            async with async_session_factory() as session:
+                vehicles = (await session.exec(
+                    select(*(getattr(Vehicle, f) for f in VEHICLE_FIELDS)).where(Vehicle.status != "retired")
+                )).all()
+                services = {s.vehicle_id: s for s in (await session.exec(select(ServiceSchedule))).all()}
+            events = self._pending
+        finally:
+            self._pending = None
+
+        self._clear()
+        for vehicle in vehicles:
+            row = dict(zip(VEHICLE_FIELDS, vehicle))
+            service = services.get(row["id"])
+            row["service_date"] = service.last_service_date if service else None
+            row["service_odometer"] = service.last_service_odometer if service else 0
+            self._put(row)
+
+        self.apply(events)
+        self.warm = True
+        self.reconciles += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("Maintenance schedule reconcile failed")
+
+    async def start(self):
+        await self.reconcile()
+        if self._task is None and self.reconcile_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---------------------------
+    # LOOKUPS
+    # ---------------------------
+    def _ratios(self, row: dict, now: datetime):
+        km_ratio = self._km(row) / INTERVAL_KM
+        day_ratio = (now - row["service_date"]).total_seconds() / SECONDS_PER_DAY / INTERVAL_DAYS
+        return km_ratio, day_ratio
+
+    def _entry(self, row: dict, now: datetime) -> dict:
+        km_ratio, day_ratio = self._ratios(row, now)
+        return {
+            "vehicle_id": row["id"],
+            "name": row["name"],
+            "license_plate": row["license_plate"],
+            "region": row["region"],
+            "status": row["status"],
+            "odometer": row["odometer"],
+            "last_service_date": row["service_date"],
+            "km_since_service": round(self._km(row), 1),
+            "days_since_service": round(day_ratio * INTERVAL_DAYS, 1),
+            "due_ratio": round(max(km_ratio, day_ratio), 3),
+            "due_by": "km" if km_ratio >= day_ratio else "days",
+        }
+
+    def due_ratio(self, vehicle_id: int, now: Optional[datetime] = None) -> Optional[float]:
+        row = self._vehicles.get(vehicle_id)
+        return max(self._ratios(row, now or datetime.utcnow())) if row else None
+
+    def blocks(self, vehicle_id: int) -> bool:
+        """Whether dispatch should refuse the vehicle until it is serviced."""
+        return BLOCK_RATIO > 0 and (self.due_ratio(vehicle_id) or 0) >= BLOCK_RATIO
+
+    def most_due(self, limit: int, now: Optional[datetime] = None) -> list:
+        """The `limit` vehicles with the highest due ratio, highest first."""
+        now = now or datetime.utcnow()
+        candidates = {i for _, i in self._by_km[-limit:]} | {i for _, i in self._by_date[:limit]}
+        ranked = sorted(candidates, key=lambda i: (-max(self._ratios(self._vehicles[i], now)), i))
+        return [self._entry(self._vehicles[i], now) for i in ranked[:limit]]
+
+    def stats(self) -> dict:
+        return {
+            "warm": self.warm,
+            "scheduled_vehicles": len(self._vehicles),
+            "unscheduled_vehicles": len(self._unscheduled),
+            "reconciles": self.reconciles,
+            "interval_km": INTERVAL_KM,
+            "interval_days": INTERVAL_DAYS,
+            "block_ratio": BLOCK_RATIO,
+        }
+
+
+maintenance_schedule = MaintenanceSchedule()
+event_broker.add_listener(maintenance_schedule.apply)
+
+
+# =========================
+# REBUILD
+# =========================
+def rebuild_service_schedule(engine, vehicle_ids=None) -> dict:
+    """
+    Recreate the ServiceSchedule row of every vehicle with maintenance
+    history (or of those in vehicle_ids): its latest service, with the odometer of its last completed trip
+    dispatched before that service, looking in archived trip months as well.
+    """
+    maintenance = Maintenance.__table__
+    trips = Trip.__table__
+    schedule = ServiceSchedule.__table__
+
+    serviced = sa_select(maintenance.c.vehicle_id)
+    latest = sa_select(maintenance.c.vehicle_id, func.max(maintenance.c.service_date).label("service_date"))
+    if vehicle_ids is not None:
+        vehicle_ids = sorted(vehicle_ids)
+        serviced = serviced.where(maintenance.c.vehicle_id.in_(vehicle_ids))
+        latest = latest.where(maintenance.c.vehicle_id.in_(vehicle_ids))
+    latest = latest.group_by(maintenance.c.vehicle_id).subquery()
+    odometer = (
+        sa_select(func.max(trips.c.end_odometer))
+        .where(
+            trips.c.vehicle_id == latest.c.vehicle_id,
+            trips.c.status == "completed",
+            trips.c.created_at <= latest.c.service_date,
+        )
+        .scalar_subquery()
+    )
+
+    with engine.begin() as conn:
+        services = conn.execute(sa_select(latest.c.vehicle_id, latest.c.service_date, odometer)).all()
+        archived = archived_last_odometers({vehicle_id: service_date for vehicle_id, service_date, _ in services})
+        rows = [
+            {
+                "vehicle_id": vehicle_id,
+                "last_service_date": service_date,
+                "last_service_odometer": max(km or 0, archived.get(vehicle_id, 0)),
+            }
+            for vehicle_id, service_date, km in services
+        ]
+        # Vehicles with no maintenance keep the interval they started when registered.
+        conn.execute(schedule.delete().where(schedule.c.vehicle_id.in_(serviced)))
+        if rows:
+            conn.execute(schedule.insert(), rows)
+
+    return {"vehicles": len(rows)}
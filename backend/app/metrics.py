@@ -0,0 +1,316 @@
+"""
+Request metrics for GET /metrics (Prometheus text format).
+
+MetricsMiddleware times every request by route template, and SQLAlchemy
+cursor events on both engines count the queries each request runs and the
+time spent in them. A request that runs the same statement more than
+N_PLUS_ONE_THRESHOLD times is counted (and logged) as a likely N+1 pattern.
+The per-request totals live in a context variable, so queries run through
+run_in_threadpool are attributed to the request that started them.
+
+Adding ?profile=1 to any request made by a manager returns a profile of that
+request instead of its response: pyinstrument's call tree when pyinstrument
+is installed, otherwise cProfile's top functions. cProfile sees the whole
+thread, so other requests served at the same time show up in it too.
+
+startup_timer records how long the worker took to import main, to finish
+its startup hooks and to serve its first response, counted from the top of
+main.py, as fleetflow_startup_seconds{phase=...}.
+
+Metrics are kept per worker process; scrape each worker, or run one.
+
+Configuration:
+    METRICS_N_PLUS_ONE_THRESHOLD  executions of one statement per request (10)
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from starlette.requests import Request
+
+from app.security import request_token, verify_token
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", "10"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+PROFILE_LINES = 40
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._counts = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self._sums = defaultdict(float)
+
+    def observe(self, labels: tuple, value: float):
+        self._counts[labels][bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def render(self, label_names) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, counts in sorted(self._counts.items()):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {self._sums[labels]}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = defaultdict(float)
+
+    def inc(self, labels: tuple, value: float = 1):
+        self._values[labels] += value
+
+    def render(self, label_names) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines.extend(
+            f"{self.name}{{{_labels(label_names, labels)}}} {value}"
+            for labels, value in sorted(self._values.items())
+        )
+        return lines
+
+
+def _labels(names, values) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+REQUEST_LABELS = ("method", "route", "status")
+ROUTE_LABELS = ("method", "route")
+
+request_seconds = Histogram(
+    "fleetflow_http_request_duration_seconds", "Request latency by route template.", LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "fleetflow_db_queries_per_request", "Database queries run by one request.", QUERY_BUCKETS
+)
+db_queries = CounterMetric("fleetflow_db_queries_total", "Database queries by route.")
+db_seconds = CounterMetric("fleetflow_db_query_seconds_total", "Time spent in database queries by route.")
+n_plus_one = CounterMetric(
+    "fleetflow_n_plus_one_total", "Requests that ran one statement more than the N+1 threshold."
+)
+
+
+class StartupTimer:
+    """Seconds from start() to the first time each phase is marked."""
+
+    def __init__(self):
+        self.started = None
+        self.phases = {}
+
+    def start(self, started: float):
+        self.started = started
+
+    def mark(self, phase: str):
+        if self.started is not None and phase not in self.phases:
+            self.phases[phase] = time.perf_counter() - self.started
+
+    def render(self) -> list:
+        name = "fleetflow_startup_seconds"
+        lines = [f"# HELP {name} Seconds from importing main to each startup phase.", f"# TYPE {name} gauge"]
+        lines.extend(f'{name}{{phase="{phase}"}} {seconds}' for phase, seconds in self.phases.items())
+        return lines
+
+
+startup_timer = StartupTimer()
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+
+
+_current = ContextVar("fleetflow_request_stats", default=None)
+
+
+# ---------------------------
+# DB CURSOR EVENTS
+# ---------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    timers = conn.info.get("query_started")
+    if not timers:
+        return
+    started = timers.pop()
+    stats.queries += 1
+    stats.db_seconds += time.perf_counter() - started
+    stats.statements[statement] += 1
+
+
+def instrument_engine(engine):
+    """Count queries on a sync Engine (pass async_engine.sync_engine for the async one)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------
+# MIDDLEWARE
+# ---------------------------
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _wants_profile(scope) -> bool:
+    if b"profile=" not in scope.get("query_string", b""):
+        return False
+    query = parse_qs(scope["query_string"].decode("latin-1"))
+    if query.get("profile", [""])[0] not in ("1", "true"):
+        return False
+    request = Request(scope)
+    claims = verify_token(request_token(request.headers, request.cookies)) or {}
+    return claims.get("role") == "manager"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; add it first so it runs innermost, after routing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if _wants_profile(scope):
+            return await self._profile(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        response = {"status": 500, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = dict(message.get("headers", []))
+                response["streaming"] = headers.get(b"content-type", b"").startswith(b"text/event-stream")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            # Event streams stay open for as long as the client listens.
+            if not response["streaming"]:
+                self._record(scope, response["status"], time.perf_counter() - started, stats)
+
+    def _record(self, scope, status, seconds, stats):
+        startup_timer.mark("first_response")
+        route = _route_label(scope)
+        labels = scope["method"], route
+
+        request_seconds.observe((*labels, status), seconds)
+        request_queries.observe(labels, stats.queries)
+        db_queries.inc(labels, stats.queries)
+        db_seconds.inc(labels, stats.db_seconds)
+
+        if stats.statements:
+            statement, repeats = stats.statements.most_common(1)[0]
+            if repeats > N_PLUS_ONE_THRESHOLD:
+                n_plus_one.inc(labels)
+                logger.warning(
+                    "Possible N+1 in %s %s: statement ran %d times: %s",
+                    scope["method"], route, repeats, " ".join(statement.split())[:200],
+                )
+
+    async def _profile(self, scope, receive, send):
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = {"code": 500}
+
+        async def discard(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+        started = time.perf_counter()
+        try:
+            if Profiler is not None:
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    await self.app(scope, receive, discard)
+                finally:
+                    profiler.stop()
+                report = profiler.output_text(unicode=False, color=False)
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, discard)
+                finally:
+                    profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+                report = out.getvalue()
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+
+        top = "\n".join(
+            f"  {count:>5}x  {' '.join(statement.split())[:160]}"
+            for statement, count in stats.statements.most_common(10)
+        )
+        body = (
+            f"{scope['method']} {scope['path']} -> {status['code']} in {elapsed * 1000:.1f} ms\n"
+            f"DB: {stats.queries} queries, {stats.db_seconds * 1000:.1f} ms\n{top}\n\n{report}"
+        ).encode("utf-8")
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def render() -> str:
+    lines = (
+        request_seconds.render(REQUEST_LABELS)
+        + request_queries.render(ROUTE_LABELS)
+        + db_queries.render(ROUTE_LABELS)
+        + db_seconds.render(ROUTE_LABELS)
+        + n_plus_one.render(ROUTE_LABELS)
+        + startup_timer.render()
+    )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,87 @@
+"""
+Schema upkeep that create_all cannot do on its own.
+
+create_all skips tables that already exist, including any indexes that were
+added to their models later. create_missing_indexes compares the declared
+indexes with the live database and builds only the missing ones. On
+PostgreSQL they are built CONCURRENTLY so writes keep flowing while it runs.
+
+PostgreSQL cannot build an index on a partitioned table (trip, fuel; see
+app.partitions) concurrently. For those the index is declared on the parent
+alone (ON ONLY, left invalid), built concurrently on each partition and then
+attached partition by partition; the parent index becomes valid once every
+partition has one. Partitions created later get the index on ATTACH.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+
+from app.partitions import is_partitioned
+
+
+def missing_indexes(engine):
+    inspector = inspect(engine)
+    missing = []
+
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        existing |= {uc["name"] for uc in inspector.get_unique_constraints(table.name)}
+
+        missing.extend(
+            index for index in sorted(table.indexes, key=lambda ix: ix.name)
+            if index.name not in existing
+        )
+
+    return missing
+
+
+def _partitions(conn, table: str) -> list:
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+    ), {"table": table}).scalars())
+
+
+def _create_partitioned_index(conn, index, ddl: str):
+    table = index.table.name
+    conn.execute(text(ddl.replace(f" ON {table} ", f" ON ONLY {table} ", 1)))
+
+    for partition in _partitions(conn, table):
+        # Same naming scheme PostgreSQL uses for indexes it creates on ATTACH.
+        name = f"{partition}_{index.name}"[:63]
+        conn.execute(text(
+            _concurrently(ddl)
+            .replace(f" {index.name} ", f" {name} ", 1)
+            .replace(f" ON {table} ", f" ON {partition} ", 1)
+        ))
+
+        attached = conn.execute(text(
+            "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:name) AND inhparent = to_regclass(:parent)"
+        ), {"name": name, "parent": index.name}).scalar()
+        if not attached:
+            conn.execute(text(f"ALTER INDEX {index.name} ATTACH PARTITION {name}"))
+
+
+def _concurrently(ddl: str) -> str:
+    ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+    return ddl.replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY", 1)
+
+
+def create_missing_indexes(engine):
+    created = []
+    postgresql = engine.dialect.name == "postgresql"
+
+    # CREATE INDEX CONCURRENTLY refuses to run inside a transaction block.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index in missing_indexes(engine):
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            if postgresql and is_partitioned(conn, index.table.name):
+                _create_partitioned_index(conn, index, ddl)
+            else:
+                conn.execute(text(_concurrently(ddl) if postgresql else ddl))
+            created.append(index.name)
+
+    return created
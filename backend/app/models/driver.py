@@ -1,8 +1,12 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Index
 from typing import Optional
 from datetime import date
 
 class Driver(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_driver_status_id", "status", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     license_number: str = Field(unique=True)
@@ -0,0 +1,10 @@
+from sqlmodel import SQLModel, Field
+
+
+class DriverStats(SQLModel, table=True):
+    """Running totals per driver, updated in the same transaction as the raw rows."""
+    driver_id: int = Field(foreign_key="driver.id", primary_key=True)
+
+    total_km: float = Field(default=0)
+    revenue: float = Field(default=0)
+    trip_count: int = Field(default=0)  # completed trips
@@ -3,9 +3,12 @@ from typing import Optional
 from datetime import datetime
 
 class Fuel(SQLModel, table=True):
+    # Monthly partitions on PostgreSQL, see app/partitions.py
+    __table_args__ = ({"postgresql_partition_by": "RANGE (fuel_date)"},)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    vehicle_id: int = Field(foreign_key="vehicle.id")
+    vehicle_id: int = Field(foreign_key="vehicle.id", index=True)
     trip_id: Optional[int] = Field(default=None, foreign_key="trip.id")
     liters: float
     cost: float
-    fuel_date: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    fuel_date: datetime = Field(default_factory=datetime.utcnow, index=True)
\ No newline at end of file
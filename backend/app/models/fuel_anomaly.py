@@ -0,0 +1,17 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class FuelAnomaly(SQLModel, table=True):
+    """A fill-up metric that fell outside its vehicle's usual range."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    fuel_id: int = Field(foreign_key="fuel.id", index=True)
+    vehicle_id: int = Field(foreign_key="vehicle.id", index=True)
+    fuel_date: datetime = Field(index=True)
+
+    metric: str  # liters_per_km | cost_per_liter | fill_interval_hours
+    value: float
+    expected: float  # rolling mean before this fill-up
+    std: float
+    z_score: float
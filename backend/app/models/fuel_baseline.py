@@ -0,0 +1,30 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class FuelBaseline(SQLModel, table=True):
+    """
+    Rolling fill-up statistics per vehicle for the fuel anomaly detector.
+
+    Each metric keeps a sample count and an exponentially weighted mean and
+    variance; see app.fuel_anomalies.
+    """
+    vehicle_id: int = Field(foreign_key="vehicle.id", primary_key=True)
+
+    fill_count: int = Field(default=0)
+    last_fuel_date: Optional[datetime] = None
+    last_odometer: Optional[float] = None
+    carried_liters: float = Field(default=0)  # fuelled since the odometer last moved
+
+    liters_per_km_count: int = Field(default=0)
+    liters_per_km_mean: float = Field(default=0)
+    liters_per_km_var: float = Field(default=0)
+
+    cost_per_liter_count: int = Field(default=0)
+    cost_per_liter_mean: float = Field(default=0)
+    cost_per_liter_var: float = Field(default=0)
+
+    fill_interval_hours_count: int = Field(default=0)
+    fill_interval_hours_mean: float = Field(default=0)
+    fill_interval_hours_var: float = Field(default=0)
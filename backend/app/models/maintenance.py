@@ -4,7 +4,7 @@ from datetime import datetime
 
 class Maintenance(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    vehicle_id: int = Field(foreign_key="vehicle.id")
+    vehicle_id: int = Field(foreign_key="vehicle.id", index=True)
     description: str
     cost: float
-    service_date: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    service_date: datetime = Field(default_factory=datetime.utcnow, index=True)
\ No newline at end of file
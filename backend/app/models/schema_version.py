@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class SchemaVersion(SQLModel, table=True):
+    """
+    Fingerprint of the model schema the database was last brought up to.
+
+    A single row, written by app.bootstrap once the tables exist; workers
+    that find it current skip schema creation at startup.
+    """
+    id: int = Field(default=1, primary_key=True)
+    version: str
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,15 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class ServiceSchedule(SQLModel, table=True):
+    """
+    Last service of each vehicle, for the maintenance due list.
+
+    Written by add_maintenance (and create_vehicle, which starts a new
+    vehicle's first interval) in the same transaction as the log, so the
+    schedule never needs to scan maintenance history.
+    """
+    vehicle_id: int = Field(foreign_key="vehicle.id", primary_key=True)
+    last_service_date: datetime
+    last_service_odometer: float = Field(default=0)
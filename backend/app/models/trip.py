@@ -1,9 +1,17 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Index
 from typing import Optional
 from datetime import datetime
 
 
 class Trip(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_trip_vehicle_id_status", "vehicle_id", "status"),
+        Index("ix_trip_driver_id_status", "driver_id", "status"),
+        Index("ix_trip_status_id", "status", "id"),
+        # Monthly partitions on PostgreSQL, see app/partitions.py
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     vehicle_id: int = Field(foreign_key="vehicle.id")
@@ -26,4 +34,4 @@ class Trip(SQLModel, table=True):
     accident_reported: bool = Field(default=False)
     is_night_trip: bool = Field(default=False)
 
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
\ No newline at end of file
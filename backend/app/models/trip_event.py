@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class TripEvent(SQLModel, table=True):
+    """Raw telematics event reported by a vehicle during a trip."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    trip_id: int = Field(foreign_key="trip.id", index=True)
+
+    event_type: str  # overspeed | harsh_brake | accident | odometer
+    value: Optional[float] = None  # speed for overspeed, reading for odometer
+
+    recorded_at: datetime = Field(default_factory=datetime.utcnow)
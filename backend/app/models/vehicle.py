@@ -1,7 +1,11 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Index
 from typing import Optional
 
 class Vehicle(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_vehicle_status_id", "status", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     model: str
@@ -0,0 +1,26 @@
+from sqlmodel import SQLModel, Field
+from datetime import date
+
+
+class VehicleDaily(SQLModel, table=True):
+    """
+    Per-vehicle, per-day totals for the region and date-window analytics.
+
+    Trips count on the day they were created, fuel on fuel_date and
+    maintenance on service_date. Rows are upserted in the same transaction
+    as the raw rows.
+    """
+    vehicle_id: int = Field(foreign_key="vehicle.id", primary_key=True)
+    day: date = Field(primary_key=True, index=True)
+
+    total_km: float = Field(default=0)
+    total_liters: float = Field(default=0)
+    fuel_cost: float = Field(default=0)
+    maintenance_cost: float = Field(default=0)
+    revenue: float = Field(default=0)
+    trip_count: int = Field(default=0)  # completed trips
+
+    # Safety events reported on completed trips
+    overspeed_count: int = Field(default=0)
+    harsh_brake_count: int = Field(default=0)
+    accident_count: int = Field(default=0)
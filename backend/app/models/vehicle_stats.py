@@ -0,0 +1,13 @@
+from sqlmodel import SQLModel, Field
+
+
+class VehicleStats(SQLModel, table=True):
+    """Running totals per vehicle, updated in the same transaction as the raw rows."""
+    vehicle_id: int = Field(foreign_key="vehicle.id", primary_key=True)
+
+    total_km: float = Field(default=0)
+    total_liters: float = Field(default=0)
+    fuel_cost: float = Field(default=0)
+    maintenance_cost: float = Field(default=0)
+    revenue: float = Field(default=0)
+    trip_count: int = Field(default=0)  # completed trips
@@ -0,0 +1,54 @@
+"""
+Keyset pagination for the list endpoints.
+
+Pages are addressed by the last id seen (?after_id=), so fetching page N costs
+the same as fetching page 1. The filtered total is sent in X-Total-Count on the
+first page only, and X-Next-After-Id carries the cursor for the next page when
+there is one.
+"""
+from typing import Optional
+
+from fastapi import Query, Response
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PageParams:
+    def __init__(
+        self,
+        after_id: Optional[int] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        order: str = Query("asc", pattern="^(asc|desc)$"),
+    ):
+        self.after_id = after_id
+        self.limit = limit
+        self.order = order
+
+
+async def paginate(session: AsyncSession, query, id_column, page: PageParams, response: Response):
+    if page.after_id is None:
+        total = (await session.exec(
+            select(func.count()).select_from(query.subquery())
+        )).one()
+        response.headers["X-Total-Count"] = str(total)
+
+    if page.order == "desc":
+        if page.after_id is not None:
+            query = query.where(id_column < page.after_id)
+        query = query.order_by(id_column.desc())
+    else:
+        if page.after_id is not None:
+            query = query.where(id_column > page.after_id)
+        query = query.order_by(id_column)
+
+    # Fetch one extra row to learn whether another page exists.
+    rows = (await session.exec(query.limit(page.limit + 1))).all()
+
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers["X-Next-After-Id"] = str(rows[-1].id)
+
+    return rows
@@ -0,0 +1,180 @@
+"""
+Monthly range partitions for the trip and fuel history tables.
+
+On PostgreSQL, trip is partitioned by created_at and fuel by fuel_date, one
+partition per calendar month (trip_p2024_05 holds May 2024), plus a DEFAULT
+partition that catches rows for months without one. Vacuum, index upkeep and
+date-window scans then only touch the months involved, and a closed month can
+be detached and dropped without touching the rest (see app/archive.py).
+
+PostgreSQL requires a partitioned table's primary key to include the
+partition column, so these tables get PRIMARY KEY (id, created_at) in the
+database while the models keep id as their key; ids still come from one
+sequence. For the same reason nothing can reference trip.id or fuel.id, so
+the foreign keys declared on fuel.trip_id, trip_event.trip_id and
+fuel_anomaly.fuel_id are checked by the API only.
+
+create_schema replaces SQLModel.metadata.create_all: it creates missing tables
+this way on PostgreSQL and defers to create_all elsewhere. Existing,
+unpartitioned tables are left as they are.
+
+Configuration:
+    PARTITION_MONTHS_AHEAD  future months created in advance (3)
+"""
+import os
+from datetime import date, datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlmodel import SQLModel
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# table -> partition column
+PARTITIONED = {
+    "trip": "created_at",
+    "fuel": "fuel_date",
+}
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(first: date, last: date):
+    """Every month from first through last, inclusive."""
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def _create_table_ddl(engine, table) -> str:
+    foreign_keys = [
+        fk for fk in table.foreign_key_constraints
+        if fk.referred_table.name not in PARTITIONED
+    ]
+    ddl = str(CreateTable(table, include_foreign_key_constraints=foreign_keys).compile(dialect=engine.dialect))
+
+    column = PARTITIONED.get(table.name)
+    if column:
+        # The model's postgresql_partition_by adds PARTITION BY; the key has
+        # to carry the partition column as well.
+        ddl = ddl.replace("PRIMARY KEY (id)", f"PRIMARY KEY (id, {column})", 1)
+
+    return ddl
+
+
+def create_schema(engine):
+    """create_all, with trip and fuel created as partitioned tables on PostgreSQL."""
+    if engine.dialect.name != "postgresql":
+        SQLModel.metadata.create_all(engine)
+        return
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if inspector.has_table(table.name):
+                continue
+
+            conn.execute(text(_create_table_ddl(engine, table)))
+            for index in table.indexes:
+                conn.execute(CreateIndex(index))
+
+    ensure_partitions(engine)
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar() == "p"
+
+
+def partition_months(conn, table: str) -> list:
+    """Months that currently have a partition of table, oldest first."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": table}).scalars()
+
+    prefix = f"{table}_p"
+    return sorted(
+        date(int(name[len(prefix):len(prefix) + 4]), int(name[-2:]), 1)
+        for name in names if name.startswith(prefix)
+    )
+
+
+def _create_partition(conn, table: str, month: date):
+    column = PARTITIONED[table]
+    name = partition_name(table, month)
+    low, high = month, add_months(month, 1)
+
+    # Rows for this month may already sit in the default partition, and
+    # PostgreSQL refuses a new partition whose range the default still holds.
+    # Build the month as a plain table, move those rows into it, then attach.
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {table}_default WHERE {column} >= :low AND {column} < :high RETURNING *"
+        f") INSERT INTO {name} SELECT * FROM moved"
+    ), {"low": low, "high": high})
+    conn.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{low}') TO ('{high}')"
+    ))
+
+
+def ensure_partitions(engine, date_from=None, date_to=None) -> list:
+    """
+    Create the monthly partitions for date_from..date_to (default: this month
+    through PARTITION_MONTHS_AHEAD ahead) and for every month that has rows
+    in the default partition, moving those rows out. Returns the names created.
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+
+    this_month = month_start(datetime.utcnow())
+    first = month_start(date_from) if date_from else this_month
+    last = month_start(date_to) if date_to else add_months(this_month, PARTITION_MONTHS_AHEAD)
+
+    created = []
+    with engine.begin() as conn:
+        for table, column in PARTITIONED.items():
+            if not is_partitioned(conn, table):
+                continue
+
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+            months = set(month_range(first, last))
+            low, high = conn.execute(text(f"SELECT min({column}), max({column}) FROM {table}_default")).one()
+            if low is not None:
+                months.update(month_range(low, month_start(high)))
+
+            for month in sorted(months - set(partition_months(conn, table))):
+                _create_partition(conn, table, month)
+                created.append(partition_name(table, month))
+
+    return created
+
+
+def detach_partition(conn, table: str, month: date):
+    """
+    Detach the month's partition and return its name, or None if the month
+    has none. The detached table stays locked until the transaction ends;
+    writes for the month go to the default partition from then on.
+    """
+    if month not in partition_months(conn, table):
+        return None
+
+    name = partition_name(table, month)
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    return name
@@ -1,28 +1,113 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from app.db import get_session
+from fastapi import APIRouter, Depends, Query, Response
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from datetime import date
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_read_session, replica
 from app.models.vehicle import Vehicle
 from app.models.trip import Trip
 from app.models.fuel import Fuel
-from app.models.maintenance import Maintenance
 from app.models.driver import Driver
+from app.models.vehicle_stats import VehicleStats
+from app.models.vehicle_daily import VehicleDaily
+from app.models.fuel_anomaly import FuelAnomaly
+from app.fuel_anomalies import METRICS
+from app.pagination import PageParams, paginate
+from app.stats import DAILY_FIELDS, VEHICLE_FIELDS, as_date, completed_trip_totals
+from app.archive import archived_fuel_totals, archived_trip_totals
+from app.partitions import month_start
+from app.cache import analytics_cache
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+# Tables each cached endpoint reads; writes to them invalidate its entries.
+DASHBOARD_TABLES = ("vehicle", "trip")
+OVERVIEW_TABLES = ("vehicle", "trip", "driver", "fuel")
+COSTS_TABLES = ("vehicle", "fuel", "maintenance")
+
+
+class Window:
+    """Optional ?from=&to= day range (to is exclusive) shared by the analytics endpoints."""
+
+    def __init__(
+        self,
+        date_from: Optional[date] = Query(None, alias="from"),
+        date_to: Optional[date] = Query(None, alias="to"),
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+
+    @property
+    def all_time(self) -> bool:
+        return self.date_from is None and self.date_to is None
+
+    def apply(self, query):
+        if self.date_from:
+            query = query.where(VehicleDaily.day >= self.date_from)
+        if self.date_to:
+            query = query.where(VehicleDaily.day < self.date_to)
+        return query
+
+    def params(self) -> dict:
+        return {"from": self.date_from, "to": self.date_to}
+
+
+def _vehicle_totals(window: Window):
+    """
+    Per-vehicle totals with the VehicleStats columns: the all-time rollup, or
+    VehicleDaily summed over the window, so the cost follows vehicles x days.
+    """
+    if window.all_time:
+        return VehicleStats.__table__
+
+    return window.apply(
+        select(
+            VehicleDaily.vehicle_id,
+            *(func.sum(getattr(VehicleDaily, f)).label(f) for f in VEHICLE_FIELDS),
+        ).group_by(VehicleDaily.vehicle_id)
+    ).subquery()
+
+
+async def _vehicle_stats(session: AsyncSession, vehicle_id: int, window: Window) -> VehicleStats:
+    if window.all_time:
+        return await session.get(VehicleStats, vehicle_id) or VehicleStats(vehicle_id=vehicle_id)
+
+    sums = (await session.exec(window.apply(
+        select(*(func.coalesce(func.sum(getattr(VehicleDaily, f)), 0) for f in VEHICLE_FIELDS))
+        .where(VehicleDaily.vehicle_id == vehicle_id)
+    ))).one()
+
+    return VehicleStats(vehicle_id=vehicle_id, **dict(zip(VEHICLE_FIELDS, sums)))
+
 
 # =========================
 # DASHBOARD KPIs
 # =========================
 @router.get("/dashboard")
-def dashboard(session: Session = Depends(get_session)):
+async def dashboard(region: Optional[str] = None, session: AsyncSession = Depends(get_read_session)):
+    return await analytics_cache.get_or_compute(
+        "dashboard", {"region": region}, DASHBOARD_TABLES, lambda: _dashboard(session, region),
+        max_ttl=replica.cache_ttl(session),
+    )
+
+
+async def _dashboard(session: AsyncSession, region: Optional[str]):
 
-    vehicles = session.exec(select(Vehicle)).all()
-    trips = session.exec(select(Trip)).all()
+    vehicle_query = select(Vehicle.status, func.count()).group_by(Vehicle.status)
+    pending_query = select(func.count()).select_from(Trip).where(Trip.status == "draft")
 
-    total_vehicles = len(vehicles)
-    active_vehicles = len([v for v in vehicles if v.status == "on_trip"])
-    in_shop = len([v for v in vehicles if v.status == "in_shop"])
-    pending_trips = len([t for t in trips if t.status == "draft"])
+    if region:
+        vehicle_query = vehicle_query.where(Vehicle.region == region)
+        pending_query = pending_query.join(Vehicle, Vehicle.id == Trip.vehicle_id).where(Vehicle.region == region)
+
+    vehicle_counts = dict((await session.exec(vehicle_query)).all())
+
+    total_vehicles = sum(vehicle_counts.values())
+    active_vehicles = vehicle_counts.get("on_trip", 0)
+    in_shop = vehicle_counts.get("in_shop", 0)
+    available_vehicles = vehicle_counts.get("available", 0)
+    pending_trips = (await session.exec(pending_query)).one()
 
     utilization_rate = (active_vehicles / total_vehicles) if total_vehicles else 0
 
@@ -30,63 +115,98 @@ def dashboard(session: Session = Depends(get_session)):
         "total_vehicles": total_vehicles,
         "active_vehicles": active_vehicles,
         "in_shop": in_shop,
+        "available_vehicles": available_vehicles,
         "pending_trips": pending_trips,
         "utilization_rate": utilization_rate
     }
 
 
 # =========================
-# VEHICLE OPERATIONAL COST
+# REGIONS
 # =========================
-@router.get("/vehicle/{vehicle_id}/cost")
-def vehicle_operational_cost(vehicle_id: int, session: Session = Depends(get_session)):
+@router.get("/regions")
+async def regions(session: AsyncSession = Depends(get_read_session)):
+    query = select(Vehicle.region, func.count()).group_by(Vehicle.region).order_by(Vehicle.region)
+    return [{"region": region, "vehicles": count} for region, count in await session.exec(query)]
+
 
-    fuel_logs = session.exec(
-        select(Fuel).where(Fuel.vehicle_id == vehicle_id)
-    ).all()
+# =========================
+# FLEET OPERATIONAL COST
+# =========================
+@router.get("/costs")
+async def fleet_costs(
+    region: Optional[str] = None,
+    window: Window = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+    return await analytics_cache.get_or_compute(
+        "costs", {"region": region, **window.params()}, COSTS_TABLES,
+        lambda: _fleet_costs(session, region, window), max_ttl=replica.cache_ttl(session),
+    )
+
+
+async def _fleet_costs(session: AsyncSession, region: Optional[str], window: Window):
+    # Summed from the per-vehicle rollup, so the fuel and maintenance pages
+    # show fleet totals without reading every log.
+    totals = _vehicle_totals(window)
+
+    query = select(
+        func.coalesce(func.sum(totals.c.fuel_cost), 0),
+        func.coalesce(func.sum(totals.c.maintenance_cost), 0),
+        func.coalesce(func.sum(totals.c.total_liters), 0),
+    ).select_from(totals)
 
-    maintenance_logs = session.exec(
-        select(Maintenance).where(Maintenance.vehicle_id == vehicle_id)
-    ).all()
+    if region:
+        query = query.join(Vehicle, Vehicle.id == totals.c.vehicle_id).where(Vehicle.region == region)
 
-    total_fuel = sum(f.cost for f in fuel_logs)
-    total_maintenance = sum(m.cost for m in maintenance_logs)
+    fuel_cost, maintenance_cost, total_liters = (await session.exec(query)).one()
 
     return {
-        "vehicle_id": vehicle_id,
-        "fuel_cost": total_fuel,
-        "maintenance_cost": total_maintenance,
-        "total_operational_cost": total_fuel + total_maintenance
+        "fuel_cost": fuel_cost,
+        "maintenance_cost": maintenance_cost,
+        "total_liters": total_liters,
+        "total_operational_cost": fuel_cost + maintenance_cost
     }
 
 
 # =========================
-# FUEL EFFICIENCY (km/L)
+# VEHICLE OPERATIONAL COST
 # =========================
-@router.get("/vehicle/{vehicle_id}/efficiency")
-def fuel_efficiency(vehicle_id: int, session: Session = Depends(get_session)):
+@router.get("/vehicle/{vehicle_id}/cost")
+async def vehicle_operational_cost(
+    vehicle_id: int,
+    window: Window = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
 
-    trips = session.exec(
-        select(Trip).where(Trip.vehicle_id == vehicle_id, Trip.status == "completed")
-    ).all()
+    stats = await _vehicle_stats(session, vehicle_id, window)
 
-    fuel_logs = session.exec(
-        select(Fuel).where(Fuel.vehicle_id == vehicle_id)
-    ).all()
+    return {
+        "vehicle_id": vehicle_id,
+        "fuel_cost": stats.fuel_cost,
+        "maintenance_cost": stats.maintenance_cost,
+        "total_operational_cost": stats.fuel_cost + stats.maintenance_cost
+    }
 
-    total_km = 0
-    for trip in trips:
-        if trip.end_odometer and trip.start_odometer:
-            total_km += (trip.end_odometer - trip.start_odometer)
 
-    total_liters = sum(f.liters for f in fuel_logs)
+# =========================
+# FUEL EFFICIENCY (km/L)
+# =========================
+@router.get("/vehicle/{vehicle_id}/efficiency")
+async def fuel_efficiency(
+    vehicle_id: int,
+    window: Window = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+
+    stats = await _vehicle_stats(session, vehicle_id, window)
 
-    efficiency = (total_km / total_liters) if total_liters else 0
+    efficiency = (stats.total_km / stats.total_liters) if stats.total_liters else 0
 
     return {
         "vehicle_id": vehicle_id,
-        "total_km": total_km,
-        "total_liters": total_liters,
+        "total_km": stats.total_km,
+        "total_liters": stats.total_liters,
         "fuel_efficiency_km_per_l": efficiency
     }
 
@@ -95,24 +215,17 @@ def fuel_efficiency(vehicle_id: int, session: Session = Depends(get_session)):
 # ROI CALCULATION
 # =========================
 @router.get("/vehicle/{vehicle_id}/roi")
-def vehicle_roi(vehicle_id: int, session: Session = Depends(get_session)):
-
-    vehicle = session.get(Vehicle, vehicle_id)
+async def vehicle_roi(
+    vehicle_id: int,
+    window: Window = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
 
-    trips = session.exec(
-        select(Trip).where(Trip.vehicle_id == vehicle_id)
-    ).all()
+    vehicle = await session.get(Vehicle, vehicle_id)
+    stats = await _vehicle_stats(session, vehicle_id, window)
 
-    fuel_logs = session.exec(
-        select(Fuel).where(Fuel.vehicle_id == vehicle_id)
-    ).all()
-
-    maintenance_logs = session.exec(
-        select(Maintenance).where(Maintenance.vehicle_id == vehicle_id)
-    ).all()
-
-    total_revenue = sum(t.revenue for t in trips)
-    total_cost = sum(f.cost for f in fuel_logs) + sum(m.cost for m in maintenance_logs)
+    total_revenue = stats.revenue
+    total_cost = stats.fuel_cost + stats.maintenance_cost
 
     roi = 0
     if vehicle and vehicle.acquisition_cost > 0:
@@ -127,33 +240,127 @@ def vehicle_roi(vehicle_id: int, session: Session = Depends(get_session)):
 
 
 # =========================
-# FLEET OVERVIEW (INTELLIGENCE KPI)
+# FLEET-WIDE ROI
+# =========================
+@router.get("/roi")
+async def fleet_roi(
+    vehicle_ids: Optional[List[int]] = Query(None),
+    region: Optional[str] = None,
+    window: Window = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+
+    totals = _vehicle_totals(window)
+
+    query = (
+        select(
+            Vehicle.id,
+            Vehicle.acquisition_cost,
+            func.coalesce(totals.c.revenue, 0),
+            func.coalesce(totals.c.fuel_cost + totals.c.maintenance_cost, 0),
+        )
+        .outerjoin(totals, totals.c.vehicle_id == Vehicle.id)
+        .order_by(Vehicle.id)
+    )
+
+    if vehicle_ids:
+        query = query.where(Vehicle.id.in_(vehicle_ids))
+
+    if region:
+        query = query.where(Vehicle.region == region)
+
+    results = []
+    for vehicle_id, acquisition_cost, total_revenue, total_cost in await session.exec(query):
+
+        roi = 0
+        if acquisition_cost > 0:
+            roi = (total_revenue - total_cost) / acquisition_cost
+
+        results.append({
+            "vehicle_id": vehicle_id,
+            "total_revenue": total_revenue,
+            "total_cost": total_cost,
+            "roi": roi
+        })
+
+    return results
+
+
 # =========================
+# DAILY TREND
+# =========================
+@router.get("/daily")
+async def daily_trend(
+    region: Optional[str] = None,
+    vehicle_id: Optional[int] = None,
+    window: Window = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+
+    query = (
+        select(VehicleDaily.day, *(func.sum(getattr(VehicleDaily, f)) for f in DAILY_FIELDS))
+        .group_by(VehicleDaily.day)
+        .order_by(VehicleDaily.day)
+    )
+
+    if region:
+        query = query.join(Vehicle, Vehicle.id == VehicleDaily.vehicle_id).where(Vehicle.region == region)
+
+    if vehicle_id is not None:
+        query = query.where(VehicleDaily.vehicle_id == vehicle_id)
+
+    return [
+        {"day": day, **dict(zip(DAILY_FIELDS, sums))}
+        for day, *sums in await session.exec(window.apply(query))
+    ]
+
+
 # =========================
 # FLEET OVERVIEW (INTELLIGENCE KPI)
 # =========================
 @router.get("/overview")
-def fleet_overview(session: Session = Depends(get_session)):
+async def fleet_overview(
+    region: Optional[str] = None,
+    window: Window = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+    return await analytics_cache.get_or_compute(
+        "overview", {"region": region, **window.params()}, OVERVIEW_TABLES,
+        lambda: _fleet_overview(session, region, window), max_ttl=replica.cache_ttl(session),
+    )
 
-    vehicles = session.exec(select(Vehicle)).all()
-    drivers = session.exec(select(Driver)).all()
-    trips = session.exec(select(Trip)).all()
-    fuel_logs = session.exec(select(Fuel)).all()
 
-    total_vehicles = len(vehicles)
-    total_drivers = len(drivers)
+async def _fleet_overview(session: AsyncSession, region: Optional[str] = None, window: Window = None):
+    window = window or Window(None, None)
 
-    active_trips = len([t for t in trips if t.status == "dispatched"])
-    completed_trips = len([t for t in trips if t.status == "completed"])
+    # Vehicle and trip status counts are point-in-time; the window applies to
+    # the completed-trip and efficiency figures. Drivers carry no region, so
+    # the driver KPIs are always fleet-wide.
+    vehicle_query = select(Vehicle.status, func.count()).group_by(Vehicle.status)
+    active_query = select(func.count()).select_from(Trip).where(Trip.status == "dispatched")
 
-    high_risk_drivers = len([d for d in drivers if d.risk_level == "High"])
+    if region:
+        vehicle_query = vehicle_query.where(Vehicle.region == region)
+        active_query = active_query.join(Vehicle, Vehicle.id == Trip.vehicle_id).where(Vehicle.region == region)
 
-    avg_safety_score = (
-        sum(d.safety_score for d in drivers) / total_drivers
-        if total_drivers else 0
-    )
+    vehicle_counts = dict((await session.exec(vehicle_query)).all())
+    active_trips = (await session.exec(active_query)).one()
 
-    available_vehicles = len([v for v in vehicles if v.status == "available"])
+    total_drivers, avg_safety_score, high_risk_drivers = (await session.exec(
+        select(
+            func.count(Driver.id),
+            func.avg(Driver.safety_score),
+            func.count(Driver.id).filter(Driver.risk_level == "High"),
+        )
+    )).one()
+
+    total_vehicles = sum(vehicle_counts.values())
+    total_drivers = total_drivers or 0
+
+    high_risk_drivers = high_risk_drivers or 0
+    avg_safety_score = float(avg_safety_score or 0)
+
+    available_vehicles = vehicle_counts.get("available", 0)
 
     availability_ratio = (
         available_vehicles / total_vehicles
@@ -163,32 +370,24 @@ def fleet_overview(session: Session = Depends(get_session)):
     # -----------------------------------
     # FUEL INEFFICIENCY ANALYSIS
     # -----------------------------------
-    inefficient_vehicles = 0
-
-    for vehicle in vehicles:
-
-        vehicle_trips = [
-            t for t in trips
-            if t.vehicle_id == vehicle.id and t.status == "completed"
-        ]
-
-        vehicle_fuel_logs = [
-            f for f in fuel_logs
-            if f.vehicle_id == vehicle.id
-        ]
+    # Per-vehicle km and liters come from the vehicle_stats rollup (or the
+    # daily rollup for a window), so the cost depends on the number of
+    # vehicles and days, not on trip history.
+    totals = _vehicle_totals(window)
 
-        total_km = 0
-        for trip in vehicle_trips:
-            if trip.end_odometer and trip.start_odometer:
-                total_km += (trip.end_odometer - trip.start_odometer)
+    # Mark inefficient if efficiency < 7 km/L
+    totals_query = select(
+        func.coalesce(func.sum(totals.c.trip_count), 0),
+        func.count().filter(
+            totals.c.total_liters > 0,
+            totals.c.total_km < 7 * totals.c.total_liters,
+        ),
+    ).select_from(totals)
 
-        total_liters = sum(f.liters for f in vehicle_fuel_logs)
+    if region:
+        totals_query = totals_query.join(Vehicle, Vehicle.id == totals.c.vehicle_id).where(Vehicle.region == region)
 
-        efficiency = (total_km / total_liters) if total_liters else 0
-
-        # Mark inefficient if efficiency < 7 km/L
-        if efficiency < 7 and total_liters > 0:
-            inefficient_vehicles += 1
+    completed_trips, inefficient_vehicles = (await session.exec(totals_query)).one()
 
     inefficiency_ratio = (
         inefficient_vehicles / total_vehicles
@@ -214,4 +413,111 @@ def fleet_overview(session: Session = Depends(get_session)):
         "average_driver_safety_score": round(avg_safety_score, 2),
         "vehicle_availability_ratio": round(availability_ratio, 2),
         "fleet_health_score": round(max(fleet_health_score, 0), 2)
-    }
\ No newline at end of file
+    }
+
+
+# =========================
+# MONTHLY HISTORY (LIVE + ARCHIVE)
+# =========================
+HISTORY_FIELDS = ["trip_count", "total_km", "revenue", "total_liters", "fuel_cost"]
+
+
+@router.get("/history")
+async def monthly_history(
+    region: Optional[str] = None,
+    vehicle_id: Optional[int] = None,
+    window: Window = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Completed trips and fuel per month, read from the raw trip and fuel
+    history: the live tables plus the months archived to Parquet.
+    """
+    vehicle_ids = None
+    if vehicle_id is not None:
+        vehicle_ids = [vehicle_id]
+    if region:
+        in_region = (await session.exec(select(Vehicle.id).where(Vehicle.region == region))).all()
+        vehicle_ids = [i for i in in_region if vehicle_ids is None or i in vehicle_ids]
+
+    trip_day = func.date(Trip.created_at)
+    trip_query = completed_trip_totals(trip_day)
+    fuel_day = func.date(Fuel.fuel_date)
+    fuel_query = select(fuel_day, func.sum(Fuel.liters), func.sum(Fuel.cost)).group_by(fuel_day)
+
+    if vehicle_ids is not None:
+        trip_query = trip_query.where(Trip.vehicle_id.in_(vehicle_ids))
+        fuel_query = fuel_query.where(Fuel.vehicle_id.in_(vehicle_ids))
+    if window.date_from:
+        trip_query = trip_query.where(Trip.created_at >= window.date_from)
+        fuel_query = fuel_query.where(Fuel.fuel_date >= window.date_from)
+    if window.date_to:
+        trip_query = trip_query.where(Trip.created_at < window.date_to)
+        fuel_query = fuel_query.where(Fuel.fuel_date < window.date_to)
+
+    trips = [(month_start(as_date(day)), *sums) for day, *sums in await session.exec(trip_query)]
+    fuel = [(month_start(as_date(day)), *sums) for day, *sums in await session.exec(fuel_query)]
+
+    archive = {"date_from": window.date_from, "date_to": window.date_to, "vehicle_ids": vehicle_ids}
+    trips += [t[:4] for t in await run_in_threadpool(archived_trip_totals, "month", **archive)]
+    fuel += await run_in_threadpool(archived_fuel_totals, "month", **archive)
+
+    months = {}
+
+    def row(month):
+        return months.setdefault(month, dict.fromkeys(HISTORY_FIELDS, 0))
+
+    for month, km, revenue, count in trips:
+        totals = row(month)
+        totals["trip_count"] += count
+        totals["total_km"] += km or 0
+        totals["revenue"] += revenue or 0
+
+    for month, liters, cost in fuel:
+        totals = row(month)
+        totals["total_liters"] += liters or 0
+        totals["fuel_cost"] += cost or 0
+
+    return [{"month": month, **months[month]} for month in sorted(months)]
+
+
+# =========================
+# FUEL ANOMALIES
+# =========================
+@router.get("/fuel/anomalies")
+async def fuel_anomalies(
+    response: Response,
+    vehicle_id: Optional[int] = None,
+    region: Optional[str] = None,
+    metric: Optional[str] = Query(None, pattern="^(" + "|".join(METRICS) + ")$"),
+    window: Window = Depends(),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+
+    query = select(FuelAnomaly)
+
+    if vehicle_id is not None:
+        query = query.where(FuelAnomaly.vehicle_id == vehicle_id)
+    if region:
+        query = query.join(Vehicle, Vehicle.id == FuelAnomaly.vehicle_id).where(Vehicle.region == region)
+    if metric:
+        query = query.where(FuelAnomaly.metric == metric)
+    if window.date_from:
+        query = query.where(FuelAnomaly.fuel_date >= window.date_from)
+    if window.date_to:
+        query = query.where(FuelAnomaly.fuel_date < window.date_to)
+
+    return await paginate(session, query, FuelAnomaly.id, page, response)
+
+
+# =========================
+# CACHE COUNTERS
+# =========================
+@router.get("/cache")
+async def cache_stats():
+    return {
+        "backend": type(analytics_cache.backend).__name__,
+        "ttl_seconds": analytics_cache.ttl,
+        "endpoints": analytics_cache.counters(),
+    }
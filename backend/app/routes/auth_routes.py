@@ -1,38 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Form
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Form
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
  
-from app.db import get_session
+from app.db import get_async_session
+from app.dependencies import current_user
 from app.models.user import User
-import bcrypt
+from app.security import (
+    ACCESS_COOKIE, ACCESS_TOKEN_TTL, REFRESH_COOKIE, REFRESH_TOKEN_TTL, AuthBusy,
+    hash_password, issue_token, needs_rehash, token_cache, verify_password, verify_token,
+)
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+def _set_tokens(response: Response, user: User) -> str:
+    access_token = issue_token(user.id, user.role)
+    response.set_cookie(ACCESS_COOKIE, access_token, max_age=ACCESS_TOKEN_TTL, httponly=True, samesite="lax")
+    response.set_cookie(
+        REFRESH_COOKIE, issue_token(user.id, user.role, kind="refresh"),
+        max_age=REFRESH_TOKEN_TTL, httponly=True, samesite="lax", path="/auth",
+    )
+    return access_token
+
+
+async def _hashing(coro):
+    try:
+        return await coro
+    except AuthBusy:
+        raise HTTPException(status_code=503, detail="Too many logins in progress, retry shortly")
+
+
 # ------------------------
 # Register
 # ------------------------
 @router.post("/register")
-def register(
+async def register(
     email: str = Form(...),
     password: str = Form(...),
     role: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    existing = session.exec(select(User).where(User.email == email)).first()
+    existing = (await session.exec(select(User).where(User.email == email))).first()
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
 
+    # bcrypt is CPU-bound; it runs on its own bounded pool
+    password_hash = await _hashing(hash_password(password))
+
     user = User(
         email=email,
-        password_hash=bcrypt.hashpw(
-            password.encode("utf-8"),
-            bcrypt.gensalt()
-        ).decode("utf-8"),
+        password_hash=password_hash,
         role=role
     )
 
     session.add(user)
-    session.commit()
+    await session.commit()
 
     return {"message": "User registered successfully"}
 
@@ -41,35 +63,58 @@ def register(
 # Login
 # ------------------------
 @router.post("/login")
-def login(
-    request: Request,
+async def login(
+    response: Response,
     email: str = Form(...),
     password: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    user = session.exec(select(User).where(User.email == email)).first()
+    user = (await session.exec(select(User).where(User.email == email))).first()
 
-    if not user or not bcrypt.checkpw(
-        password.encode("utf-8"),
-        user.password_hash.encode("utf-8")
-    ):
+    if not user or not await _hashing(verify_password(password, user.password_hash)):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    request.session["user_id"] = user.id
-    request.session["role"] = user.role
+    # Move hashes made with another BCRYPT_ROUNDS to the configured cost.
+    if needs_rehash(user.password_hash):
+        user.password_hash = await _hashing(hash_password(password))
+        await session.commit()
+
+    access_token = _set_tokens(response, user)
 
     return {
         "message": "Login successful",
-        "role": user.role
+        "role": user.role,
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_TTL,
     }
 
 
+# ------------------------
+# Refresh
+# ------------------------
+@router.post("/refresh")
+async def refresh(request: Request, response: Response, session: AsyncSession = Depends(get_async_session)):
+    claims = verify_token(request.cookies.get(REFRESH_COOKIE), kind="refresh")
+    if not claims:
+        raise HTTPException(status_code=401, detail="Login required")
+
+    # Once per access token lifetime: picks up role changes and removed users.
+    user = await session.get(User, claims["user_id"])
+    if not user:
+        raise HTTPException(status_code=401, detail="Login required")
+
+    access_token = _set_tokens(response, user)
+    return {"role": user.role, "access_token": access_token, "token_type": "bearer", "expires_in": ACCESS_TOKEN_TTL}
+
+
 # ------------------------
 # Logout
 # ------------------------
 @router.post("/logout")
-def logout(request: Request):
-    request.session.clear()
+async def logout(response: Response):
+    response.delete_cookie(ACCESS_COOKIE)
+    response.delete_cookie(REFRESH_COOKIE, path="/auth")
     return {"message": "Logged out successfully"}
 
 
@@ -77,11 +122,18 @@ def logout(request: Request):
 # Current session
 # ------------------------
 @router.get("/me")
-def me(request: Request):
-    user_id = request.session.get("user_id")
-    role = request.session.get("role")
+async def me(request: Request):
+    claims = current_user(request)
 
-    if not user_id or not role:
+    if not claims:
         raise HTTPException(status_code=401, detail="Login required")
 
-    return {"user_id": user_id, "role": role}
\ No newline at end of file
+    return {"user_id": claims["user_id"], "role": claims["role"]}
+
+
+# ------------------------
+# Token cache stats
+# ------------------------
+@router.get("/cache")
+async def token_cache_stats():
+    return token_cache.stats()
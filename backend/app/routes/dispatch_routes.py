@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import Field
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from datetime import date
+from app.db import get_async_session
+from app.models.vehicle import Vehicle
+from app.models.driver import Driver
+from app.dependencies import require_dispatcher_or_manager
+from app.dispatch import plan_assignments
+from app.availability import availability
+from app.maintenance_schedule import maintenance_schedule
+
+router = APIRouter(prefix="/dispatch", tags=["Dispatch Planning"])
+
+MAX_LOADS = 10_000
+
+
+class DispatchLoad(SQLModel):
+    cargo_weight: float = Field(gt=0)
+    region: str
+    vehicle_type: Optional[str] = None
+
+
+# =========================
+# PLAN A BATCH OF LOADS
+# =========================
+@router.post("/plan", dependencies=[Depends(require_dispatcher_or_manager)])
+async def plan_dispatch(
+    loads: List[DispatchLoad],
+    trip_date: Optional[date] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+
+    if len(loads) > MAX_LOADS:
+        raise HTTPException(400, f"At most {MAX_LOADS} loads per plan")
+
+    trip_date = trip_date or date.today()
+
+    if availability.warm:
+        vehicles = [
+            (v["id"], v["max_capacity"], v["region"], v["vehicle_type"]) for v in availability.available_vehicles()
+        ]
+        drivers = [
+            (d["id"], d["safety_score"], d["risk_level"], d["license_expiry"]) for d in availability.available_drivers()
+        ]
+    else:
+        vehicles = (await session.exec(
+            select(Vehicle.id, Vehicle.max_capacity, Vehicle.region, Vehicle.vehicle_type)
+            .where(Vehicle.status == "available")
+        )).all()
+        drivers = (await session.exec(
+            select(Driver.id, Driver.safety_score, Driver.risk_level, Driver.license_expiry)
+            .where(Driver.status == "available", Driver.license_expiry >= trip_date)
+        )).all()
+
+    # Vehicles overdue for service are not offered.
+    vehicles = [v for v in vehicles if not maintenance_schedule.blocks(v[0])]
+
+    return plan_assignments(
+        [(load.cargo_weight, load.region, load.vehicle_type) for load in loads],
+        vehicles, drivers, trip_date,
+    )
+
+
+# =========================
+# AVAILABILITY INDEX STATS
+# =========================
+@router.get("/availability")
+async def availability_stats():
+    return availability.stats()
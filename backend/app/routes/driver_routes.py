@@ -1,41 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.db import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from app.db import engine, get_async_session, get_read_session
+from app.cache import analytics_cache
+from app.events import ChangeSet, event_broker
+from app.availability import availability
 from app.models.driver import Driver
+from app.pagination import PageParams, paginate
+from app.dependencies import require_manager, validated
+from app.safety import rescore_drivers
 
 router = APIRouter(prefix="/drivers", tags=["Driver Management"])
 
 @router.post("/")
-def create_driver(driver: Driver, session: Session = Depends(get_session)):
+async def create_driver(driver: Driver, session: AsyncSession = Depends(get_async_session)):
+    driver = validated(driver)
     session.add(driver)
-    session.commit()
-    session.refresh(driver)
+    await session.commit()
+    await analytics_cache.invalidate("driver")
+    await session.refresh(driver)
+
+    changes = ChangeSet()
+    changes.driver(driver, None, driver.status)
+    event_broker.publish(changes)
     return driver
 
 @router.get("/")
-def get_drivers(session: Session = Depends(get_session)):
-    return session.exec(select(Driver)).all()
+async def get_drivers(
+    response: Response,
+    status: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    ids: Optional[List[int]] = Query(None),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+    query = select(Driver)
+
+    if ids:
+        query = query.where(Driver.id.in_(ids))
+    if status:
+        query = query.where(Driver.status == status)
+    if risk_level:
+        query = query.where(Driver.risk_level == risk_level)
+
+    return await paginate(session, query, Driver.id, page, response)
+
+@router.post("/rescore", dependencies=[Depends(require_manager)])
+async def rescore_all_drivers(dry_run: bool = False):
+    # Batch job on the sync engine; keep it off the event loop.
+    result = await run_in_threadpool(rescore_drivers, engine, dry_run)
+    if not dry_run:
+        await analytics_cache.invalidate("driver")
+        # Scores changed without a status event; refresh the copies in the index.
+        await availability.reconcile()
+    return result
 
 @router.get("/available")
-def get_available_drivers(session: Session = Depends(get_session)):
-    return session.exec(
-        select(Driver).where(Driver.status == "available")
-    ).all()
+async def get_available_drivers(session: AsyncSession = Depends(get_async_session)):
+    if availability.warm:
+        return availability.available_drivers()
+
+    return (await session.exec(
+        select(Driver).where(Driver.status == "available").order_by(Driver.id)
+    )).all()
 
 @router.patch("/{driver_id}/suspend")
-def suspend_driver(driver_id: int, session: Session = Depends(get_session)):
-    driver = session.get(Driver, driver_id)
+async def suspend_driver(driver_id: int, session: AsyncSession = Depends(get_async_session)):
+    driver = await session.get(Driver, driver_id)
     if not driver:
         raise HTTPException(404, "Driver not found")
+    changes = ChangeSet()
+    changes.driver(driver, driver.status, "suspended")
     driver.status = "suspended"
-    session.commit()
+    await session.commit()
+    await analytics_cache.invalidate("driver")
+    event_broker.publish(changes)
     return {"message": "Driver suspended"}
 
 @router.patch("/{driver_id}/status")
-def change_driver_status(driver_id: int, status: str, session: Session = Depends(get_session)):
-    driver = session.get(Driver, driver_id)
+async def change_driver_status(driver_id: int, status: str, session: AsyncSession = Depends(get_async_session)):
+    driver = await session.get(Driver, driver_id)
     if not driver:
         raise HTTPException(404, "Driver not found")
+    changes = ChangeSet()
+    changes.driver(driver, driver.status, status)
     driver.status = status
-    session.commit()
+    await session.commit()
+    await analytics_cache.invalidate("driver")
+    event_broker.publish(changes)
     return {"message": f"Driver status updated to {status}"}
\ No newline at end of file
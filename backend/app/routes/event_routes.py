@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import require_login
+from app.events import event_broker
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+# =========================
+# CHANGE STREAM
+# =========================
+@router.get("/stream", dependencies=[Depends(require_login)])
+async def stream_events(last_event_id: Optional[str] = Header(None)):
+    return StreamingResponse(
+        event_broker.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# =========================
+# BROKER STATS
+# =========================
+@router.get("/stats")
+async def event_stats():
+    return event_broker.stats()
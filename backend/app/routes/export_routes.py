@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from starlette.concurrency import run_in_threadpool
+
+from app.archive import archive_files, read_archive_file
+from app.partitions import PARTITIONED
+from app.db import naive_utc, replica
+from app.dependencies import require_manager
+from app.models.trip import Trip
+from app.models.fuel import Fuel
+from app.models.maintenance import Maintenance
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+CHUNK_SIZE = 1000
+
+# kind -> (model, column used by the from/to filter)
+EXPORTS = {
+    "trips": (Trip, Trip.created_at),
+    "fuel": (Fuel, Fuel.fuel_date),
+    "maintenance": (Maintenance, Maintenance.service_date),
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _archived_rows(archive, columns):
+    # Archived months come first: they are older than anything still live.
+    for path in archive_files(archive["table"], archive["date_from"], archive["date_to"]):
+        rows = await run_in_threadpool(read_archive_file, path, **archive, columns=columns)
+        for batch in rows.to_batches(CHUNK_SIZE):
+            yield [tuple(row[c] for c in columns) for row in batch.to_pylist()]
+
+
+async def _stream_rows(session_factory, query, columns, fmt, archive=None):
+    # The request's session is closed once the handler returns, so the
+    # generator opens its own and keeps it for the life of the stream.
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=CHUNK_SIZE))
+
+        async def chunks():
+            if archive:
+                async for rows in _archived_rows(archive, columns):
+                    yield rows
+            async for rows in result.partitions(CHUNK_SIZE):
+                yield rows
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+
+            async for rows in chunks():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+            yield buffer.getvalue()
+            return
+
+        async for rows in chunks():
+            yield "".join(
+                json.dumps({c: _format_value(v) for c, v in zip(columns, row)}, default=str) + "\n"
+                for row in rows
+            )
+
+
+# =========================
+# EXPORT HISTORY
+# =========================
+@router.get("/{kind}", dependencies=[Depends(require_manager)])
+async def export_history(
+    request: Request,
+    kind: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    vehicle_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+):
+    if kind not in EXPORTS:
+        raise HTTPException(404, f"Unknown export '{kind}'")
+
+    model, date_column = EXPORTS[kind]
+    table = model.__table__
+    columns = [c.name for c in table.columns]
+
+    query = select(*table.columns)
+
+    # Bounds are compared as naive UTC, like the stored and archived rows.
+    if vehicle_id is not None:
+        query = query.where(table.c.vehicle_id == vehicle_id)
+    if date_from:
+        date_from = naive_utc(date_from)
+        query = query.where(date_column >= date_from)
+    if date_to:
+        date_to = naive_utc(date_to)
+        query = query.where(date_column < date_to)
+
+    query = query.order_by(table.c.id)
+
+    archive = None
+    if table.name in PARTITIONED:
+        archive = {
+            "table": table.name,
+            "date_from": date_from,
+            "date_to": date_to,
+            "filters": [] if vehicle_id is None else [("vehicle_id", "=", vehicle_id)],
+        }
+
+    return StreamingResponse(
+        _stream_rows(await replica.session_factory(request), query, columns, format, archive),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'},
+    )
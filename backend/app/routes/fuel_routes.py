@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.db import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from datetime import datetime
+from app.db import get_async_session, get_read_session, naive_utc
+from app.cache import analytics_cache
 from app.models.fuel import Fuel
 from app.models.vehicle import Vehicle
+from app.stats import record_fuel
+from app.fuel_anomalies import record_fuel_anomalies
+from app.pagination import PageParams, paginate
+from app.dependencies import validated
 
 router = APIRouter(prefix="/fuel", tags=["Fuel Logging"])
 
@@ -10,9 +18,12 @@ router = APIRouter(prefix="/fuel", tags=["Fuel Logging"])
 # ADD FUEL LOG
 # =========================
 @router.post("/")
-def add_fuel_log(log: Fuel, session: Session = Depends(get_session)):
+async def add_fuel_log(log: Fuel, session: AsyncSession = Depends(get_async_session)):
 
-    vehicle = session.get(Vehicle, log.vehicle_id)
+    log = validated(log)
+    log.fuel_date = naive_utc(log.fuel_date)
+
+    vehicle = await session.get(Vehicle, log.vehicle_id)
     if not vehicle:
         raise HTTPException(404, "Vehicle not found")
 
@@ -22,18 +33,21 @@ def add_fuel_log(log: Fuel, session: Session = Depends(get_session)):
     if log.cost <= 0:
         raise HTTPException(400, "Fuel cost must be greater than 0")
 
-    # Optional: calculate cost_per_liter dynamically
     cost_per_liter = log.cost / log.liters
 
     session.add(log)
-    session.commit()
+    await record_fuel(session, log)
+    anomalies = await record_fuel_anomalies(session, log, vehicle.odometer)
+    await session.commit()
+    await analytics_cache.invalidate("fuel")
 
     return {
         "message": "Fuel log added successfully",
         "vehicle_id": log.vehicle_id,
         "liters": log.liters,
         "total_cost": log.cost,
-        "cost_per_liter": round(cost_per_liter, 2)
+        "cost_per_liter": round(cost_per_liter, 2),
+        "anomalies": anomalies
     }
 
 
@@ -41,8 +55,27 @@ def add_fuel_log(log: Fuel, session: Session = Depends(get_session)):
 # LIST FUEL LOGS
 # =========================
 @router.get("/")
-def get_fuel_logs(session: Session = Depends(get_session)):
-    logs = session.exec(select(Fuel)).all()
+async def get_fuel_logs(
+    response: Response,
+    vehicle_id: Optional[int] = None,
+    trip_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+    query = select(Fuel)
+
+    if vehicle_id is not None:
+        query = query.where(Fuel.vehicle_id == vehicle_id)
+    if trip_id is not None:
+        query = query.where(Fuel.trip_id == trip_id)
+    if date_from:
+        query = query.where(Fuel.fuel_date >= naive_utc(date_from))
+    if date_to:
+        query = query.where(Fuel.fuel_date < naive_utc(date_to))
+
+    logs = await paginate(session, query, Fuel.id, page, response)
 
     enriched_logs = []
     for log in logs:
@@ -52,7 +85,8 @@ def get_fuel_logs(session: Session = Depends(get_session)):
             "vehicle_id": log.vehicle_id,
             "liters": log.liters,
             "total_cost": log.cost,
-            "cost_per_liter": round(cost_per_liter, 2)
+            "cost_per_liter": round(cost_per_liter, 2),
+            "fuel_date": log.fuel_date
         })
 
     return enriched_logs
\ No newline at end of file
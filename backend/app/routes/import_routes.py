@@ -0,0 +1,52 @@
+import io
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.db import engine
+from app.cache import analytics_cache
+from app.dependencies import require_manager
+from app.importer import IMPORTS, import_logs
+from app.maintenance_schedule import maintenance_schedule
+
+router = APIRouter(prefix="/import", tags=["Import"])
+
+
+def _detect_format(filename: Optional[str]) -> str:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+# =========================
+# IMPORT HISTORY
+# =========================
+@router.post("/{kind}", dependencies=[Depends(require_manager)])
+async def import_history(
+    kind: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+):
+    if kind not in IMPORTS:
+        raise HTTPException(404, f"Unknown import '{kind}'")
+
+    fmt = format or _detect_format(file.filename)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+
+    try:
+        # The loader uses the sync engine (COPY needs psycopg2), so keep it
+        # off the event loop.
+        report = await run_in_threadpool(import_logs, engine, kind, stream, fmt)
+    except UnicodeDecodeError:
+        raise HTTPException(400, "File must be UTF-8 encoded")
+    finally:
+        stream.detach()
+        # Chunks commit independently, so even a failed import may have written rows.
+        await analytics_cache.invalidate(kind)
+
+    if kind == "maintenance":
+        # Other workers pick the new services up on their next reconcile.
+        await maintenance_schedule.reconcile()
+
+    return report
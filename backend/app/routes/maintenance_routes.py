@@ -1,26 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.db import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from datetime import datetime
+from app.db import get_async_session, get_read_session, naive_utc
+from app.cache import analytics_cache
+from app.events import ChangeSet, event_broker
 from app.models.maintenance import Maintenance
 from app.models.vehicle import Vehicle
+from app.stats import record_maintenance
+from app.maintenance_schedule import maintenance_schedule, record_service
+from app.pagination import PageParams, paginate
+from app.dependencies import validated
 
 router = APIRouter(prefix="/maintenance", tags=["Maintenance"])
 
+# Services that count as urgent repairs (?urgent=true)
+URGENT_SERVICES = ("engine", "body")
+
 # =========================
 # ADD MAINTENANCE
 # =========================
 @router.post("/")
-def add_maintenance(log: Maintenance, session: Session = Depends(get_session)):
+async def add_maintenance(log: Maintenance, session: AsyncSession = Depends(get_async_session)):
+
+    log = validated(log)
+    log.service_date = naive_utc(log.service_date)
 
-    vehicle = session.get(Vehicle, log.vehicle_id)
+    vehicle = await session.get(Vehicle, log.vehicle_id)
     if not vehicle:
         raise HTTPException(404, "Vehicle not found")
 
     # Auto move vehicle to in_shop
+    changes = ChangeSet()
+    changes.vehicle(vehicle, vehicle.status, "in_shop")
     vehicle.status = "in_shop"
 
     session.add(log)
-    session.commit()
+    await record_maintenance(session, log)
+    if await record_service(session, vehicle, log.service_date):
+        changes.serviced(vehicle, log.service_date)
+    await session.commit()
+    await analytics_cache.invalidate("maintenance", "vehicle")
+    event_broker.publish(changes)
 
     return {"message": "Maintenance logged. Vehicle moved to in_shop."}
 
@@ -29,5 +51,49 @@ def add_maintenance(log: Maintenance, session: Session = Depends(get_session)):
 # LIST MAINTENANCE
 # =========================
 @router.get("/")
-def get_maintenance(session: Session = Depends(get_session)):
-    return session.exec(select(Maintenance)).all()
\ No newline at end of file
+async def get_maintenance(
+    response: Response,
+    vehicle_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    urgent: bool = False,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+    query = select(Maintenance)
+
+    if vehicle_id is not None:
+        query = query.where(Maintenance.vehicle_id == vehicle_id)
+    if date_from:
+        query = query.where(Maintenance.service_date >= naive_utc(date_from))
+    if date_to:
+        query = query.where(Maintenance.service_date < naive_utc(date_to))
+    if urgent:
+        query = query.where(or_(*(Maintenance.description.ilike(f"%{s}%") for s in URGENT_SERVICES)))
+
+    return await paginate(session, query, Maintenance.id, page, response)
+
+
+# =========================
+# VEHICLES DUE FOR SERVICE
+# =========================
+@router.get("/due")
+async def get_maintenance_due(
+    limit: int = Query(20, ge=1, le=1000),
+    only_due: bool = False
+):
+    if not maintenance_schedule.warm:
+        await maintenance_schedule.reconcile()
+
+    due = maintenance_schedule.most_due(limit)
+    if only_due:
+        due = [v for v in due if v["due_ratio"] >= 1]
+    return due
+
+
+# =========================
+# SCHEDULE STATS
+# =========================
+@router.get("/schedule")
+async def maintenance_schedule_stats():
+    return maintenance_schedule.stats()
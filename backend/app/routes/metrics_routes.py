@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app import metrics
+from app.db import replica
+
+router = APIRouter(tags=["Metrics"])
+
+
+# =========================
+# PROMETHEUS METRICS
+# =========================
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# =========================
+# READ REPLICA ROUTING
+# =========================
+@router.get("/metrics/replica")
+async def replica_stats():
+    return replica.stats()
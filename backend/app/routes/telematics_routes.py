@@ -0,0 +1,48 @@
+import os
+import secrets
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+
+from app.dependencies import require_dispatcher_or_manager
+from app.telematics import BufferFull, TelematicsEvent, telematics_buffer
+
+router = APIRouter(prefix="/telematics", tags=["Telematics"])
+
+MAX_BATCH_SIZE = 10_000
+
+# Shared secret for devices. Without it only logged-in dispatchers and
+# managers can post events, since they feed the driver safety scores.
+TELEMATICS_TOKEN = os.getenv("TELEMATICS_TOKEN")
+
+
+async def require_device(request: Request, x_telematics_token: Optional[str] = Header(None)):
+    if not TELEMATICS_TOKEN:
+        await require_dispatcher_or_manager(request)
+    elif not secrets.compare_digest(x_telematics_token or "", TELEMATICS_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid telematics token")
+
+
+# =========================
+# INGEST EVENTS
+# =========================
+@router.post("/events", status_code=202, dependencies=[Depends(require_device)])
+async def ingest_events(events: List[TelematicsEvent]):
+
+    if len(events) > MAX_BATCH_SIZE:
+        raise HTTPException(400, f"At most {MAX_BATCH_SIZE} events per request")
+
+    try:
+        telematics_buffer.add(events)
+    except BufferFull:
+        raise HTTPException(503, "Telematics buffer full, retry later")
+
+    return {"accepted": len(events)}
+
+
+# =========================
+# BUFFER STATS
+# =========================
+@router.get("/stats")
+async def telematics_stats():
+    return telematics_buffer.stats()
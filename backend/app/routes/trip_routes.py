@@ -1,47 +1,174 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from datetime import date
-from app.db import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import SQLModel, select, update
+from pydantic import ValidationError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime
+from app.db import get_async_session, get_read_session, naive_utc
+from app.cache import analytics_cache
+from app.events import ChangeSet, event_broker
+from app.availability import availability
+from app.maintenance_schedule import maintenance_schedule
 from app.models.trip import Trip
 from app.models.vehicle import Vehicle
 from app.models.driver import Driver
-from app.dependencies import require_dispatcher_or_manager
-import random
+from app.dependencies import require_dispatcher_or_manager, validated
+from app.stats import record_trip_completed, record_trips_completed
+from app.safety import apply_trip, is_night
+from app.telematics import telematics_buffer
+from app.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/trips", tags=["Trip Management"])
 
-# =============================
-# CREATE TRIP
-# =============================
-@router.post("/", dependencies=[Depends(require_dispatcher_or_manager)])
-def create_trip(trip: Trip, session: Session = Depends(get_session)):
+MAX_BULK_SIZE = 5000
+
+
+class TripCompletion(SQLModel):
+    trip_id: int
+    end_odometer: float
+    revenue: float
+
+
+async def _claim(session: AsyncSession, model, row_id: int, expected: str, new_status: str) -> bool:
+    """
+    Move a row from `expected` to `new_status` with a single conditional
+    UPDATE. Concurrent callers race on the row lock and only one of them
+    matches the WHERE clause, so the loser gets False instead of a double booking.
+    """
+    result = await session.execute(
+        update(model)
+        .where(model.id == row_id, model.status == expected)
+        .values(status=new_status)
+    )
+    return result.rowcount == 1
+
 
-    vehicle = session.get(Vehicle, trip.vehicle_id)
-    driver = session.get(Driver, trip.driver_id)
+async def _claim_many(session: AsyncSession, model, row_ids, expected: str, new_status: str) -> set:
+    """Set-based _claim: returns the ids that were actually moved."""
+    if not row_ids:
+        return set()
+
+    result = await session.execute(
+        update(model)
+        .where(model.id.in_(list(row_ids)), model.status == expected)
+        .values(status=new_status)
+        .returning(model.id)
+    )
+    return set(result.scalars())
+
+
+async def _load_by_id(session: AsyncSession, model, row_ids, for_update: bool = False) -> dict:
+    if not row_ids:
+        return {}
+
+    # Sorted ids keep lock acquisition order stable across concurrent batches.
+    query = select(model).where(model.id.in_(sorted(row_ids))).order_by(model.id)
+    if for_update:
+        # Locked rows are read fresh, not from the identity map.
+        query = query.with_for_update().execution_options(populate_existing=True)
+
+    return {row.id: row for row in (await session.exec(query)).all()}
+
+
+def _dispatch_error(trip: Trip, vehicle: Optional[Vehicle], driver: Optional[Driver]):
+    """Return (status_code, detail) if the trip cannot be dispatched, else None."""
 
     if not vehicle or not driver:
-        raise HTTPException(404, "Vehicle or Driver not found")
+        return 404, "Vehicle or Driver not found"
 
     if vehicle.status != "available":
-        raise HTTPException(400, "Vehicle not available")
+        return 400, "Vehicle not available"
 
     if driver.status != "available":
-        raise HTTPException(400, "Driver not available")
+        return 400, "Driver not available"
 
     if driver.license_expiry < date.today():
-        raise HTTPException(400, "Driver license expired")
+        return 400, "Driver license expired"
 
     if trip.cargo_weight > vehicle.max_capacity:
-        raise HTTPException(400, "Cargo exceeds vehicle capacity")
+        return 400, "Cargo exceeds vehicle capacity"
 
-    trip.status = "dispatched"
+    if maintenance_schedule.blocks(vehicle.id):
+        return 400, "Vehicle is overdue for maintenance"
+
+    return None
+
+
+def _finish_trip(trip: Trip, vehicle: Vehicle, driver: Driver, end_odometer: float, revenue: float):
+    """Apply a completion to rows the caller has already claimed and locked."""
+
+    # ---------------------------
+    # COMPLETE TRIP DATA
+    # ---------------------------
+    trip.status = "completed"
+    trip.end_odometer = end_odometer
+    trip.revenue = revenue
+
+    # Overspeed, harsh brake and accident counters were accumulated from
+    # telematics events while the trip was dispatched.
+
+    # Night detection based on created_at time
+    trip.is_night_trip = is_night(trip.created_at.hour)
+
+    # ---------------------------
+    # 🔥 UPDATE DRIVER SAFETY SCORE
+    # ---------------------------
+    apply_trip(driver, trip)
+
+    # ---------------------------
+    # UPDATE OTHER FIELDS
+    # ---------------------------
+    # Release only what this trip was holding (the rows are locked, so this
+    # is the same on_trip -> available claim cancel_trip makes); a vehicle
+    # moved to the shop or a driver suspended during the trip keeps that status.
+    if driver.status == "on_trip":
+        driver.status = "available"
+    driver.trip_completed += 1
 
-    vehicle.status = "on_trip"
-    driver.status = "on_trip"
+    if vehicle.status == "on_trip":
+        vehicle.status = "available"
+    vehicle.odometer = end_odometer
+
+
+# =============================
+# CREATE TRIP
+# =============================
+@router.post("/", dependencies=[Depends(require_dispatcher_or_manager)])
+async def create_trip(trip: Trip, session: AsyncSession = Depends(get_async_session)):
+
+    trip = validated(trip)
+
+    # The availability index answers the usual case without a query; anything
+    # it does not show as available is re-read before the trip is rejected.
+    vehicle = availability.available_vehicle(trip.vehicle_id) or await session.get(Vehicle, trip.vehicle_id)
+    driver = availability.available_driver(trip.driver_id) or await session.get(Driver, trip.driver_id)
+
+    error = _dispatch_error(trip, vehicle, driver)
+    if error:
+        raise HTTPException(*error)
+
+    # The checks above read unlocked rows; the claims below are what
+    # actually reserve the vehicle and driver (always in that order).
+    if not await _claim(session, Vehicle, vehicle.id, "available", "on_trip"):
+        await session.rollback()
+        raise HTTPException(400, "Vehicle not available")
+
+    if not await _claim(session, Driver, driver.id, "available", "on_trip"):
+        await session.rollback()
+        raise HTTPException(400, "Driver not available")
+
+    trip.status = "dispatched"
 
     session.add(trip)
-    session.commit()
-    session.refresh(trip)
+    await session.commit()
+    await analytics_cache.invalidate("trip", "vehicle", "driver")
+    await session.refresh(trip)
+
+    changes = ChangeSet()
+    changes.trip("dispatched", trip)
+    changes.vehicle(vehicle, "available", "on_trip")
+    changes.driver(driver, "available", "on_trip")
+    event_broker.publish(changes)
 
     return trip
 
@@ -50,22 +177,23 @@ def create_trip(trip: Trip, session: Session = Depends(get_session)):
 # COMPLETE TRIP
 # =============================
 @router.patch("/{trip_id}/complete", dependencies=[Depends(require_dispatcher_or_manager)])
-def complete_trip(
+async def complete_trip(
     trip_id: int,
     end_odometer: float,
     revenue: float,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
 
-    trip = session.get(Trip, trip_id)
+    # Land this worker's buffered telematics events on the counters first; a
+    # failed flush keeps them buffered and must not block the completion.
+    await telematics_buffer.flush_logged()
+
+    trip = await session.get(Trip, trip_id)
     if not trip:
         raise HTTPException(404, "Trip not found")
 
-    if trip.status == "completed":
-        raise HTTPException(400, "Trip already completed")
-
-    vehicle = session.get(Vehicle, trip.vehicle_id)
-    driver = session.get(Driver, trip.driver_id)
+    if trip.status != "dispatched":
+        raise HTTPException(409, f"Only dispatched trips can be completed (trip is {trip.status})")
 
     # ---------------------------
     # BASIC VALIDATION
@@ -73,72 +201,35 @@ def complete_trip(
     if end_odometer < trip.start_odometer:
         raise HTTPException(400, "End odometer cannot be less than start")
 
-    # ---------------------------
-    # COMPLETE TRIP DATA
-    # ---------------------------
-    trip.status = "completed"
-    trip.end_odometer = end_odometer
-    trip.revenue = revenue
-
-    distance = end_odometer - trip.start_odometer
+    # Only one concurrent completion can win the trip row; the vehicle and
+    # driver rows are then locked so their score/status updates do not interleave.
+    if not await _claim(session, Trip, trip.id, "dispatched", "completed"):
+        await session.rollback()
+        raise HTTPException(409, "Trip was completed or cancelled concurrently")
 
-    # ---------------------------
-    # 🔥 RANDOM BEHAVIOUR SIMULATION
-    # ---------------------------
+    # Re-read the telematics counters now that the claim holds the row.
+    await session.refresh(trip)
 
-    # Overspeed depends on distance (more realistic)
-    if distance > 300:
-        trip.overspeed_count = random.randint(2, 7)
-    else:
-        trip.overspeed_count = random.randint(0, 3)
+    vehicle = await session.get(Vehicle, trip.vehicle_id, with_for_update=True)
+    driver = await session.get(Driver, trip.driver_id, with_for_update=True)
 
-    trip.harsh_brake_count = random.randint(0, 4)
+    previous = vehicle.status, driver.status
 
-    # 10% accident probability
-    trip.accident_reported = random.random() < 0.1
+    _finish_trip(trip, vehicle, driver, end_odometer, revenue)
 
-    # Night detection based on created_at time
-    hour = trip.created_at.hour
-    trip.is_night_trip = hour >= 22 or hour <= 5
+    changes = ChangeSet()
+    changes.trip("completed", trip)
+    changes.vehicle(vehicle, previous[0], vehicle.status)
+    changes.driver(driver, previous[1], driver.status)
 
-    # ---------------------------
-    # 🔥 UPDATE DRIVER SAFETY SCORE
-    # ---------------------------
-
-    score = driver.safety_score or 100
-
-    score -= trip.overspeed_count * 2
-    score -= trip.harsh_brake_count * 1.5
-
-    if trip.accident_reported:
-        score -= 20
-
-    if trip.is_night_trip:
-        score -= 3
-
-    driver.safety_score = max(score, 0)
-
-    # Risk classification
-    if driver.safety_score >= 75:
-        driver.risk_level = "Low"
-    elif driver.safety_score >= 50:
-        driver.risk_level = "Medium"
-    else:
-        driver.risk_level = "High"
-
-    # ---------------------------
-    # UPDATE OTHER FIELDS
-    # ---------------------------
-    driver.status = "available"
-    driver.trip_completed += 1
-
-    vehicle.status = "available"
-    vehicle.odometer = end_odometer
+    await record_trip_completed(session, trip)
 
     session.add(trip)
     session.add(driver)
     session.add(vehicle)
-    session.commit()
+    await session.commit()
+    await analytics_cache.invalidate("trip", "vehicle", "driver")
+    event_broker.publish(changes)
 
     return {
         "message": "Trip completed successfully",
@@ -154,31 +245,248 @@ def complete_trip(
 # CANCEL TRIP
 # =============================
 @router.patch("/{trip_id}/cancel", dependencies=[Depends(require_dispatcher_or_manager)])
-def cancel_trip(trip_id: int, session: Session = Depends(get_session)):
+async def cancel_trip(trip_id: int, session: AsyncSession = Depends(get_async_session)):
 
-    trip = session.get(Trip, trip_id)
+    trip = await session.get(Trip, trip_id)
     if not trip:
         raise HTTPException(404, "Trip not found")
 
-    vehicle = session.get(Vehicle, trip.vehicle_id)
-    driver = session.get(Driver, trip.driver_id)
+    previous_status = trip.status
+    if previous_status not in ("draft", "dispatched"):
+        raise HTTPException(400, f"Trip already {previous_status}")
 
-    trip.status = "cancelled"
+    if not await _claim(session, Trip, trip.id, previous_status, "cancelled"):
+        await session.rollback()
+        raise HTTPException(400, "Trip was modified concurrently")
 
-    if vehicle:
-        vehicle.status = "available"
+    changes = ChangeSet()
+    changes.trip("cancelled", trip, previous=previous_status)
 
-    if driver:
-        driver.status = "available"
+    # Release only what this trip was holding; a vehicle moved to the shop
+    # in the meantime stays there.
+    if previous_status == "dispatched":
+        if await _claim(session, Vehicle, trip.vehicle_id, "on_trip", "available"):
+            changes.vehicle(await session.get(Vehicle, trip.vehicle_id), "on_trip", "available")
+        if await _claim(session, Driver, trip.driver_id, "on_trip", "available"):
+            changes.driver(await session.get(Driver, trip.driver_id), "on_trip", "available")
+    else:
+        changes.pending_trips((await session.get(Vehicle, trip.vehicle_id)).region, -1)
 
-    session.commit()
+    await session.commit()
+    await analytics_cache.invalidate("trip", "vehicle", "driver")
+    event_broker.publish(changes)
 
     return {"message": "Trip cancelled"}
 
 
+# =============================
+# BULK CREATE TRIPS
+# =============================
+@router.post("/bulk", dependencies=[Depends(require_dispatcher_or_manager)])
+async def create_trips_bulk(trips: List[Trip], session: AsyncSession = Depends(get_async_session)):
+
+    if len(trips) > MAX_BULK_SIZE:
+        raise HTTPException(400, f"At most {MAX_BULK_SIZE} trips per batch")
+
+    errors = []
+    candidates = []
+
+    for index, trip in enumerate(trips):
+        try:
+            candidates.append((index, Trip.model_validate(trip, from_attributes=True)))
+        except ValidationError as e:
+            errors.append({"index": index, "status_code": 422, "detail": e.errors(include_url=False)})
+
+    vehicles = availability.available_vehicles_by_id({t.vehicle_id for _, t in candidates})
+    drivers = availability.available_drivers_by_id({t.driver_id for _, t in candidates})
+    vehicles.update(await _load_by_id(session, Vehicle, {t.vehicle_id for _, t in candidates} - vehicles.keys()))
+    drivers.update(await _load_by_id(session, Driver, {t.driver_id for _, t in candidates} - drivers.keys()))
+
+    # ---------------------------
+    # VALIDATE IN MEMORY
+    # ---------------------------
+    accepted = []
+    booked_vehicles = set()
+    booked_drivers = set()
+
+    for index, trip in candidates:
+        vehicle = vehicles.get(trip.vehicle_id)
+        driver = drivers.get(trip.driver_id)
+
+        error = _dispatch_error(trip, vehicle, driver)
+        if not error and trip.vehicle_id in booked_vehicles:
+            error = 400, "Vehicle already used earlier in this batch"
+        if not error and trip.driver_id in booked_drivers:
+            error = 400, "Driver already used earlier in this batch"
+
+        if error:
+            errors.append({"index": index, "status_code": error[0], "detail": error[1]})
+            continue
+
+        booked_vehicles.add(trip.vehicle_id)
+        booked_drivers.add(trip.driver_id)
+        accepted.append((index, trip))
+
+    # ---------------------------
+    # CLAIM VEHICLES AND DRIVERS
+    # ---------------------------
+    claimed_vehicles = await _claim_many(session, Vehicle, booked_vehicles, "available", "on_trip")
+    claimed_drivers = await _claim_many(session, Driver, booked_drivers, "available", "on_trip")
+
+    created = []
+    for index, trip in accepted:
+        if trip.vehicle_id in claimed_vehicles and trip.driver_id in claimed_drivers:
+            trip.status = "dispatched"
+            created.append((index, trip))
+            continue
+
+        # Lost a race with another dispatcher: hand back whichever half we got.
+        detail = "Vehicle not available" if trip.vehicle_id not in claimed_vehicles else "Driver not available"
+        errors.append({"index": index, "status_code": 400, "detail": detail})
+
+    lost_vehicles = claimed_vehicles - {t.vehicle_id for _, t in created}
+    lost_drivers = claimed_drivers - {t.driver_id for _, t in created}
+    await _claim_many(session, Vehicle, lost_vehicles, "on_trip", "available")
+    await _claim_many(session, Driver, lost_drivers, "on_trip", "available")
+
+    session.add_all(trip for _, trip in created)
+    await session.commit()
+    await analytics_cache.invalidate("trip", "vehicle", "driver")
+
+    changes = ChangeSet()
+    for _, trip in created:
+        changes.trip("dispatched", trip)
+        changes.vehicle(vehicles[trip.vehicle_id], "available", "on_trip")
+        changes.driver(drivers[trip.driver_id], "available", "on_trip")
+    event_broker.publish(changes)
+
+    return {
+        "created": [{"index": index, **trip.model_dump()} for index, trip in created],
+        "errors": sorted(errors, key=lambda e: e["index"]),
+    }
+
+
+# =============================
+# BULK COMPLETE TRIPS
+# =============================
+@router.patch("/complete/bulk", dependencies=[Depends(require_dispatcher_or_manager)])
+async def complete_trips_bulk(
+    completions: List[TripCompletion],
+    session: AsyncSession = Depends(get_async_session)
+):
+
+    if len(completions) > MAX_BULK_SIZE:
+        raise HTTPException(400, f"At most {MAX_BULK_SIZE} trips per batch")
+
+    await telematics_buffer.flush_logged()
+
+    trips = await _load_by_id(session, Trip, {c.trip_id for c in completions})
+
+    # ---------------------------
+    # VALIDATE IN MEMORY
+    # ---------------------------
+    errors = []
+    pending = {}
+
+    for index, completion in enumerate(completions):
+        trip = trips.get(completion.trip_id)
+
+        if not trip:
+            error = 404, "Trip not found"
+        elif completion.trip_id in pending:
+            error = 400, "Trip already completed earlier in this batch"
+        elif trip.status != "dispatched":
+            error = 409, f"Only dispatched trips can be completed (trip is {trip.status})"
+        elif completion.end_odometer < trip.start_odometer:
+            error = 400, "End odometer cannot be less than start"
+        else:
+            pending[completion.trip_id] = (index, completion)
+            continue
+
+        errors.append({"index": index, "trip_id": completion.trip_id, "status_code": error[0], "detail": error[1]})
+
+    # ---------------------------
+    # CLAIM TRIPS, LOCK VEHICLES AND DRIVERS
+    # ---------------------------
+    claimed = await _claim_many(session, Trip, pending.keys(), "dispatched", "completed")
+
+    for trip_id in pending.keys() - claimed:
+        index, _ = pending.pop(trip_id)
+        errors.append({
+            "index": index, "trip_id": trip_id, "status_code": 409,
+            "detail": "Trip was completed or cancelled concurrently",
+        })
+
+    # Re-read the telematics counters of the claimed trips under their row locks.
+    trips.update(await _load_by_id(session, Trip, claimed, for_update=True))
+
+    vehicles = await _load_by_id(session, Vehicle, {trips[t].vehicle_id for t in pending}, for_update=True)
+    drivers = await _load_by_id(session, Driver, {trips[t].driver_id for t in pending}, for_update=True)
+
+    completed = []
+    changes = ChangeSet()
+    for trip_id, (index, completion) in sorted(pending.items(), key=lambda item: item[1][0]):
+        trip = trips[trip_id]
+        vehicle = vehicles[trip.vehicle_id]
+        driver = drivers[trip.driver_id]
+
+        previous = vehicle.status, driver.status
+
+        _finish_trip(trip, vehicle, driver, completion.end_odometer, completion.revenue)
+
+        changes.trip("completed", trip)
+        changes.vehicle(vehicle, previous[0], vehicle.status)
+        changes.driver(driver, previous[1], driver.status)
+
+        completed.append({
+            "index": index,
+            "trip_id": trip_id,
+            "overspeed_count": trip.overspeed_count,
+            "harsh_brake_count": trip.harsh_brake_count,
+            "accident_reported": trip.accident_reported,
+            "new_safety_score": driver.safety_score,
+            "risk_level": driver.risk_level
+        })
+
+    await record_trips_completed(session, [trips[t] for t in pending])
+    await session.commit()
+    await analytics_cache.invalidate("trip", "vehicle", "driver")
+    event_broker.publish(changes)
+
+    return {
+        "completed": completed,
+        "errors": sorted(errors, key=lambda e: e["index"]),
+    }
+
+
 # =============================
 # LIST TRIPS
 # =============================
 @router.get("/", dependencies=[Depends(require_dispatcher_or_manager)])
-def get_trips(session: Session = Depends(get_session)):
-    return session.query(Trip).all()
\ No newline at end of file
+async def get_trips(
+    response: Response,
+    status: Optional[str] = None,
+    vehicle_id: Optional[int] = None,
+    vehicle_ids: Optional[List[int]] = Query(None),
+    driver_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+    query = select(Trip)
+
+    if status:
+        query = query.where(Trip.status == status)
+    if vehicle_id is not None:
+        query = query.where(Trip.vehicle_id == vehicle_id)
+    if vehicle_ids:
+        query = query.where(Trip.vehicle_id.in_(vehicle_ids))
+    if driver_id is not None:
+        query = query.where(Trip.driver_id == driver_id)
+    if date_from:
+        query = query.where(Trip.created_at >= naive_utc(date_from))
+    if date_to:
+        query = query.where(Trip.created_at < naive_utc(date_to))
+
+    return await paginate(session, query, Trip.id, page, response)
\ No newline at end of file
@@ -1,68 +1,113 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.db import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.db import get_async_session, get_read_session
+from app.cache import analytics_cache
+from app.events import ChangeSet, event_broker
+from app.availability import availability
+from app.maintenance_schedule import record_service
 from app.models.vehicle import Vehicle
 from fastapi import Depends
-from app.dependencies import require_manager, require_dispatcher_or_manager
+from app.dependencies import require_manager, require_dispatcher_or_manager, validated
 from sqlmodel import select
-from app.models.trip import Trip
-from app.models.fuel import Fuel
+from app.models.vehicle_stats import VehicleStats
+from app.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/vehicles", tags=["Vehicle Registry"])
 
 @router.post("/", dependencies=[Depends(require_manager)])
-def create_vehicle(vehicle: Vehicle, session: Session = Depends(get_session)):
+async def create_vehicle(vehicle: Vehicle, session: AsyncSession = Depends(get_async_session)):
+    vehicle = validated(vehicle)
     session.add(vehicle)
-    session.commit()
-    session.refresh(vehicle)
+    await session.flush()
+
+    # A new vehicle starts its first service interval now.
+    registered_at = datetime.utcnow()
+    await record_service(session, vehicle, registered_at)
+
+    await session.commit()
+    await analytics_cache.invalidate("vehicle")
+    await session.refresh(vehicle)
+
+    changes = ChangeSet()
+    changes.vehicle(vehicle, None, vehicle.status)
+    changes.serviced(vehicle, registered_at)
+    event_broker.publish(changes)
     return vehicle
 
 @router.get("/", dependencies=[Depends(require_dispatcher_or_manager)])
-def get_vehicles(session: Session = Depends(get_session)):
-    return session.exec(select(Vehicle)).all()
+async def get_vehicles(
+    response: Response,
+    status: Optional[str] = None,
+    region: Optional[str] = None,
+    vehicle_type: Optional[str] = None,
+    ids: Optional[List[int]] = Query(None),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session)
+):
+    query = select(Vehicle)
+
+    if ids:
+        query = query.where(Vehicle.id.in_(ids))
+    if status:
+        query = query.where(Vehicle.status == status)
+    if region:
+        query = query.where(Vehicle.region == region)
+    if vehicle_type:
+        query = query.where(Vehicle.vehicle_type == vehicle_type)
+
+    return await paginate(session, query, Vehicle.id, page, response)
 
 @router.get("/available", dependencies=[Depends(require_dispatcher_or_manager)])
-def get_available_vehicles(session: Session = Depends(get_session)):
-    return session.exec(
-        select(Vehicle).where(Vehicle.status == "available")
-    ).all()
+async def get_available_vehicles(
+    region: Optional[str] = None,
+    vehicle_type: Optional[str] = None,
+    min_capacity: Optional[float] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    if availability.warm:
+        return availability.available_vehicles(region, vehicle_type, min_capacity)
+
+    query = select(Vehicle).where(Vehicle.status == "available")
+    if region:
+        query = query.where(Vehicle.region == region)
+    if vehicle_type:
+        query = query.where(Vehicle.vehicle_type == vehicle_type)
+    if min_capacity is not None:
+        query = query.where(Vehicle.max_capacity >= min_capacity).order_by(Vehicle.max_capacity, Vehicle.id)
+    else:
+        query = query.order_by(Vehicle.id)
+    return (await session.exec(query)).all()
 
 @router.patch("/{vehicle_id}/retire", dependencies=[Depends(require_manager)])
-def retire_vehicle(vehicle_id: int, session: Session = Depends(get_session)):
-    vehicle = session.get(Vehicle, vehicle_id)
+async def retire_vehicle(vehicle_id: int, session: AsyncSession = Depends(get_async_session)):
+    vehicle = await session.get(Vehicle, vehicle_id)
     if not vehicle:
         raise HTTPException(404, "Vehicle not found")
+    changes = ChangeSet()
+    changes.vehicle(vehicle, vehicle.status, "retired")
     vehicle.status = "retired"
-    session.commit()
+    await session.commit()
+    await analytics_cache.invalidate("vehicle")
+    event_broker.publish(changes)
     return {"message": "Vehicle retired"}
 
 # =========================
 # VEHICLE GRADE
 # =========================
 @router.get("/{vehicle_id}/grade")
-def vehicle_grade(vehicle_id: int, session: Session = Depends(get_session)):
+async def vehicle_grade(vehicle_id: int, session: AsyncSession = Depends(get_read_session)):
 
-    vehicle = session.get(Vehicle, vehicle_id)
+    vehicle = await session.get(Vehicle, vehicle_id)
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
 
-    trips = session.exec(
-        select(Trip).where(
-            Trip.vehicle_id == vehicle_id,
-            Trip.status == "completed"
-        )
-    ).all()
-
-    fuel_logs = session.exec(
-        select(Fuel).where(Fuel.vehicle_id == vehicle_id)
-    ).all()
-
-    total_km = 0
-    for trip in trips:
-        if trip.end_odometer and trip.start_odometer:
-            total_km += (trip.end_odometer - trip.start_odometer)
+    stats = await session.get(VehicleStats, vehicle_id) or VehicleStats(vehicle_id=vehicle_id)
 
-    total_liters = sum(f.liters for f in fuel_logs)
+    total_km = stats.total_km
+    total_liters = stats.total_liters
 
     efficiency = (total_km / total_liters) if total_liters else 0
 
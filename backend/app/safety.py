@@ -0,0 +1,174 @@
+"""
+Driver safety scoring.
+
+Every completed trip deducts a penalty from the driver's score, which starts
+at BASE_SCORE and never drops below zero:
+
+    overspeed x 2, harsh brake x 1.5, accident 20, night trip 3
+
+Penalties are never negative, so a driver's score is simply BASE_SCORE minus
+the sum of their trip penalties, clamped at zero. complete_trip applies one
+trip at a time with apply_trip(); rescore_drivers() recomputes every driver
+from trip history, archived months included, in one vectorised pass, e.g.
+after the weights change.
+
+NumPy is only needed by the batch functions and is imported inside them, so
+importing this module for apply_trip does not add it to worker start-up.
+"""
+from sqlalchemy import bindparam, select, update
+
+from app.archive import read_archive
+from app.models.trip import Trip
+from app.models.driver import Driver
+
+BASE_SCORE = 100
+
+OVERSPEED_PENALTY = 2
+HARSH_BRAKE_PENALTY = 1.5
+ACCIDENT_PENALTY = 20
+NIGHT_PENALTY = 3
+
+# Minimum score for each risk level; anything lower is "High".
+LOW_RISK_MIN = 75
+MEDIUM_RISK_MIN = 50
+
+CHUNK_SIZE = 100_000
+
+# Trip columns rescoring reads, driver first.
+BEHAVIOUR_COLUMNS = ["driver_id", "overspeed_count", "harsh_brake_count", "accident_reported", "is_night_trip"]
+
+
+def is_night(hour: int) -> bool:
+    return hour >= 22 or hour <= 5
+
+
+def trip_penalty(overspeed_count, harsh_brake_count, accident_reported, is_night_trip):
+    """Penalty for one trip; also works element-wise on NumPy arrays."""
+    return (
+        overspeed_count * OVERSPEED_PENALTY
+        + harsh_brake_count * HARSH_BRAKE_PENALTY
+        + accident_reported * ACCIDENT_PENALTY
+        + is_night_trip * NIGHT_PENALTY
+    )
+
+
+def risk_level(score: float) -> str:
+    if score >= LOW_RISK_MIN:
+        return "Low"
+    if score >= MEDIUM_RISK_MIN:
+        return "Medium"
+    return "High"
+
+
+def apply_trip(driver: Driver, trip: Trip):
+    """Deduct one completed trip from the driver's score and reclassify them."""
+    score = BASE_SCORE if driver.safety_score is None else driver.safety_score
+
+    score -= trip_penalty(
+        trip.overspeed_count, trip.harsh_brake_count,
+        int(trip.accident_reported), int(trip.is_night_trip),
+    )
+
+    driver.safety_score = max(score, 0)
+    driver.risk_level = risk_level(driver.safety_score)
+
+
+# =========================
+# BATCH RESCORING
+# =========================
+def penalty_totals(indexes, overspeed, harsh_brake, accident, night, size: int):
+    """
+    Sum trip penalties per driver. The trip columns are parallel NumPy
+    arrays and indexes holds each trip's driver as a position in 0..size-1;
+    the result has `size` entries.
+    """
+    import numpy as np
+
+    return np.bincount(
+        indexes, weights=trip_penalty(overspeed, harsh_brake, accident, night), minlength=size
+    )
+
+
+def classify(penalties):
+    """Vectorised scores and risk levels from per-driver penalty totals."""
+    import numpy as np
+
+    scores = np.maximum(BASE_SCORE - penalties, 0)
+    levels = np.select(
+        [scores >= LOW_RISK_MIN, scores >= MEDIUM_RISK_MIN], ["Low", "Medium"], "High"
+    )
+    return scores, levels
+
+
+def rescore_drivers(engine, dry_run: bool = False, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Recompute every driver's safety_score and risk_level from their completed
+    trips, live and archived. Trip behaviour columns are streamed in chunks
+    and accumulated per driver with NumPy, so memory follows the number of
+    drivers, not trips or the largest driver id. Only drivers whose values change are written, with
+    one executemany UPDATE.
+    """
+    import numpy as np
+
+    trips = Trip.__table__
+    drivers = Driver.__table__
+
+    with engine.connect() as conn:
+        current = conn.execute(
+            select(drivers.c.id, drivers.c.safety_score, drivers.c.risk_level).order_by(drivers.c.id)
+        ).all()
+        if not current:
+            return {"drivers": 0, "changed": 0, "trips": 0}
+
+        # penalties[i] belongs to driver_ids[i].
+        driver_ids = np.array([row[0] for row in current], dtype=np.int64)
+        penalties = np.zeros(len(driver_ids))
+        trip_count = 0
+
+        def add(columns):
+            nonlocal trip_count
+            trip_count += len(columns)
+
+            # Sum the chunk over its own distinct drivers, then add each sum
+            # at that driver's position in driver_ids.
+            ids, indexes = np.unique(columns[:, 0].astype(np.int64), return_inverse=True)
+            totals = penalty_totals(indexes, *columns[:, 1:].T, size=len(ids))
+
+            positions = np.searchsorted(driver_ids, ids)
+            # Drivers created after the snapshot above are left for the next run.
+            known = positions < len(driver_ids)
+            known[known] = driver_ids[positions[known]] == ids[known]
+            penalties[positions[known]] += totals[known]
+
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(
+            select(*(trips.c[c] for c in BEHAVIOUR_COLUMNS)).where(trips.c.status == "completed")
+        )
+
+        for rows in result.partitions():
+            # Plain tuples: np.array probes Row objects attribute by attribute.
+            add(np.array(list(map(tuple, rows)), dtype=np.float64))
+
+    archived = read_archive("trip", columns=BEHAVIOUR_COLUMNS, filters=[("status", "=", "completed")])
+    if archived is not None and archived.num_rows:
+        add(np.column_stack([archived[c].to_numpy().astype(np.float64) for c in BEHAVIOUR_COLUMNS]))
+
+    scores, levels = classify(penalties)
+
+    changes = [
+        {"_id": driver_id, "score": float(scores[i]), "level": str(levels[i])}
+        for i, (driver_id, old_score, old_level) in enumerate(current)
+        if old_score is None
+        or abs(old_score - scores[i]) > 1e-9
+        or old_level != levels[i]
+    ]
+
+    if changes and not dry_run:
+        with engine.begin() as conn:
+            conn.execute(
+                update(drivers)
+                .where(drivers.c.id == bindparam("_id"))
+                .values(safety_score=bindparam("score"), risk_level=bindparam("level")),
+                changes,
+            )
+
+    return {"drivers": len(current), "changed": len(changes), "trips": trip_count}
@@ -0,0 +1,211 @@
+"""
+Password hashing and signed access tokens.
+
+bcrypt runs on a dedicated, bounded thread pool (bcrypt releases the GIL), so
+a burst of logins queues behind AUTH_HASH_WORKERS threads instead of taking
+over the threadpool every other route shares; beyond AUTH_HASH_QUEUE waiting
+logins the API answers 503. New hashes use BCRYPT_ROUNDS, and older hashes
+with a different cost are upgraded on the next successful login.
+
+A login issues two HMAC-SHA256 signed tokens (JWT compact format, HS256):
+a short-lived access token checked on every request and a longer refresh
+token only accepted by /auth/refresh. Both are sent as HttpOnly cookies; API
+clients may pass the access token as "Authorization: Bearer ...". Checking a
+token needs no database access, and verified tokens are cached until they
+expire, so most requests cost a dictionary lookup. Tokens cannot be revoked
+before they expire; keep ACCESS_TOKEN_TTL short.
+
+Workers refuse to start without AUTH_SECRET: anyone can forge tokens signed
+with the public development key. Set AUTH_DEV_MODE=1 to run locally with it.
+
+Configuration:
+    AUTH_SECRET        HMAC key, must be the same on every worker (required)
+    AUTH_DEV_MODE      allow the development key when AUTH_SECRET is unset (off)
+    ACCESS_TOKEN_TTL   seconds (900)
+    REFRESH_TOKEN_TTL  seconds (604800)
+    BCRYPT_ROUNDS      cost of new hashes (12)
+    AUTH_HASH_WORKERS  bcrypt threads (4)
+    AUTH_HASH_QUEUE    logins allowed to wait for a thread (256)
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+DEV_SECRET = b"supersecretkey"
+AUTH_SECRET = (os.getenv("AUTH_SECRET") or DEV_SECRET.decode()).encode("utf-8")
+AUTH_DEV_MODE = os.getenv("AUTH_DEV_MODE", "false").lower() in ("1", "true", "yes", "on")
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "900"))
+REFRESH_TOKEN_TTL = int(os.getenv("REFRESH_TOKEN_TTL", "604800"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "4"))
+HASH_QUEUE = int(os.getenv("AUTH_HASH_QUEUE", "256"))
+
+ACCESS_COOKIE = "access_token"
+REFRESH_COOKIE = "refresh_token"
+
+TOKEN_CACHE_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
+
+_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+
+
+class AuthBusy(Exception):
+    """Too many logins are already waiting for a bcrypt thread."""
+
+
+# ---------------------------
+# PASSWORDS
+# ---------------------------
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = None
+
+
+def hash_password_sync(password: str, rounds: Optional[int] = None) -> str:
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def _check(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+def needs_rehash(password_hash: str) -> bool:
+    # "$2b$12$..." -> 12
+    try:
+        return int(password_hash.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+async def _run_hash(fn, *args):
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(HASH_WORKERS + HASH_QUEUE)
+    if _hash_slots.locked():
+        raise AuthBusy()
+
+    async with _hash_slots:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hash(hash_password_sync, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await _run_hash(_check, password, password_hash)
+
+
+# ---------------------------
+# TOKENS
+# ---------------------------
+def _b64(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def check_auth_secret():
+    """Called at worker startup: refuse the development key outside AUTH_DEV_MODE."""
+    if AUTH_SECRET != DEV_SECRET:
+        return
+    if not AUTH_DEV_MODE:
+        raise RuntimeError(
+            "AUTH_SECRET is not set; set it to the same random value on every worker "
+            "(or AUTH_DEV_MODE=1 for local development)"
+        )
+    logger.warning("AUTH_SECRET is not set: signing tokens with the public development key (AUTH_DEV_MODE)")
+
+
+def _sign(signing_input: bytes) -> bytes:
+    return _b64(hmac.new(AUTH_SECRET, signing_input, hashlib.sha256).digest())
+
+
+def issue_token(user_id: int, role: str, kind: str = "access", now: Optional[float] = None) -> str:
+    now = int(now if now is not None else time.time())
+    ttl = ACCESS_TOKEN_TTL if kind == "access" else REFRESH_TOKEN_TTL
+    claims = {"sub": str(user_id), "role": role, "typ": kind, "iat": now, "exp": now + ttl}
+    signing_input = _HEADER + b"." + _b64(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return (signing_input + b"." + _sign(signing_input)).decode("ascii")
+
+
+class TokenCache:
+    """LRU of token -> claims for tokens whose signature has been checked."""
+
+    def __init__(self, size: int = TOKEN_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str, kind: str = "access", now: Optional[float] = None) -> Optional[dict]:
+        """Claims of a valid, unexpired token of the given kind, else None."""
+        now = now if now is not None else time.time()
+
+        claims = self._entries.get(token)
+        if claims is not None:
+            self.hits += 1
+            self._entries.move_to_end(token)
+        else:
+            self.misses += 1
+            claims = _decode(token)
+            if claims is None:
+                return None
+            self._entries[token] = claims
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+        if claims["exp"] <= now:
+            self._entries.pop(token, None)
+            return None
+        return claims if claims.get("typ") == kind else None
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _decode(token: str) -> Optional[dict]:
+    try:
+        header, payload, signature = token.split(".")
+    except ValueError:
+        return None
+
+    expected = _sign(f"{header}.{payload}".encode("ascii", "replace"))
+    if not hmac.compare_digest(expected, signature.encode("ascii", "replace")) or header.encode() != _HEADER:
+        return None
+
+    try:
+        claims = json.loads(_unb64(payload))
+        claims["user_id"] = int(claims["sub"])
+        int(claims["exp"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    return claims
+
+
+token_cache = TokenCache()
+
+
+def verify_token(token: Optional[str], kind: str = "access") -> Optional[dict]:
+    return token_cache.verify(token, kind) if token else None
+
+
+def request_token(headers, cookies) -> Optional[str]:
+    """Bearer token from the Authorization header, else the access cookie."""
+    authorization = headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        return authorization[7:].strip()
+    return cookies.get(ACCESS_COOKIE)
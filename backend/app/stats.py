@@ -0,0 +1,288 @@
+"""
+Per-vehicle and per-driver rollups.
+
+Write paths call the record_* helpers before committing, so the rollup rows
+move together with the trip, fuel and maintenance rows they summarise. The
+analytics endpoints then read a single row instead of scanning history.
+VehicleDaily holds the same totals split by vehicle and day for the
+region/date-window views. rebuild_stats / reconcile_stats recompute
+everything from the raw tables, including months archived to Parquet.
+"""
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select, func, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.trip import Trip
+from app.models.fuel import Fuel
+from app.models.maintenance import Maintenance
+from app.models.vehicle_stats import VehicleStats
+from app.models.driver_stats import DriverStats
+from app.models.vehicle_daily import VehicleDaily
+from app.archive import archived_fuel_totals, archived_trip_totals
+
+VEHICLE_FIELDS = ["total_km", "total_liters", "fuel_cost", "maintenance_cost", "revenue", "trip_count"]
+DRIVER_FIELDS = ["total_km", "revenue", "trip_count"]
+TRIP_FIELDS = ["total_km", "revenue", "trip_count"]  # what a completed trip adds per vehicle and driver
+DAILY_FIELDS = VEHICLE_FIELDS + ["overspeed_count", "harsh_brake_count", "accident_count"]
+TRIP_DAILY_FIELDS = ["total_km", "revenue", "trip_count", "overspeed_count", "harsh_brake_count", "accident_count"]
+
+
+def rollup_upsert(dialect_name: str, model, keys, fields):
+    """
+    INSERT ... ON CONFLICT DO UPDATE for a rollup table that adds `fields`
+    onto the existing row for `keys`, or creates it. Unlike a get-then-add,
+    two writers creating the same row cannot collide on the primary key, and
+    "SET col = col + excluded.col" loses no concurrent update.
+    """
+    table = model.__table__
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c[key] for key in keys],
+        set_={f: table.c[f] + stmt.excluded[f] for f in fields},
+    )
+
+
+def rollup_rows(key_field: str, deltas: dict) -> list:
+    """Turn {key: {field: delta}} into upsert parameters, in key order so writers lock rows alike."""
+    return [{key_field: key, **values} for key, values in sorted(deltas.items())]
+
+
+def daily_upsert(dialect_name: str, fields):
+    return rollup_upsert(dialect_name, VehicleDaily, ("vehicle_id", "day"), fields)
+
+
+def daily_rows(deltas: dict) -> list:
+    """Turn {(vehicle_id, day): {field: delta}} into upsert parameters, in key order."""
+    return [
+        {"vehicle_id": vehicle_id, "day": day, **values}
+        for (vehicle_id, day), values in sorted(deltas.items())
+    ]
+
+
+async def _increment(session: AsyncSession, model, key_field: str, deltas: dict, fields):
+    if deltas:
+        await session.execute(
+            rollup_upsert(session.bind.dialect.name, model, (key_field,), fields), rollup_rows(key_field, deltas)
+        )
+
+
+async def _increment_daily(session: AsyncSession, deltas: dict, fields):
+    if deltas:
+        await session.execute(daily_upsert(session.bind.dialect.name, fields), daily_rows(deltas))
+
+
+def trip_distance(trip: Trip) -> float:
+    """Distance counted towards efficiency; same rule as the original reports."""
+    if trip.end_odometer and trip.start_odometer:
+        return trip.end_odometer - trip.start_odometer
+    return 0
+
+
+async def record_trips_completed(session: AsyncSession, trips: list):
+    """
+    Roll a batch of completed trips into the stats. Deltas are summed per
+    vehicle and driver first, so each rollup row gets a single upsert.
+    """
+    vehicle_deltas = defaultdict(lambda: dict.fromkeys(TRIP_FIELDS, 0))
+    driver_deltas = defaultdict(lambda: dict.fromkeys(TRIP_FIELDS, 0))
+    daily_deltas = defaultdict(lambda: dict.fromkeys(TRIP_DAILY_FIELDS, 0))
+
+    for trip in trips:
+        distance = trip_distance(trip)
+        for deltas in (vehicle_deltas[trip.vehicle_id], driver_deltas[trip.driver_id]):
+            deltas["total_km"] += distance
+            deltas["revenue"] += trip.revenue
+            deltas["trip_count"] += 1
+
+        daily = daily_deltas[(trip.vehicle_id, trip.created_at.date())]
+        daily["total_km"] += distance
+        daily["revenue"] += trip.revenue
+        daily["trip_count"] += 1
+        daily["overspeed_count"] += trip.overspeed_count
+        daily["harsh_brake_count"] += trip.harsh_brake_count
+        daily["accident_count"] += int(trip.accident_reported)
+
+    await _increment(session, VehicleStats, "vehicle_id", vehicle_deltas, TRIP_FIELDS)
+    await _increment(session, DriverStats, "driver_id", driver_deltas, TRIP_FIELDS)
+    await _increment_daily(session, daily_deltas, TRIP_DAILY_FIELDS)
+
+
+async def record_trip_completed(session: AsyncSession, trip: Trip):
+    await record_trips_completed(session, [trip])
+
+
+async def record_fuel(session: AsyncSession, log: Fuel):
+    deltas = {"total_liters": log.liters, "fuel_cost": log.cost}
+    await _increment(session, VehicleStats, "vehicle_id", {log.vehicle_id: deltas}, list(deltas))
+    await _increment_daily(session, {(log.vehicle_id, log.fuel_date.date()): deltas}, list(deltas))
+
+
+async def record_maintenance(session: AsyncSession, log: Maintenance):
+    deltas = {"maintenance_cost": log.cost}
+    await _increment(session, VehicleStats, "vehicle_id", {log.vehicle_id: deltas}, list(deltas))
+    await _increment_daily(session, {(log.vehicle_id, log.service_date.date()): deltas}, list(deltas))
+
+
+# =========================
+# REBUILD / RECONCILE
+# =========================
+def completed_trip_totals(*keys, extra=()):
+    distance_counted = (
+        Trip.end_odometer.is_not(None)
+        & (Trip.end_odometer != 0)
+        & (Trip.start_odometer != 0)
+    )
+    return (
+        select(
+            *keys,
+            func.sum(Trip.end_odometer - Trip.start_odometer).filter(distance_counted),
+            func.sum(Trip.revenue),
+            func.count(),
+            *extra,
+        )
+        .where(Trip.status == "completed")
+        .group_by(*keys)
+    )
+
+
+def as_date(value) -> date:
+    # SQLite's date() returns text, PostgreSQL's a date.
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _add(row: dict, **values):
+    for field, value in values.items():
+        row[field] += value or 0
+
+
+def compute_vehicle_stats(session: Session) -> dict:
+    totals = {}
+
+    def row(vehicle_id):
+        return totals.setdefault(vehicle_id, dict.fromkeys(VEHICLE_FIELDS, 0))
+
+    trips = list(session.exec(completed_trip_totals(Trip.vehicle_id)))
+    trips += [t[:4] for t in archived_trip_totals("vehicle_id")]
+    for vehicle_id, km, revenue, count in trips:
+        _add(row(vehicle_id), total_km=km, revenue=revenue, trip_count=count)
+
+    fuel = list(session.exec(
+        select(Fuel.vehicle_id, func.sum(Fuel.liters), func.sum(Fuel.cost)).group_by(Fuel.vehicle_id)
+    ))
+    fuel += archived_fuel_totals("vehicle_id")
+    for vehicle_id, liters, cost in fuel:
+        _add(row(vehicle_id), total_liters=liters, fuel_cost=cost)
+
+    for vehicle_id, cost in session.exec(
+        select(Maintenance.vehicle_id, func.sum(Maintenance.cost)).group_by(Maintenance.vehicle_id)
+    ):
+        row(vehicle_id).update(maintenance_cost=cost or 0)
+
+    return totals
+
+
+def compute_driver_stats(session: Session) -> dict:
+    totals = {}
+
+    trips = list(session.exec(completed_trip_totals(Trip.driver_id)))
+    trips += [t[:4] for t in archived_trip_totals("driver_id")]
+    for driver_id, km, revenue, count in trips:
+        _add(totals.setdefault(driver_id, dict.fromkeys(DRIVER_FIELDS, 0)),
+             total_km=km, revenue=revenue, trip_count=count)
+
+    return totals
+
+
+def compute_daily_stats(session: Session) -> dict:
+    totals = {}
+
+    def row(vehicle_id, day):
+        return totals.setdefault((vehicle_id, as_date(day)), dict.fromkeys(DAILY_FIELDS, 0))
+
+    trip_day = func.date(Trip.created_at)
+    trips = list(session.exec(
+        completed_trip_totals(Trip.vehicle_id, trip_day, extra=(
+            func.sum(Trip.overspeed_count),
+            func.sum(Trip.harsh_brake_count),
+            func.count().filter(Trip.accident_reported.is_(True)),
+        ))
+    ))
+    trips += archived_trip_totals("vehicle_id", "day")
+    for vehicle_id, day, km, revenue, count, overspeed, harsh, accidents in trips:
+        _add(
+            row(vehicle_id, day), total_km=km, revenue=revenue, trip_count=count,
+            overspeed_count=overspeed, harsh_brake_count=harsh, accident_count=accidents,
+        )
+
+    fuel_day = func.date(Fuel.fuel_date)
+    fuel = list(session.exec(
+        select(Fuel.vehicle_id, fuel_day, func.sum(Fuel.liters), func.sum(Fuel.cost))
+        .group_by(Fuel.vehicle_id, fuel_day)
+    ))
+    fuel += archived_fuel_totals("vehicle_id", "day")
+    for vehicle_id, day, liters, cost in fuel:
+        _add(row(vehicle_id, day), total_liters=liters, fuel_cost=cost)
+
+    service_day = func.date(Maintenance.service_date)
+    for vehicle_id, day, cost in session.exec(
+        select(Maintenance.vehicle_id, service_day, func.sum(Maintenance.cost))
+        .group_by(Maintenance.vehicle_id, service_day)
+    ):
+        row(vehicle_id, day).update(maintenance_cost=cost or 0)
+
+    return totals
+
+
+def rebuild_stats(session: Session):
+    """Replace every rollup row with totals recomputed from the raw tables."""
+    vehicle_totals = compute_vehicle_stats(session)
+    driver_totals = compute_driver_stats(session)
+    daily_totals = compute_daily_stats(session)
+
+    session.exec(delete(VehicleStats))
+    session.exec(delete(DriverStats))
+    session.exec(delete(VehicleDaily))
+
+    session.add_all(VehicleStats(vehicle_id=k, **v) for k, v in vehicle_totals.items())
+    session.add_all(DriverStats(driver_id=k, **v) for k, v in driver_totals.items())
+    session.add_all(VehicleDaily(vehicle_id=k[0], day=k[1], **v) for k, v in daily_totals.items())
+    session.commit()
+
+    return {"vehicles": len(vehicle_totals), "drivers": len(driver_totals), "days": len(daily_totals)}
+
+
+def _diff(kind, expected, stored, fields, tolerance):
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys()):
+        want = expected.get(key, dict.fromkeys(fields, 0))
+        have = stored.get(key, dict.fromkeys(fields, 0))
+        for field in fields:
+            if abs((want[field] or 0) - (have[field] or 0)) > tolerance * max(1, abs(want[field] or 0)):
+                mismatches.append({
+                    "kind": kind, "id": key, "field": field,
+                    "expected": want[field], "stored": have[field],
+                })
+    return mismatches
+
+
+def reconcile_stats(session: Session, tolerance: float = 1e-6) -> list:
+    """Compare stored rollups with the raw tables and return every mismatch."""
+    stored_vehicles = {
+        s.vehicle_id: s.model_dump() for s in session.exec(select(VehicleStats))
+    }
+    stored_drivers = {
+        s.driver_id: s.model_dump() for s in session.exec(select(DriverStats))
+    }
+    stored_days = {
+        (s.vehicle_id, s.day): s.model_dump() for s in session.exec(select(VehicleDaily))
+    }
+
+    return (
+        _diff("vehicle", compute_vehicle_stats(session), stored_vehicles, VEHICLE_FIELDS, tolerance)
+        + _diff("driver", compute_driver_stats(session), stored_drivers, DRIVER_FIELDS, tolerance)
+        + _diff("vehicle_day", compute_daily_stats(session), stored_days, DAILY_FIELDS, tolerance)
+    )
@@ -0,0 +1,222 @@
+"""
+In-memory buffer for telematics events.
+
+POST /telematics/events only validates a batch and appends it here. The
+buffer is written out when it reaches TELEMATICS_FLUSH_SIZE events, every
+TELEMATICS_FLUSH_INTERVAL seconds, and before a trip is completed. A flush
+is one INSERT of the events into TripEvent plus one executemany UPDATE that
+adds the per-trip totals onto the Trip counters, so ingestion cost does not
+grow with the number of HTTP calls.
+
+Only trips that are still dispatched take events; events for unknown,
+completed or cancelled trips are dropped and counted. If a batch fails for
+any reason but a lost connection, it is retried in halves until the events
+that cannot be stored are isolated; those are logged and counted as rejected
+rather than blocking every later flush. Each worker has its own
+buffer, so a completion sees events received by other workers only once they
+have flushed (at most TELEMATICS_FLUSH_INTERVAL later).
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from sqlalchemy import bindparam, insert, or_, update
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlmodel import SQLModel, select
+
+from app.db import async_session_factory, naive_utc
+from app.models.trip import Trip
+from app.models.trip_event import TripEvent
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = int(os.getenv("TELEMATICS_FLUSH_SIZE", "5000"))
+FLUSH_INTERVAL = float(os.getenv("TELEMATICS_FLUSH_INTERVAL", "1"))
+MAX_BUFFERED = int(os.getenv("TELEMATICS_MAX_BUFFER", "200000"))
+
+# The database is unreachable: keep the batch and retry it on the next flush.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, PoolTimeout, OSError)
+
+
+class TelematicsEvent(SQLModel):
+    trip_id: int
+    type: Literal["overspeed", "harsh_brake", "accident", "odometer"]
+    value: Optional[float] = None
+    recorded_at: Optional[datetime] = None
+
+
+class BufferFull(Exception):
+    pass
+
+
+class EventBuffer:
+    def __init__(self, flush_size: int = FLUSH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 max_buffered: int = MAX_BUFFERED):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+
+        self._events = []
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._pending_flush = None
+
+        self.received = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.flushes = 0
+
+    def add(self, events: List[TelematicsEvent]):
+        if len(self._events) + len(events) > self.max_buffered:
+            raise BufferFull()
+
+        now = datetime.utcnow()
+        self._events.extend(
+            {
+                "trip_id": e.trip_id,
+                "event_type": e.type,
+                "value": e.value,
+                "recorded_at": naive_utc(e.recorded_at) if e.recorded_at else now,
+            }
+            for e in events
+        )
+        self.received += len(events)
+
+        if len(self._events) >= self.flush_size and (self._pending_flush is None or self._pending_flush.done()):
+            self._pending_flush = asyncio.create_task(self.flush_logged())
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of events stored."""
+        async with self._lock:
+            if not self._events:
+                return 0
+
+            events, self._events = self._events, []
+            rejected = 0
+            try:
+                stored = await self._write(events)
+            except TRANSIENT_ERRORS:
+                self._requeue(events)
+                raise
+            except Exception:
+                logger.warning("Telematics batch of %d events failed; retrying in halves", len(events), exc_info=True)
+                stored, rejected = await self._write_isolating(events)
+
+            self.flushes += 1
+            self.flushed += stored
+            self.rejected += rejected
+            self.dropped += len(events) - stored - rejected
+            return stored
+
+    def _requeue(self, events):
+        # Put the batch back in front of anything that arrived meanwhile.
+        self._events[:0] = events[: max(self.max_buffered - len(self._events), 0)]
+
+    async def _write_isolating(self, events):
+        """
+        Write events in ever smaller batches until each failing one is on its
+        own, then log and drop it. Returns (stored, rejected).
+        """
+        stored = rejected = 0
+        batches = [events]
+        while batches:
+            batch = batches.pop()
+            try:
+                stored += await self._write(batch)
+            except TRANSIENT_ERRORS:
+                self._requeue(batch + [e for b in reversed(batches) for e in b])
+                raise
+            except Exception as exc:
+                if len(batch) == 1:
+                    logger.error("Rejected telematics event %s: %s", batch[0], exc)
+                    rejected += 1
+                else:
+                    half = len(batch) // 2
+                    batches += [batch[half:], batch[:half]]
+
+        return stored, rejected
+
+    async def _write(self, events) -> int:
+        trips = Trip.__table__
+
+        async with async_session_factory() as session:
+            live = set((await session.exec(
+                select(Trip.id).where(
+                    Trip.id.in_(list({e["trip_id"] for e in events})),
+                    Trip.status == "dispatched",
+                )
+            )).all())
+
+            events = [e for e in events if e["trip_id"] in live]
+            if not events:
+                return 0
+
+            deltas = defaultdict(lambda: {"overspeed": 0, "harsh_brake": 0, "accident": False})
+            for e in events:
+                counters = deltas[e["trip_id"]]
+                if e["event_type"] == "accident":
+                    counters["accident"] = True
+                elif e["event_type"] in ("overspeed", "harsh_brake"):
+                    counters[e["event_type"]] += 1
+
+            await session.execute(insert(TripEvent.__table__), events)
+
+            # The status check makes a completion that wins the row lock first
+            # turn this into a no-op instead of changing a scored trip.
+            await session.execute(
+                update(trips)
+                .where(trips.c.id == bindparam("_id"), trips.c.status == "dispatched")
+                .values(
+                    overspeed_count=trips.c.overspeed_count + bindparam("overspeed"),
+                    harsh_brake_count=trips.c.harsh_brake_count + bindparam("harsh_brake"),
+                    accident_reported=or_(trips.c.accident_reported, bindparam("accident")),
+                ),
+                [{"_id": trip_id, **counters} for trip_id, counters in sorted(deltas.items())],
+            )
+            await session.commit()
+
+        return len(events)
+
+    async def flush_logged(self):
+        """flush(), logging a failure instead of raising it."""
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Telematics flush failed; %d events kept in the buffer", len(self._events))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_logged()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_logged()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._events),
+            "received": self.received,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+        }
+
+
+telematics_buffer = EventBuffer()
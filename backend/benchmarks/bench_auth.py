@@ -0,0 +1,112 @@
+"""
+Cost of authentication: per-request token checks and bcrypt logins.
+
+In-process (no server needed):
+  * access token verification, cached and uncached (signature check)
+  * one bcrypt hash at each --rounds cost
+
+With --url, against a running server: --logins clients log in repeatedly
+while --clients others read /auth/me, and the read latency is reported with
+and without the login storm. Logins beyond AUTH_HASH_WORKERS + AUTH_HASH_QUEUE
+get 503 instead of slowing the reads down.
+
+Usage (from backend/):
+    python -m benchmarks.bench_auth --rounds 10 12 14
+    python -m benchmarks.bench_auth --url http://127.0.0.1:8000 --logins 50 --clients 20
+"""
+import argparse
+import asyncio
+import time
+
+from app.security import TokenCache, hash_password_sync, issue_token
+
+from benchmarks.load_test import percentile
+
+
+def bench_tokens(count):
+    tokens = [issue_token(i, "manager") for i in range(count)]
+
+    cache = TokenCache(size=count)
+    started = time.perf_counter()
+    for token in tokens:
+        cache.verify(token)
+    uncached = (time.perf_counter() - started) / count
+
+    started = time.perf_counter()
+    for token in tokens:
+        cache.verify(token)
+    cached = (time.perf_counter() - started) / count
+
+    print(f"token verify: uncached {uncached * 1e6:.1f} us, cached {cached * 1e6:.2f} us ({count} tokens)")
+
+
+def bench_bcrypt(rounds):
+    for cost in rounds:
+        started = time.perf_counter()
+        hash_password_sync("benchmark-password", cost)
+        print(f"bcrypt cost {cost:>2}: {(time.perf_counter() - started) * 1000:.0f} ms per hash/verify")
+
+
+async def read_latency(client, clients, duration):
+    latencies, failures = [], [0]
+    deadline = time.perf_counter() + duration
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get("/auth/me")
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                failures[0] += 1
+
+    await asyncio.gather(*(reader() for _ in range(clients)))
+    return latencies, failures[0]
+
+
+async def bench_server(args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.clients + args.logins)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        form = {"email": args.email, "password": args.password}
+        (await client.post("/auth/login", data=form)).raise_for_status()
+
+        latencies, _ = await read_latency(client, args.clients, args.duration)
+        print(f"/auth/me alone:        p50 {percentile(latencies, 50):.1f} ms  p99 {percentile(latencies, 99):.1f} ms")
+
+        statuses = {}
+        deadline = time.perf_counter() + args.duration
+
+        async def login():
+            async with httpx.AsyncClient(base_url=args.url, timeout=60) as own:
+                while time.perf_counter() < deadline:
+                    status = (await own.post("/auth/login", data=form)).status_code
+                    statuses[status] = statuses.get(status, 0) + 1
+
+        storm = asyncio.gather(*(login() for _ in range(args.logins)))
+        latencies, _ = await read_latency(client, args.clients, args.duration)
+        await storm
+        print(f"/auth/me during logins: p50 {percentile(latencies, 50):.1f} ms  p99 {percentile(latencies, 99):.1f} ms")
+        print(f"login responses: {dict(sorted(statuses.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--url", help="also load a running server")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--email", default="admin@fleetflow.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    bench_tokens(args.tokens)
+    bench_bcrypt(args.rounds)
+    if args.url:
+        asyncio.run(bench_server(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Bulk trip dispatch/completion versus the single-item endpoints.
+
+Creates a pool of vehicles and drivers on a running server, dispatches and
+completes one trip per vehicle through POST /trips/ and PATCH
+/trips/{id}/complete, then repeats the same work through POST /trips/bulk
+and PATCH /trips/complete/bulk.
+
+Usage (from backend/, needs httpx):
+    python -m benchmarks.bench_bulk_trips --url http://127.0.0.1:8000 --trips 2000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from benchmarks.stress_dispatch import create_pool
+
+
+def trip_payload(vehicle_id, driver_id):
+    return {
+        "vehicle_id": vehicle_id, "driver_id": driver_id, "cargo_weight": 100,
+        "origin": "Planner", "destination": "Planner", "start_odometer": 1,
+    }
+
+
+async def single_path(client, pairs, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def dispatch(vehicle_id, driver_id):
+        async with semaphore:
+            response = await client.post("/trips/", json=trip_payload(vehicle_id, driver_id))
+            response.raise_for_status()
+            return response.json()["id"]
+
+    async def complete(trip_id):
+        async with semaphore:
+            response = await client.patch(f"/trips/{trip_id}/complete", params={"end_odometer": 50, "revenue": 100})
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    trip_ids = await asyncio.gather(*(dispatch(v, d) for v, d in pairs))
+    dispatched = time.perf_counter()
+    await asyncio.gather(*(complete(t) for t in trip_ids))
+    return dispatched - started, time.perf_counter() - dispatched
+
+
+async def bulk_path(client, pairs, batch_size):
+    started = time.perf_counter()
+    trip_ids = []
+    for i in range(0, len(pairs), batch_size):
+        response = await client.post("/trips/bulk", json=[trip_payload(v, d) for v, d in pairs[i:i + batch_size]])
+        response.raise_for_status()
+        trip_ids += [t["id"] for t in response.json()["created"]]
+    dispatched = time.perf_counter()
+
+    for i in range(0, len(trip_ids), batch_size):
+        response = await client.patch("/trips/complete/bulk", json=[
+            {"trip_id": t, "end_odometer": 50, "revenue": 100} for t in trip_ids[i:i + batch_size]
+        ])
+        response.raise_for_status()
+    return dispatched - started, time.perf_counter() - dispatched
+
+
+async def main_async(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=600) as client:
+        response = await client.post("/auth/login", data={"email": args.email, "password": args.password})
+        response.raise_for_status()
+
+        vehicle_ids, driver_ids = await create_pool(client, args.trips, args.trips, uuid.uuid4().hex[:8])
+        pairs = list(zip(vehicle_ids, driver_ids))
+
+        single = await single_path(client, pairs, args.concurrency)
+        bulk = await bulk_path(client, pairs, args.batch_size)
+
+    print(f"{'path':<8} {'dispatch s':>11} {'trips/s':>9} {'complete s':>11} {'trips/s':>9}")
+    for label, (dispatch_s, complete_s) in (("single", single), ("bulk", bulk)):
+        print(f"{label:<8} {dispatch_s:>11.2f} {len(pairs) / dispatch_s:>9.0f} {complete_s:>11.2f} {len(pairs) / complete_s:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--trips", type=int, default=2_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--email", default="admin@fleetflow.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Dispatch planner: sorted pools + driver heap versus scanning the fleet.
+
+For each size, builds random available vehicles, drivers and loads and runs
+app.dispatch.plan_assignments. The same best-fit-decreasing choice is then
+made by a reference that scans every vehicle and driver per load (the two
+must agree), and by first-fit in arrival order (what picking the first
+vehicle that fits from /vehicles/available amounts to) to show the capacity
+the planner saves. Finally times POST /dispatch/plan's handler, including its
+reads, against a seeded database.
+
+Usage (from backend/):
+    python -m benchmarks.bench_dispatch
+    python -m benchmarks.bench_dispatch --sizes 2000 10000 --skip-scan
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_dispatch.db")
+
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from app.db import engine, async_engine  # noqa: E402
+from app.dispatch import RISK_RANK, plan_assignments  # noqa: E402
+from app.routes.dispatch_routes import DispatchLoad, plan_dispatch  # noqa: E402
+from benchmarks.seed import REGIONS, VEHICLE_TYPES, seed_fleet  # noqa: E402
+
+CAPACITIES = [500, 1000, 5000, 10000]
+
+
+def random_fleet(size, rng):
+    today = date.today()
+    vehicles = [
+        (i, rng.choice(CAPACITIES) * rng.uniform(0.8, 1.2), rng.choice(REGIONS), rng.choice(VEHICLE_TYPES))
+        for i in range(1, size + 1)
+    ]
+    drivers = [
+        (i, rng.uniform(30, 100), rng.choice(list(RISK_RANK)), today + timedelta(days=rng.randint(-30, 1500)))
+        for i in range(1, size + 1)
+    ]
+    loads = [
+        (rng.uniform(10, 9000), rng.choice(REGIONS), rng.choice([None, None, *VEHICLE_TYPES]))
+        for _ in range(size)
+    ]
+    return loads, vehicles, drivers
+
+
+def scan_plan(loads, vehicles, drivers, trip_date):
+    """Reference: same choices as plan_assignments, found by scanning every row."""
+    vehicles = list(vehicles)
+    drivers = [d for d in drivers if d[3] >= trip_date]
+    assignments = {}
+
+    for index in sorted(range(len(loads)), key=lambda i: loads[i][0], reverse=True):
+        cargo_weight, region, vehicle_type = loads[index]
+        if not drivers:
+            continue
+        fits = [
+            v for v in vehicles
+            if v[2] == region and (vehicle_type is None or v[3] == vehicle_type) and v[1] >= cargo_weight
+        ]
+        if not fits:
+            continue
+        vehicle = min(fits, key=lambda v: (v[1], v[0]))
+        driver = min(drivers, key=lambda d: (RISK_RANK[d[2]], -d[1], d[0]))
+        vehicles.remove(vehicle)
+        drivers.remove(driver)
+        assignments[index] = (vehicle[0], driver[0])
+    return assignments
+
+
+def first_fit_waste(loads, vehicles, drivers, trip_date):
+    """Loads in arrival order, each taking the first available vehicle that fits."""
+    vehicles = list(vehicles)
+    free_drivers = sum(1 for d in drivers if d[3] >= trip_date)
+    assigned, waste = 0, 0.0
+
+    for cargo_weight, region, vehicle_type in loads:
+        if assigned == free_drivers:
+            break
+        for vehicle in vehicles:
+            if vehicle[2] == region and (vehicle_type is None or vehicle[3] == vehicle_type) and vehicle[1] >= cargo_weight:
+                vehicles.remove(vehicle)
+                assigned += 1
+                waste += vehicle[1] - cargo_weight
+                break
+    return assigned, waste
+
+
+async def time_endpoint(loads, repeat):
+    body = [DispatchLoad(cargo_weight=w, region=r, vehicle_type=t) for w, r, t in loads]
+    timings = []
+    for _ in range(repeat):
+        async with AsyncSession(async_engine) as session:
+            started = time.perf_counter()
+            await plan_dispatch(body, trip_date=None, session=session)
+            timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 10_000],
+                        help="loads = vehicles = drivers")
+    parser.add_argument("--skip-scan", action="store_true", help="Skip the O(loads x vehicles) reference")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    today = date.today()
+
+    print(f"{'size':>7} {'plan ms':>9} {'scan ms':>9} {'agree':>6} {'assigned':>9} "
+          f"{'waste':>12} {'first-fit':>10} {'ff waste':>12}")
+    for size in args.sizes:
+        loads, vehicles, drivers = random_fleet(size, rng)
+
+        started = time.perf_counter()
+        plan = plan_assignments(loads, vehicles, drivers, today)
+        plan_ms = (time.perf_counter() - started) * 1000
+
+        scan_ms, agree = float("nan"), "-"
+        if not args.skip_scan:
+            started = time.perf_counter()
+            reference = scan_plan(loads, vehicles, drivers, today)
+            scan_ms = (time.perf_counter() - started) * 1000
+            planned = {a["index"]: (a["vehicle_id"], a["driver_id"]) for a in plan["assignments"]}
+            agree = "yes" if planned == reference else "NO"
+
+        ff_assigned, ff_waste = first_fit_waste(loads, vehicles, drivers, today)
+        print(
+            f"{size:>7} {plan_ms:>9.1f} {scan_ms:>9.1f} {agree:>6} {len(plan['assignments']):>9} "
+            f"{plan['wasted_capacity']:>12.0f} {ff_assigned:>10} {ff_waste:>12.0f}"
+        )
+
+    print()
+    print(f"{'size':>7} {'endpoint ms':>12}  (POST /dispatch/plan handler incl. reads)")
+    for size in args.sizes:
+        seed_fleet(engine, vehicles=size, drivers=size, trips=0)
+        loads, _, _ = random_fleet(size, rng)
+        print(f"{size:>7} {asyncio.run(time_endpoint(loads, args.repeat)):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
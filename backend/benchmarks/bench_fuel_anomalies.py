@@ -0,0 +1,103 @@
+"""
+Fuel anomaly detector throughput and accuracy.
+
+In-process: --fills synthetic fill-ups spread over --vehicles vehicles are
+streamed through app.fuel_anomalies.observe_fill, with about 1% of them
+made anomalous (double consumption or a doubled price). Reports fill-ups/s
+and how many of the injected anomalies were flagged, and how many normal
+fill-ups were flagged by mistake.
+
+Then, for each --db-fills, seeds a fleet and times the backfill
+(python manage.py fuel anomalies) over it.
+
+Usage (from backend/):
+    python -m benchmarks.bench_fuel_anomalies
+    python -m benchmarks.bench_fuel_anomalies --fills 5000000 --db-fills 100000 1000000
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_fuel_anomalies.db")
+
+from app.db import engine  # noqa: E402
+from app.fuel_anomalies import backfill_fuel_anomalies, new_baseline, observe_fill  # noqa: E402
+from benchmarks.seed import seed_fleet  # noqa: E402
+
+INJECTED_SHARE = 0.01
+
+
+def synthetic_fills(vehicles, fills, rng):
+    """(vehicle_id, liters, cost, fuel_date, odometer, injected) in time order per vehicle."""
+    profiles = [(rng.uniform(0.08, 0.4), rng.uniform(1.2, 1.8), rng.uniform(24, 96)) for _ in range(vehicles)]
+    clocks = [datetime(2024, 1, 1)] * vehicles
+    odometers = [0.0] * vehicles
+
+    for _ in range(fills):
+        v = rng.randrange(vehicles)
+        liters_per_km, price, interval = profiles[v]
+        distance = rng.uniform(200, 600)
+        liters = distance * liters_per_km * rng.uniform(0.9, 1.1)
+        cost = liters * price * rng.uniform(0.97, 1.03)
+
+        injected = rng.random() < INJECTED_SHARE
+        if injected:
+            if rng.random() < 0.5:
+                liters *= 2
+                cost *= 2
+            else:
+                cost *= 2
+
+        clocks[v] += timedelta(hours=interval * rng.uniform(0.8, 1.2))
+        odometers[v] += distance
+        yield v, liters, cost, clocks[v], odometers[v], injected
+
+
+def bench_stream(vehicles, fills, rng):
+    stream = list(synthetic_fills(vehicles, fills, rng))
+    baselines = [new_baseline(v) for v in range(vehicles)]
+
+    caught = injected = false_alarms = 0
+    started = time.perf_counter()
+    for v, liters, cost, fuel_date, odometer, is_injected in stream:
+        flagged = bool(observe_fill(baselines[v], liters, cost, fuel_date, odometer))
+        injected += is_injected
+        caught += flagged and is_injected
+        false_alarms += flagged and not is_injected
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"stream: {fills} fill-ups over {vehicles} vehicles in {elapsed:.2f}s ({fills / elapsed:,.0f}/s); "
+        f"caught {caught}/{injected} injected, {false_alarms} false alarms "
+        f"({false_alarms / max(fills - injected, 1):.2%})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, default=1_000)
+    parser.add_argument("--fills", type=int, default=1_000_000)
+    parser.add_argument("--db-fills", type=int, nargs="*", default=[100_000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    bench_stream(args.vehicles, args.fills, random.Random(args.seed))
+
+    for fills in args.db_fills:
+        seed_fleet(engine, vehicles=args.vehicles, drivers=args.vehicles, trips=fills * 5,
+                   fuel_logs=fills, maintenance_logs=0, rng_seed=args.seed)
+        started = time.perf_counter()
+        result = backfill_fuel_anomalies(engine)
+        elapsed = time.perf_counter() - started
+        print(
+            f"backfill: {result['fills']} fill-ups, {result['vehicles']} vehicles in {elapsed:.2f}s "
+            f"({result['fills'] / elapsed:,.0f}/s), {result['anomalies']} anomalies"
+        )
+
+
+if __name__ == "__main__":
+    main()
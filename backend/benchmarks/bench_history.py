@@ -0,0 +1,93 @@
+"""
+/analytics/history over the live tables versus live + Parquet archive.
+
+Seeds --years of history, times the monthly history endpoint, archives every
+month older than --keep-months, and times it again; both runs must return
+the same months. Also reports the archive's size on disk.
+
+Usage (from backend/, needs pyarrow):
+    python -m benchmarks.bench_history
+    python -m benchmarks.bench_history --trips 1000000 --years 3 --keep-months 6
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+Archives go to ARCHIVE_DIR (bench_archive by default), which is emptied first.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_history.db")
+os.environ.setdefault("ARCHIVE_DIR", "bench_archive")
+
+from sqlalchemy import update  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from app.archive import ARCHIVE_DIR, archive_history  # noqa: E402
+from app.db import engine, async_engine  # noqa: E402
+from app.models.trip import Trip  # noqa: E402
+from app.partitions import add_months, month_start  # noqa: E402
+from app.routes.analytics_routes import Window, monthly_history  # noqa: E402
+from benchmarks.seed import seed_fleet  # noqa: E402
+
+
+async def time_history(repeat):
+    timings = []
+    for _ in range(repeat):
+        async with AsyncSession(async_engine) as session:
+            started = time.perf_counter()
+            result = await monthly_history(region=None, vehicle_id=None, window=Window(None, None), session=session)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings, result
+
+
+def same_months(a, b):
+    return [r["month"] for r in a] == [r["month"] for r in b] and all(
+        abs(x[f] - y[f]) <= 1e-6 * max(1, abs(x[f])) for x, y in zip(a, b) for f in x if f != "month"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", type=int, default=200_000)
+    parser.add_argument("--vehicles", type=int, default=1_000)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--keep-months", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    shutil.rmtree(ARCHIVE_DIR, ignore_errors=True)
+    seed_fleet(engine, vehicles=args.vehicles, drivers=args.vehicles, trips=args.trips, years=args.years)
+
+    live_ms, live = asyncio.run(time_history(args.repeat))
+
+    # The seeder leaves drafts and dispatched trips in every month; a month
+    # with open trips is never archived, so close the old ones first.
+    before = add_months(month_start(datetime.utcnow()), 1 - args.keep_months)
+    with engine.begin() as conn:
+        conn.execute(
+            update(Trip).where(Trip.created_at < before, Trip.status.in_(("draft", "dispatched")))
+            .values(status="cancelled")
+        )
+
+    started = time.perf_counter()
+    results = archive_history(engine, before=before)
+    archive_s = time.perf_counter() - started
+    rows = sum(r["rows"] for r in results)
+    skipped = sum("skipped" in r for r in results)
+    size = sum(p.stat().st_size for p in ARCHIVE_DIR.rglob("*.parquet"))
+
+    union_ms, union = asyncio.run(time_history(args.repeat))
+
+    print(f"archived {rows} rows in {archive_s:.1f}s ({skipped} months skipped), {size / 1e6:.1f} MB of Parquet")
+    print(f"{'source':>14} {'median ms':>10} {'min ms':>10}")
+    print(f"{'live':>14} {statistics.median(live_ms):>10.1f} {min(live_ms):>10.1f}")
+    print(f"{'live+archive':>14} {statistics.median(union_ms):>10.1f} {min(union_ms):>10.1f}")
+    print(f"results agree: {'yes' if same_months(live, union) else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
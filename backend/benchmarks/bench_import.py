@@ -0,0 +1,105 @@
+"""
+Bulk fuel/maintenance import throughput versus one ORM insert per row.
+
+Seeds a fleet with no history, generates fuel logs as CSV in memory (a few
+percent pointing at unknown vehicles so the reject path is exercised), loads
+them with app.importer.import_logs and reports rows/s. The baseline inserts a
+sample through the ORM with a vehicle lookup and a commit per row, the way
+POST /fuel/ does. The VehicleStats rollups are checked after the import.
+
+Usage (from backend/):
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --rows 1000000 --format ndjson
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_import.db")
+
+from sqlmodel import Session  # noqa: E402
+
+from app.db import engine  # noqa: E402
+from app.importer import CHUNK_SIZE, import_logs  # noqa: E402
+from app.models.fuel import Fuel  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402
+from app.stats import reconcile_stats  # noqa: E402
+from benchmarks.seed import seed_fleet  # noqa: E402
+
+FIELDS = ["vehicle_id", "liters", "cost", "fuel_date"]
+
+
+def generate(rows, vehicles, fmt, bad_ratio, rng):
+    start = datetime.utcnow() - timedelta(days=3 * 365)
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, FIELDS)
+        writer.writeheader()
+
+    for _ in range(rows):
+        record = {
+            "vehicle_id": vehicles + 1 if rng.random() < bad_ratio else rng.randint(1, vehicles),
+            "liters": round(rng.uniform(10, 200), 2),
+            "cost": round(rng.uniform(50, 2_000), 2),
+            "fuel_date": (start + timedelta(minutes=rng.randint(0, 3 * 365 * 1440))).isoformat(),
+        }
+        if writer:
+            writer.writerow(record)
+        else:
+            buffer.write(json.dumps(record) + "\n")
+
+    buffer.seek(0)
+    return buffer
+
+
+def per_row_baseline(rows, vehicles, rng):
+    started = time.perf_counter()
+    with Session(engine) as session:
+        for _ in range(rows):
+            vehicle_id = rng.randint(1, vehicles)
+            session.get(Vehicle, vehicle_id)
+            session.add(Fuel(vehicle_id=vehicle_id, liters=50, cost=100))
+            session.commit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--vehicles", type=int, default=3_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--bad-ratio", type=float, default=0.02)
+    parser.add_argument("--baseline-rows", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    seed_fleet(engine, vehicles=args.vehicles, drivers=1, trips=0, fuel_logs=0, maintenance_logs=0)
+    stream = generate(args.rows, args.vehicles, args.format, args.bad_ratio, rng)
+
+    started = time.perf_counter()
+    report = import_logs(engine, "fuel", stream, args.format, args.chunk_size)
+    bulk_s = time.perf_counter() - started
+
+    with Session(engine) as session:
+        mismatches = reconcile_stats(session)
+
+    # Runs after the check: these rows bypass the rollups.
+    baseline_s = per_row_baseline(args.baseline_rows, args.vehicles, rng)
+
+    print(f"{'path':<10} {'rows':>10} {'seconds':>9} {'rows/s':>10}")
+    print(f"{'bulk':<10} {args.rows:>10} {bulk_s:>9.2f} {args.rows / bulk_s:>10.0f}")
+    print(f"{'per-row':<10} {args.baseline_rows:>10} {baseline_s:>9.2f} {args.baseline_rows / baseline_s:>10.0f}")
+    print(f"imported {report['imported']}, rejected {report['rejected']}, rollup mismatches {len(mismatches)}")
+
+
+if __name__ == "__main__":
+    main()
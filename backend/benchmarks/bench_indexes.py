@@ -0,0 +1,93 @@
+"""
+Check that the hot query predicates are served by indexes.
+
+Seeds a fleet, runs EXPLAIN on each access path and fails if any of them
+falls back to a full table scan. Also prints the median latency of each query.
+
+Usage (from backend/):
+    python -m benchmarks.bench_indexes
+    python -m benchmarks.bench_indexes --trips 1000000 --vehicles 3000
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from sqlalchemy import text
+from sqlmodel import create_engine
+
+from benchmarks.seed import seed_fleet
+
+HOT_QUERIES = {
+    "trips by vehicle+status":
+        "SELECT * FROM trip WHERE vehicle_id = 7 AND status = 'completed'",
+    "trips by driver+status":
+        "SELECT * FROM trip WHERE driver_id = 7 AND status = 'completed'",
+    "trip list by status (keyset)":
+        "SELECT * FROM trip WHERE status = 'dispatched' AND id > 1000 ORDER BY id LIMIT 101",
+    "trips by date range":
+        "SELECT * FROM trip WHERE created_at >= '2026-01-01' AND created_at < '2026-01-02'",
+    "fuel by vehicle":
+        "SELECT * FROM fuel WHERE vehicle_id = 7",
+    "maintenance by vehicle":
+        "SELECT * FROM maintenance WHERE vehicle_id = 7",
+    "vehicle list by status (keyset)":
+        "SELECT * FROM vehicle WHERE status = 'in_shop' AND id > 100 ORDER BY id LIMIT 101",
+    "driver list by status (keyset)":
+        "SELECT * FROM driver WHERE status = 'available' AND id > 100 ORDER BY id LIMIT 101",
+}
+
+
+def explain(conn, dialect, sql):
+    if dialect == "postgresql":
+        plan = "\n".join(row[0] for row in conn.execute(text(f"EXPLAIN {sql}")))
+        return plan, "Seq Scan" not in plan
+
+    # SQLite: a bare "SCAN <table>" detail line is a full table scan.
+    details = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    full_scan = any(d.startswith("SCAN") and "USING" not in d for d in details)
+    return "\n".join(details), not full_scan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trips", type=int, default=200_000)
+    parser.add_argument("--vehicles", type=int, default=3_000)
+    parser.add_argument("--drivers", type=int, default=3_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(os.getenv("DATABASE_URL", "sqlite:///bench_indexes.db"))
+    seed_fleet(engine, vehicles=args.vehicles, drivers=args.drivers, trips=args.trips)
+
+    dialect = engine.dialect.name
+    failures = 0
+
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+
+        for name, sql in HOT_QUERIES.items():
+            plan, uses_index = explain(conn, dialect, sql)
+
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql)).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+
+            status = "index" if uses_index else "FULL SCAN"
+            print(f"{name:<34} {status:<10} {statistics.median(timings):>8.2f} ms")
+            if not uses_index:
+                failures += 1
+                print("    " + plan.replace("\n", "\n    "))
+
+    if failures:
+        print(f"{failures} queries are not index-backed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
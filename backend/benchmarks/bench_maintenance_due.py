@@ -0,0 +1,75 @@
+"""
+Maintenance due list: schedule index versus scoring the whole fleet.
+
+Builds an app.maintenance_schedule.MaintenanceSchedule for --vehicles
+vehicles in memory (no database), then times most_due(N) against the
+reference that scores every vehicle and sorts, which must agree, and the
+cost of one trip completion (odometer update) on the index.
+
+Usage (from backend/):
+    python -m benchmarks.bench_maintenance_due
+    python -m benchmarks.bench_maintenance_due --vehicles 1000 10000 100000 --top 20
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.maintenance_schedule import MaintenanceSchedule
+
+
+def build(vehicles, rng, now):
+    schedule = MaintenanceSchedule(reconcile_interval=0)
+    for i in range(1, vehicles + 1):
+        service_odometer = rng.uniform(0, 200_000)
+        schedule._put({
+            "id": i, "name": f"Vehicle {i}", "license_plate": f"TRK-{i:06d}", "region": "North",
+            "vehicle_type": "truck", "status": "available",
+            "odometer": service_odometer + rng.uniform(0, 15_000),
+            "service_date": now - timedelta(days=rng.uniform(0, 300)),
+            "service_odometer": service_odometer,
+        })
+    return schedule
+
+
+def per_call(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    print(f"{'vehicles':>9} {'index ms':>9} {'scan ms':>9} {'speedup':>8} {'update us':>10} {'agree':>6}")
+    for vehicles in args.vehicles:
+        rng = random.Random(args.seed)
+        schedule = build(vehicles, rng, now)
+
+        index_s, top = per_call(lambda: schedule.most_due(args.top, now), 200)
+        scan_s, reference = per_call(lambda: [
+            schedule._entry(row, now) for row in sorted(
+                schedule._vehicles.values(), key=lambda row: (-max(schedule._ratios(row, now)), row["id"]),
+            )[:args.top]
+        ], 3)
+
+        def complete_trip():
+            row = schedule._vehicles[rng.randint(1, vehicles)]
+            schedule.apply([("vehicle.status", {**row, "odometer": row["odometer"] + 300})])
+
+        update_s, _ = per_call(complete_trip, 2_000)
+
+        print(
+            f"{vehicles:>9} {index_s * 1000:>9.3f} {scan_s * 1000:>9.1f} {scan_s / index_s:>7.0f}x "
+            f"{update_s * 1e6:>10.1f} {'yes' if top == reference else 'NO':>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
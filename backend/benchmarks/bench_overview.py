@@ -0,0 +1,55 @@
+"""
+Latency of /analytics/overview as trip history grows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_overview
+    python -m benchmarks.bench_overview --trips 10000 100000 1000000 --vehicles 3000
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_overview.db")
+# Measure the query itself, not the analytics cache.
+os.environ.setdefault("ANALYTICS_CACHE_TTL", "0")
+
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from app.db import engine, async_engine  # noqa: E402
+from app.routes.analytics_routes import Window, fleet_overview  # noqa: E402
+from benchmarks.seed import seed_fleet  # noqa: E402
+
+
+async def time_overview(repeat):
+    timings = []
+    for _ in range(repeat):
+        async with AsyncSession(async_engine) as session:
+            started = time.perf_counter()
+            await fleet_overview(region=None, window=Window(None, None), session=session)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trips", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--vehicles", type=int, default=3_000)
+    parser.add_argument("--drivers", type=int, default=3_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'trips':>10} {'median ms':>10} {'min ms':>10}")
+    for trips in args.trips:
+        seed_fleet(engine, vehicles=args.vehicles, drivers=args.drivers, trips=trips)
+
+        timings = asyncio.run(time_overview(args.repeat))
+
+        print(f"{trips:>10} {statistics.median(timings):>10.1f} {min(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
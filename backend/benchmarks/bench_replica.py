@@ -0,0 +1,110 @@
+"""
+Primary write latency under analytics load, with and without a read replica.
+
+Seeds the primary, then times fuel-log inserts (insert + commit on the
+primary) for --duration seconds in three phases: no readers, --readers
+concurrent analytics readers on the primary, and the same readers on the
+replica session (app.db.read_session_factory).
+
+Usage (from backend/):
+    python -m benchmarks.bench_replica
+    python -m benchmarks.bench_replica --readers 16 --duration 20 --trips 500000
+
+With DATABASE_URL and READ_DATABASE_URL set, runs against those two
+(a PostgreSQL primary and its streaming standby). Otherwise it uses a SQLite
+primary file and a copy of it as the stand-in replica; SQLite serialises
+writers and readers per file, so the stand-in shows the effect of moving the
+scans to another database, not replication.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///bench_replica.db"
+    os.environ.setdefault("READ_DATABASE_URL", "sqlite:///bench_replica_read.db")
+# Measure the queries, not the analytics cache.
+os.environ.setdefault("ANALYTICS_CACHE_TTL", "0")
+
+from app.db import engine, async_session_factory, read_session_factory, replica  # noqa: E402
+from app.models.fuel import Fuel  # noqa: E402
+from app.routes.analytics_routes import Window, _fleet_overview, daily_trend, fleet_roi  # noqa: E402
+from benchmarks.load_test import percentile  # noqa: E402
+from benchmarks.seed import seed_fleet  # noqa: E402
+
+
+async def reader(session_factory, stop):
+    queries = 0
+    while not stop.is_set():
+        async with session_factory() as session:
+            window = Window(None, None)
+            await _fleet_overview(session, None, window)
+            await fleet_roi(vehicle_ids=None, region=None, window=window, session=session)
+            await daily_trend(region=None, vehicle_id=None, window=window, session=session)
+        queries += 3
+    return queries
+
+
+async def writer(vehicles, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        i += 1
+        started = time.perf_counter()
+        async with async_session_factory() as session:
+            session.add(Fuel(vehicle_id=i % vehicles + 1, liters=50, cost=120, fuel_date=datetime.utcnow()))
+            await session.commit()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def phase(readers, session_factory, vehicles, duration):
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(reader(session_factory, stop)) for _ in range(readers)]
+    latencies = await writer(vehicles, duration)
+    stop.set()
+    reads = sum(await asyncio.gather(*tasks))
+    return latencies, reads / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, default=1_000)
+    parser.add_argument("--trips", type=int, default=200_000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--no-seed", action="store_true", help="Use the databases as they are")
+    args = parser.parse_args()
+
+    if not replica.enabled:
+        parser.error("READ_DATABASE_URL is not set")
+
+    if not args.no_seed:
+        seed_fleet(engine, vehicles=args.vehicles, drivers=args.vehicles, trips=args.trips)
+        if engine.dialect.name == "sqlite":
+            shutil.copyfile(engine.url.database, os.environ["READ_DATABASE_URL"].split("///", 1)[1])
+
+    asyncio.run(run_phases(args))
+
+
+async def run_phases(args):
+    # One event loop for every phase: pooled async connections belong to it.
+    print(f"{'readers on':>12} {'writes':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'reads/s':>8}")
+    for label, readers, factory in (
+        ("(none)", 0, async_session_factory),
+        ("primary", args.readers, async_session_factory),
+        ("replica", args.readers, read_session_factory),
+    ):
+        latencies, reads_per_s = await phase(readers, factory, args.vehicles, args.duration)
+        print(
+            f"{label:>12} {len(latencies):>7} {percentile(latencies, 50):>8.1f} "
+            f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f} {reads_per_s:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
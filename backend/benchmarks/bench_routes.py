@@ -0,0 +1,284 @@
+"""
+Per-route latency and throughput at several fleet sizes, with run comparison.
+
+For each --scale, seeds the database (benchmarks.seed), starts a uvicorn
+server on it, and drives every scenario below with --clients concurrent
+clients for --duration seconds each. Reports p50/p95/p99 latency, requests/s
+and errors per scenario and writes everything to a JSON file, so two runs
+(e.g. main vs a branch) can be compared:
+
+    python -m benchmarks.bench_routes --scale small medium --out base.json
+    python -m benchmarks.bench_routes --scale small medium --out branch.json
+    python -m benchmarks.bench_routes --compare base.json branch.json --threshold 10
+
+--compare exits with status 1 when any scenario's p95 grew, or its
+throughput dropped, by more than --threshold percent.
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+Pass --url to measure an already running (and already seeded) server
+instead; nothing is seeded or started then. Needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from benchmarks.load_test import percentile
+from benchmarks.seed import REGIONS, SCALES
+from benchmarks.stress_dispatch import create_pool
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_scenarios(vehicles, drivers):
+    """name -> function(rng) returning (method, path, json body or None)."""
+    month_ago = (date.today() - timedelta(days=30)).isoformat()
+
+    def get(path):
+        return lambda rng: ("GET", path.format(vehicle=rng.randint(1, vehicles), driver=rng.randint(1, drivers),
+                                               region=rng.choice(REGIONS), month_ago=month_ago), None)
+
+    def plan(rng):
+        loads = [{"cargo_weight": rng.uniform(10, 4000), "region": rng.choice(REGIONS)} for _ in range(100)]
+        return "POST", "/dispatch/plan", loads
+
+    return {
+        "GET /analytics/dashboard": get("/analytics/dashboard"),
+        "GET /analytics/overview": get("/analytics/overview"),
+        "GET /analytics/overview?region&from": get("/analytics/overview?region={region}&from={month_ago}"),
+        "GET /analytics/roi": get("/analytics/roi"),
+        "GET /analytics/daily": get("/analytics/daily?from={month_ago}"),
+        "GET /analytics/vehicle/{id}/cost": get("/analytics/vehicle/{vehicle}/cost"),
+        "GET /analytics/vehicle/{id}/roi": get("/analytics/vehicle/{vehicle}/roi"),
+        "GET /vehicles/{id}/grade": get("/vehicles/{vehicle}/grade"),
+        "GET /vehicles/": get("/vehicles/?limit=100"),
+        "GET /vehicles/available": get("/vehicles/available"),
+        "GET /drivers/": get("/drivers/?limit=100"),
+        "GET /drivers/available": get("/drivers/available"),
+        "GET /trips/": get("/trips/?limit=100&status=completed"),
+        "GET /fuel/": get("/fuel/?limit=100&vehicle_id={vehicle}"),
+        "GET /maintenance/": get("/maintenance/?limit=100&vehicle_id={vehicle}"),
+        "POST /dispatch/plan (100 loads)": plan,
+    }
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+async def drive(clients, duration, worker):
+    """Run `worker(i, deadline, latencies, errors)` on `clients` tasks; returns the summary and elapsed time."""
+    latencies, errors = [], [0]
+    deadline = time.perf_counter() + duration
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i, deadline, latencies, errors) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    return summarize(latencies, errors, elapsed), elapsed
+
+
+async def timed(client, method, path, body, latencies, errors):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, path, json=body)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        response, ok = None, False
+    latencies.append((time.perf_counter() - started) * 1000)
+    if not ok:
+        errors[0] += 1
+    return response if ok else None
+
+
+async def run_read(client, scenario, clients, duration):
+    async def worker(i, deadline, latencies, errors):
+        rng = random.Random(i)
+        while time.perf_counter() < deadline:
+            await timed(client, *scenario(rng), latencies, errors)
+
+    return (await drive(clients, duration, worker))[0]
+
+
+async def run_trip_cycle(client, clients, duration):
+    """Each client owns one fresh vehicle/driver pair and dispatches then completes trips with it."""
+    vehicle_ids, driver_ids = await create_pool(client, clients, clients, uuid.uuid4().hex[:8])
+    dispatch_latencies, dispatch_errors = [], [0]
+
+    async def worker(i, deadline, latencies, errors):
+        odometer = 1
+        while time.perf_counter() < deadline:
+            trip = await timed(client, "POST", "/trips/", {
+                "vehicle_id": vehicle_ids[i], "driver_id": driver_ids[i], "cargo_weight": 100,
+                "origin": "Bench", "destination": "Bench", "start_odometer": odometer,
+            }, dispatch_latencies, dispatch_errors)
+            if trip is None:
+                continue
+            odometer += 50
+            await timed(client, "PATCH", f"/trips/{trip.json()['id']}/complete?end_odometer={odometer}&revenue=100",
+                        None, latencies, errors)
+
+    complete, elapsed = await drive(clients, duration, worker)
+    dispatch = summarize(dispatch_latencies, dispatch_errors, elapsed)
+    return {"POST /trips/": dispatch, "PATCH /trips/{id}/complete": complete}
+
+
+async def run_scale(url, scale, args):
+    vehicles, drivers = SCALES[scale][:2]
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    results = {}
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        response = await client.post("/auth/login", data={"email": args.email, "password": args.password})
+        response.raise_for_status()
+
+        for name, scenario in read_scenarios(vehicles, drivers).items():
+            if args.only and not any(o in name for o in args.only):
+                continue
+            results[name] = await run_read(client, scenario, args.clients, args.duration)
+            print_result(scale, name, results[name])
+
+        if not args.only or any(o in "POST /trips/ PATCH /trips/{id}/complete" for o in args.only):
+            for name, result in (await run_trip_cycle(client, args.clients, args.duration)).items():
+                results[name] = result
+                print_result(scale, name, result)
+
+    return results
+
+
+def print_result(scale, name, r):
+    print(f"{scale:<8} {name:<38} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+          f"{r['p99_ms']:>8.1f} {r['errors']:>7}", flush=True)
+
+
+def start_server(port, workers, env):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if httpx.get(url + "/").status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    database_url = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(BACKEND_DIR, 'bench_routes.db')}")
+    report = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "database": database_url.split(":", 1)[0],
+        "clients": args.clients,
+        "duration_s": args.duration,
+        "workers": args.workers,
+        "scales": {},
+    }
+
+    print(f"{'scale':<8} {'scenario':<38} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for scale in args.scale:
+        if args.url:
+            report["scales"][scale] = asyncio.run(run_scale(args.url, scale, args))
+            continue
+
+        vehicles, drivers, trips, years = SCALES[scale]
+        env = {"AUTH_DEV_MODE": "1", **os.environ, "DATABASE_URL": database_url}
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.seed", "--scale", scale], cwd=BACKEND_DIR, env=env, check=True,
+        )
+        server, url = start_server(args.port, args.workers, env)
+        try:
+            report["scales"][scale] = asyncio.run(run_scale(url, scale, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.out}")
+
+
+def compare(base_path, new_path, threshold):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"base {base.get('git_revision')} ({base['created_at']})  vs  new {new.get('git_revision')} ({new['created_at']})")
+    print(f"{'scale':<8} {'scenario':<38} {'p50 %':>8} {'p95 %':>8} {'p99 %':>8} {'req/s %':>8}")
+
+    def change(old, value):
+        return (value - old) / old * 100 if old else 0.0
+
+    regressions = []
+    for scale, scenarios in new["scales"].items():
+        for name, result in scenarios.items():
+            old = base["scales"].get(scale, {}).get(name)
+            if old is None:
+                continue
+            deltas = {key: change(old[key], result[key]) for key in ("p50_ms", "p95_ms", "p99_ms", "rps")}
+            worse = deltas["p95_ms"] > threshold or deltas["rps"] < -threshold
+            print(
+                f"{scale:<8} {name:<38} {deltas['p50_ms']:>+8.1f} {deltas['p95_ms']:>+8.1f} "
+                f"{deltas['p99_ms']:>+8.1f} {deltas['rps']:>+8.1f}{'  REGRESSION' if worse else ''}"
+            )
+            if worse:
+                regressions.append((scale, name))
+
+    print(f"{len(regressions)} regression(s) beyond {threshold:g}%")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", nargs="+", choices=SCALES, default=["small"])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--url", help="measure this running server instead of seeding and starting one")
+    parser.add_argument("--only", nargs="+", help="run only scenarios whose name contains one of these")
+    parser.add_argument("--out", default="bench_routes.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"))
+    parser.add_argument("--threshold", type=float, default=10, help="percent, for --compare")
+    parser.add_argument("--email", default="admin@fleetflow.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Fleet-wide driver rescoring: vectorised NumPy pass versus a per-trip loop.
+
+Seeds a fleet, then recomputes every driver's safety score twice: with
+app.safety.rescore_drivers (streamed columns, bincount, one executemany
+UPDATE) and with a reference loop that applies apply_trip() trip by trip
+through the ORM. The two must agree.
+
+Usage (from backend/):
+    python -m benchmarks.bench_safety
+    python -m benchmarks.bench_safety --trips 1000000 5000000 --drivers 20000
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_safety.db")
+
+from sqlmodel import Session, select  # noqa: E402
+
+from app.db import engine  # noqa: E402
+from app.models.driver import Driver  # noqa: E402
+from app.models.trip import Trip  # noqa: E402
+from app.safety import BASE_SCORE, apply_trip, rescore_drivers  # noqa: E402
+from benchmarks.seed import seed_fleet  # noqa: E402
+
+
+def per_trip_loop():
+    """Reference: replay every completed trip through apply_trip, then commit."""
+    started = time.perf_counter()
+    with Session(engine) as session:
+        drivers = {d.id: d for d in session.exec(select(Driver))}
+        for driver in drivers.values():
+            driver.safety_score = BASE_SCORE
+
+        for trip in session.exec(select(Trip).where(Trip.status == "completed").execution_options(yield_per=10_000)):
+            apply_trip(drivers[trip.driver_id], trip)
+
+        for driver in drivers.values():
+            if driver.safety_score == BASE_SCORE:
+                driver.risk_level = "Low"  # no completed trips
+        session.commit()
+
+        scores = {d.id: (round(d.safety_score, 6), d.risk_level) for d in drivers.values()}
+    return time.perf_counter() - started, scores
+
+
+def stored_scores():
+    with Session(engine) as session:
+        return {
+            d.id: (round(d.safety_score, 6), d.risk_level) for d in session.exec(select(Driver))
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--drivers", type=int, default=5_000)
+    parser.add_argument("--vehicles", type=int, default=1_000)
+    parser.add_argument("--skip-loop", action="store_true", help="Only time the vectorised pass")
+    args = parser.parse_args()
+
+    print(f"{'trips':>10} {'vectorised s':>13} {'trips/s':>12} {'loop s':>8} {'changed':>8} {'agree':>6}")
+    for trips in args.trips:
+        seed_fleet(engine, vehicles=args.vehicles, drivers=args.drivers, trips=trips,
+                   fuel_logs=0, maintenance_logs=0)
+
+        started = time.perf_counter()
+        result = rescore_drivers(engine)
+        vectorised_s = time.perf_counter() - started
+        vectorised = stored_scores()
+
+        loop_s, agree = float("nan"), "-"
+        if not args.skip_loop:
+            loop_s, looped = per_trip_loop()
+            agree = "yes" if looped == vectorised else "NO"
+
+        print(
+            f"{trips:>10} {vectorised_s:>13.2f} {trips / vectorised_s:>12.0f} "
+            f"{loop_s:>8.2f} {result['changed']:>8} {agree:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Worker start-up: import time and cold start to first response.
+
+1. Runs `python -X importtime -c "import main"` --repeat times and reports
+   the median total import time and the slowest top-level packages.
+2. Starts uvicorn with each --workers count, twice: on a database whose
+   schema version is out of date (first boot: one worker migrates while the
+   others wait on the lock) and again on the now-current database (restart).
+   Reports the wall time from launching the server to the first 200 on /,
+   and the in-process phases the answering worker reports in /metrics
+   (fleetflow_startup_seconds: imported, ready, first_response).
+
+Usage (from backend/, needs httpx):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --workers 1 4 16 --repeat 5
+
+Runs against DATABASE_URL, or a throwaway SQLite file when it is not set.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+from sqlalchemy import create_engine, inspect, text
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_LINE = re.compile(r'fleetflow_startup_seconds\{phase="(\w+)"\} ([0-9.e-]+)')
+
+
+def import_times(env, repeat, top):
+    totals = []
+    packages = defaultdict(list)
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if name.startswith("  "):
+                continue  # nested imports are indented further; keep top-level ones
+            packages[name.strip()].append(int(cumulative) / 1000)
+            if name.strip() == "main":
+                totals.append(int(cumulative) / 1000)
+
+    slowest = sorted(packages.items(), key=lambda kv: -statistics.median(kv[1]))
+    return statistics.median(totals), [(name, statistics.median(ms)) for name, ms in slowest[:top]]
+
+
+def reset_schema_version(database_url):
+    engine = create_engine(database_url)
+    # Without the table yet, the first boot creates everything anyway.
+    if inspect(engine).has_table("schemaversion"):
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM schemaversion"))
+    engine.dispose()
+
+
+def cold_start(env, port, workers):
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            try:
+                if httpx.get(url + "/").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.02)
+        else:
+            raise RuntimeError("server did not start")
+
+        first_response = time.perf_counter() - started
+        phases = dict(
+            (phase, float(seconds)) for phase, seconds in STARTUP_LINE.findall(httpx.get(url + "/metrics").text)
+        )
+        return first_response, phases
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(BACKEND_DIR, 'bench_startup.db')}")
+    env = {"AUTH_DEV_MODE": "1", **os.environ, "DATABASE_URL": database_url}
+
+    total_ms, slowest = import_times(env, args.repeat, args.top)
+    print(f"import main: {total_ms:.0f} ms (median of {args.repeat})")
+    for name, ms in slowest:
+        print(f"  {name:<40} {ms:>8.1f} ms")
+
+    print()
+    print(f"{'workers':>7} {'boot':>10} {'first resp s':>13} {'imported s':>11} {'ready s':>8}")
+    for workers in args.workers:
+        for boot in ("first", "restart"):
+            if boot == "first":
+                reset_schema_version(database_url)
+            first_response, phases = cold_start(env, args.port, workers)
+            print(
+                f"{workers:>7} {boot:>10} {first_response:>13.2f} "
+                f"{phases.get('imported', 0):>11.2f} {phases.get('ready', 0):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
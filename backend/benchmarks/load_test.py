@@ -0,0 +1,112 @@
+"""
+Concurrent-client load test for a running FleetFlow server.
+
+Each level starts N clients that hit the endpoint mix in a loop for a fixed
+duration, then reports throughput and latency percentiles. Pass
+--baseline-url to run the same load against a second server (for example a
+checkout of the sync-session build on another port) and print both side by side.
+
+Usage (from backend/, needs httpx):
+    uvicorn main:app --workers 4 --port 8000
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 \
+        --baseline-url http://127.0.0.1:8001 --clients 50 200 1000
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/analytics/dashboard",
+    "/analytics/overview",
+    "/vehicles/?limit=100",
+    "/drivers/?limit=100",
+    "/trips/?limit=100&status=dispatched",
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(url, paths, clients, duration, email, password):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        login = await client.post("/auth/login", data={"email": email, "password": password})
+        login.raise_for_status()
+
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+        cycle = itertools.cycle(paths)
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(next(cycle))
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) if latencies else 0,
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def print_row(label, result):
+    print(
+        f"{label:<10} {result['clients']:>7} {result['requests']:>9} {result['errors']:>7} "
+        f"{result['rps']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+    )
+
+
+async def main_async(args):
+    targets = [("current", args.url)]
+    if args.baseline_url:
+        targets.append(("baseline", args.baseline_url))
+
+    print(f"{'target':<10} {'clients':>7} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for clients in args.clients:
+        for label, url in targets:
+            result = await run_level(url, args.paths, clients, args.duration, args.email, args.password)
+            print_row(label, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--baseline-url")
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    parser.add_argument("--email", default="admin@fleetflow.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Synthetic fleet generator used by the benchmarks.
+
+Rows are written with bulk Core inserts in chunks, so seeding a million trips
+does not go through the ORM unit of work. Trips, fuel and maintenance logs
+are spread over the last `years` years, and the analytics rollups are rebuilt
+at the end.
+
+Can also be run on its own to prepare a database for a server:
+    python -m benchmarks.seed --scale medium
+    python -m benchmarks.seed --vehicles 5000 --drivers 6000 --trips 2000000 --years 3
+
+Seeds DATABASE_URL (dropping every table first), or a SQLite file when it is
+not set, and creates the demo users the load tests log in with.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlmodel import SQLModel, Session
+
+from app.models.vehicle import Vehicle
+from app.models.driver import Driver
+from app.models.trip import Trip
+from app.models.maintenance import Maintenance
+from app.models.fuel import Fuel
+from app.models.user import User  # noqa: F401  (registers the table)
+from app.models.trip_event import TripEvent  # noqa: F401  (dropped with the trips it references)
+from app.models.fuel_baseline import FuelBaseline  # noqa: F401
+from app.models.fuel_anomaly import FuelAnomaly  # noqa: F401
+from app.models.service_schedule import ServiceSchedule  # noqa: F401
+from app.stats import rebuild_stats
+from app.partitions import ensure_partitions
+from app.bootstrap import migrate, seed_demo_users
+from app.maintenance_schedule import rebuild_service_schedule
+
+CHUNK_SIZE = 10_000
+
+# --scale presets: vehicles, drivers, trips, years
+SCALES = {
+    "small": (100, 120, 10_000, 1),
+    "medium": (1_000, 1_200, 500_000, 2),
+    "large": (5_000, 6_000, 5_000_000, 3),
+}
+
+REGIONS = ["North", "South", "East", "West"]
+VEHICLE_TYPES = ["truck", "van", "bike"]
+
+
+def _insert(conn, table, rows):
+    for i in range(0, len(rows), CHUNK_SIZE):
+        conn.execute(table.insert(), rows[i:i + CHUNK_SIZE])
+
+
+def seed_fleet(engine, vehicles=100, drivers=100, trips=10_000, fuel_logs=None,
+               maintenance_logs=None, rng_seed=42, years=1):
+    """
+    Drop and recreate the schema, then fill it with a random fleet.
+
+    fuel_logs and maintenance_logs default to a tenth and a fiftieth of the
+    trip count.
+    """
+    rng = random.Random(rng_seed)
+    fuel_logs = trips // 10 if fuel_logs is None else fuel_logs
+    maintenance_logs = trips // 50 if maintenance_logs is None else maintenance_logs
+
+    SQLModel.metadata.drop_all(engine)
+    migrate(engine)
+
+    days = int(365 * years)
+    start = datetime.utcnow() - timedelta(days=days)
+    ensure_partitions(engine, start)
+
+    with engine.begin() as conn:
+        _insert(conn, Vehicle.__table__, [
+            {
+                "id": i,
+                "name": f"Vehicle {i}",
+                "model": "Model X",
+                "license_plate": f"TRK-{i:06d}",
+                "max_capacity": rng.choice([500, 1000, 5000, 10000]),
+                "odometer": 0,
+                "status": rng.choice(["available", "available", "on_trip", "in_shop"]),
+                "acquisition_cost": rng.uniform(20_000, 120_000),
+                "vehicle_type": rng.choice(VEHICLE_TYPES),
+                "region": rng.choice(REGIONS),
+            }
+            for i in range(1, vehicles + 1)
+        ])
+
+        _insert(conn, Driver.__table__, [
+            {
+                "id": i,
+                "name": f"Driver {i}",
+                "license_number": f"LIC-{i:06d}",
+                "license_category": "HMV",
+                "license_expiry": date.today() + timedelta(days=rng.randint(-30, 1500)),
+                "status": "available",
+                "safety_score": rng.uniform(30, 100),
+                "risk_level": rng.choice(["Low", "Low", "Medium", "High"]),
+                "trip_completed": 0,
+            }
+            for i in range(1, drivers + 1)
+        ])
+
+        rows = []
+        for i in range(1, trips + 1):
+            start_odometer = rng.uniform(1_000, 200_000)
+            completed = rng.random() < 0.9
+            rows.append({
+                "id": i,
+                "vehicle_id": rng.randint(1, vehicles),
+                "driver_id": rng.randint(1, drivers),
+                "cargo_weight": rng.uniform(10, 500),
+                "origin": "Warehouse",
+                "destination": rng.choice(REGIONS),
+                "status": "completed" if completed else rng.choice(["dispatched", "draft", "cancelled"]),
+                "start_odometer": start_odometer,
+                "end_odometer": start_odometer + rng.uniform(5, 800) if completed else None,
+                "revenue": rng.uniform(100, 5_000) if completed else 0,
+                "overspeed_count": rng.randint(0, 5),
+                "harsh_brake_count": rng.randint(0, 4),
+                "accident_reported": rng.random() < 0.02,
+                "is_night_trip": rng.random() < 0.2,
+                "created_at": start + timedelta(minutes=rng.randint(0, days * 24 * 60)),
+            })
+            if len(rows) == CHUNK_SIZE:
+                _insert(conn, Trip.__table__, rows)
+                rows = []
+        _insert(conn, Trip.__table__, rows)
+
+        _insert(conn, Fuel.__table__, [
+            {
+                "id": i,
+                "vehicle_id": rng.randint(1, vehicles),
+                "trip_id": None,
+                "liters": rng.uniform(20, 400),
+                "cost": rng.uniform(50, 1_500),
+                "fuel_date": start + timedelta(minutes=rng.randint(0, days * 24 * 60)),
+            }
+            for i in range(1, fuel_logs + 1)
+        ])
+
+        _insert(conn, Maintenance.__table__, [
+            {
+                "id": i,
+                "vehicle_id": rng.randint(1, vehicles),
+                "description": rng.choice(["Oil change", "Engine repair", "Tyres", "Body work"]),
+                "cost": rng.uniform(100, 8_000),
+                "service_date": start + timedelta(days=rng.randint(0, days)),
+            }
+            for i in range(1, maintenance_logs + 1)
+        ])
+
+    with Session(engine) as session:
+        rebuild_stats(session)
+    rebuild_service_schedule(engine)
+    seed_demo_users(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--vehicles", type=int)
+    parser.add_argument("--drivers", type=int)
+    parser.add_argument("--trips", type=int)
+    parser.add_argument("--years", type=float)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    vehicles, drivers, trips, years = SCALES[args.scale]
+    vehicles = args.vehicles or vehicles
+    drivers = args.drivers or drivers
+    trips = args.trips if args.trips is not None else trips
+    years = args.years or years
+
+    from sqlmodel import create_engine
+
+    engine = create_engine(os.getenv("DATABASE_URL", "sqlite:///fleet_seed.db"))
+    started = time.perf_counter()
+    seed_fleet(engine, vehicles=vehicles, drivers=drivers, trips=trips, years=years, rng_seed=args.seed)
+    print(
+        f"seeded {vehicles} vehicles, {drivers} drivers, {trips} trips over {years:g} years "
+        f"into {engine.url.render_as_string()} in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
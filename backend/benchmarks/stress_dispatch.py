@@ -0,0 +1,152 @@
+"""
+Concurrency stress test for trip dispatch against a running server.
+
+Creates a small pool of vehicles and drivers, then fires many simultaneous
+POST /trips/ requests at random vehicle/driver pairs. After each round it
+checks that no vehicle or driver holds more than one dispatched trip, and
+that every accepted dispatch is still dispatched. It then completes the
+trips to free the pool for the next round. Reports dispatch throughput.
+
+Usage (from backend/, needs httpx):
+    python -m benchmarks.stress_dispatch --url http://127.0.0.1:8000 \
+        --vehicles 20 --drivers 20 --requests 5000 --rounds 3
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+
+async def create_pool(client, vehicles, drivers, tag):
+    vehicle_ids, driver_ids = [], []
+
+    for i in range(vehicles):
+        response = await client.post("/vehicles/", json={
+            "name": f"Stress {i}", "model": "Stress", "license_plate": f"STR-{tag}-{i}",
+            "max_capacity": 10_000, "acquisition_cost": 50_000,
+            "vehicle_type": "truck", "region": "stress",
+        })
+        response.raise_for_status()
+        vehicle_ids.append(response.json()["id"])
+
+    for i in range(drivers):
+        response = await client.post("/drivers/", json={
+            "name": f"Stress {i}", "license_number": f"STR-{tag}-{i}",
+            "license_category": "HMV", "license_expiry": "2099-01-01",
+        })
+        response.raise_for_status()
+        driver_ids.append(response.json()["id"])
+
+    return vehicle_ids, driver_ids
+
+
+async def dispatched_trips(client, vehicle_ids):
+    wanted = set(vehicle_ids)
+    trips, after_id = [], None
+    while True:
+        params = {"status": "dispatched", "limit": 1000}
+        if after_id:
+            params["after_id"] = after_id
+        response = await client.get("/trips/", params=params)
+        response.raise_for_status()
+        trips.extend(t for t in response.json() if t["vehicle_id"] in wanted)
+        after_id = response.headers.get("X-Next-After-Id")
+        if not after_id:
+            return trips
+
+
+async def run_round(client, vehicle_ids, driver_ids, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = Counter()
+    accepted = []
+
+    async def dispatch():
+        payload = {
+            "vehicle_id": random.choice(vehicle_ids),
+            "driver_id": random.choice(driver_ids),
+            "cargo_weight": 100, "origin": "Stress", "destination": "Stress",
+            "start_odometer": 1,
+        }
+        async with semaphore:
+            try:
+                response = await client.post("/trips/", json=payload)
+            except httpx.HTTPError:
+                outcomes["transport error"] += 1
+                return
+        outcomes[response.status_code] += 1
+        if response.status_code == 200:
+            accepted.append(response.json())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(dispatch() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    trips = await dispatched_trips(client, vehicle_ids)
+    by_vehicle = Counter(t["vehicle_id"] for t in trips)
+    by_driver = Counter(t["driver_id"] for t in trips)
+
+    problems = []
+    problems += [f"vehicle {v} has {n} dispatched trips" for v, n in by_vehicle.items() if n > 1]
+    problems += [f"driver {d} has {n} dispatched trips" for d, n in by_driver.items() if n > 1]
+    if len(accepted) != len(trips):
+        problems.append(f"{len(accepted)} dispatches accepted but {len(trips)} trips are dispatched")
+
+    for trip in trips:
+        await client.patch(f"/trips/{trip['id']}/complete", params={"end_odometer": 2, "revenue": 0})
+
+    return {
+        "elapsed": elapsed,
+        "requests": requests,
+        "accepted": len(accepted),
+        "outcomes": dict(outcomes),
+        "problems": problems,
+    }
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=120) as client:
+        response = await client.post("/auth/login", data={"email": args.email, "password": args.password})
+        response.raise_for_status()
+
+        vehicle_ids, driver_ids = await create_pool(client, args.vehicles, args.drivers, uuid.uuid4().hex[:8])
+
+        failed = False
+        for number in range(1, args.rounds + 1):
+            result = await run_round(client, vehicle_ids, driver_ids, args.requests, args.concurrency)
+            print(
+                f"round {number}: {result['requests']} dispatches in {result['elapsed']:.2f}s "
+                f"({result['requests'] / result['elapsed']:.0f} req/s), "
+                f"{result['accepted']} accepted, outcomes {result['outcomes']}"
+            )
+            for problem in result["problems"]:
+                failed = True
+                print(f"  DOUBLE BOOKING: {problem}")
+
+    if failed:
+        sys.exit(1)
+    print("no double bookings")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--vehicles", type=int, default=20)
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--email", default="admin@fleetflow.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load generator for POST /telematics/events against a running server.
+
+Dispatches one trip per vehicle in a fresh pool, then runs --senders
+concurrent devices that post batches of --batch-size random events
+(overspeed, harsh brake, odometer, the occasional accident) for
+--duration seconds. Reports accepted events/s and request latency, then
+completes the trips in bulk and checks that every trip's overspeed and
+harsh brake counters equal the events sent for it.
+
+Usage (from backend/, needs httpx):
+    python -m benchmarks.telematics_load --url http://127.0.0.1:8000 \
+        --trips 200 --senders 50 --batch-size 100 --duration 30
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import httpx
+
+from benchmarks.load_test import percentile
+from benchmarks.stress_dispatch import create_pool
+
+EVENT_TYPES = ["overspeed", "harsh_brake", "odometer", "odometer"]
+
+
+async def dispatch_trips(client, vehicle_ids, driver_ids):
+    response = await client.post("/trips/bulk", json=[
+        {
+            "vehicle_id": v, "driver_id": d, "cargo_weight": 100,
+            "origin": "Telematics", "destination": "Telematics", "start_odometer": 1,
+        }
+        for v, d in zip(vehicle_ids, driver_ids)
+    ])
+    response.raise_for_status()
+    return [t["id"] for t in response.json()["created"]]
+
+
+async def sender(client, trip_ids, args, deadline, sent, latencies, outcomes):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        batch = []
+        for _ in range(args.batch_size):
+            trip_id = rng.choice(trip_ids)
+            event_type = "accident" if rng.random() < 0.0005 else rng.choice(EVENT_TYPES)
+            batch.append({"trip_id": trip_id, "type": event_type, "value": rng.uniform(0, 140)})
+
+        started = time.perf_counter()
+        try:
+            response = await client.post("/telematics/events", json=batch, headers=args.headers)
+        except httpx.HTTPError:
+            outcomes["transport error"] += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+        outcomes[response.status_code] += 1
+
+        if response.status_code == 202:
+            for event in batch:
+                sent[event["trip_id"]][event["type"]] += 1
+
+
+async def main_async(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        response = await client.post("/auth/login", data={"email": args.email, "password": args.password})
+        response.raise_for_status()
+
+        vehicle_ids, driver_ids = await create_pool(client, args.trips, args.trips, uuid.uuid4().hex[:8])
+        trip_ids = await dispatch_trips(client, vehicle_ids, driver_ids)
+
+        sent = defaultdict(Counter)
+        latencies, outcomes = [], Counter()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            sender(client, trip_ids, args, deadline, sent, latencies, outcomes)
+            for _ in range(args.senders)
+        ))
+        elapsed = time.perf_counter() - started
+
+        accepted = sum(sum(c.values()) for c in sent.values())
+        print(f"requests: {dict(outcomes)}")
+        print(f"events accepted: {accepted} in {elapsed:.1f}s = {accepted / elapsed:.0f} events/s")
+        print(
+            f"latency ms: p50 {percentile(latencies, 50):.1f}  p95 {percentile(latencies, 95):.1f}  "
+            f"p99 {percentile(latencies, 99):.1f}"
+        )
+
+        # Completion flushes the server's buffer before reading the counters.
+        response = await client.patch("/trips/complete/bulk", json=[
+            {"trip_id": t, "end_odometer": 100, "revenue": 100} for t in trip_ids
+        ])
+        response.raise_for_status()
+
+        mismatched = [
+            c["trip_id"] for c in response.json()["completed"]
+            if c["overspeed_count"] != sent[c["trip_id"]]["overspeed"]
+            or c["harsh_brake_count"] != sent[c["trip_id"]]["harsh_brake"]
+            or c["accident_reported"] != (sent[c["trip_id"]]["accident"] > 0)
+        ]
+        print(f"trips with counters that differ from the events sent: {len(mismatched)}")
+        if mismatched:
+            print("  (expected with several workers: other workers' buffers flush on their own timer)")
+        return 1 if mismatched else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--trips", type=int, default=200)
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--token", help="X-Telematics-Token, if the server sets TELEMATICS_TOKEN (else the login is used)")
+    parser.add_argument("--email", default="admin@fleetflow.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+    args.headers = {"X-Telematics-Token": args.token} if args.token else {}
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
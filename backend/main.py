@@ -1,23 +1,19 @@
+import time
+
+# Start of the worker's import, for the startup phases in /metrics.
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
-from sqlmodel import SQLModel
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-import bcrypt
-from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 
-from app.db import engine
+from app.db import engine, async_engine, read_engine, replica, ReadYourWritesMiddleware
 
-# Import ALL models
-from app.models.vehicle import Vehicle
-from app.models.driver import Driver
-from app.models.trip import Trip
-from app.models.maintenance import Maintenance
-from app.models.fuel import Fuel
-from app.models.user import User
-
-# Import ALL routers
+# Import ALL routers. They are cheap to import: pyarrow (archives, exports)
+# and numpy (driver rescoring) load inside the functions that use them, so
+# neither is imported while a worker starts.
 from app.routes.vehicle_routes import router as vehicle_router
 from app.routes.driver_routes import router as driver_router
 from app.routes.trip_routes import router as trip_router
@@ -25,42 +21,70 @@ from app.routes.maintenance_routes import router as maintenance_router
 from app.routes.fuel_routes import router as fuel_router
 from app.routes.analytics_routes import router as analytics_router
 from app.routes.auth_routes import router as auth_router
+from app.routes.export_routes import router as export_router
+from app.routes.import_routes import router as import_router
+from app.routes.telematics_routes import router as telematics_router
+from app.routes.event_routes import router as event_router
+from app.routes.dispatch_routes import router as dispatch_router
+from app.routes.metrics_routes import router as metrics_router
+from app.telematics import telematics_buffer
+from app.availability import availability
+from app.maintenance_schedule import maintenance_schedule
+from app.metrics import MetricsMiddleware, instrument_engine, startup_timer
+from app.bootstrap import prepare_database
+from app.security import check_auth_secret
+
+startup_timer.start(_import_started)
 
 app = FastAPI(title="Fleet Lifecycle Management System")
 
+# Added first so it runs innermost, where the matched route is known.
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if replica.enabled:
+    instrument_engine(read_engine.sync_engine)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-After-Id"],
 )
 
-app.add_middleware(
-    SessionMiddleware,
-    secret_key="supersecretkey"
-)
+@app.on_event("startup")
+async def on_startup():
+    check_auth_secret()
+
+    # Creates missing tables only when the stored schema version is out of
+    # date, one worker at a time (see app/bootstrap.py). Demo users are
+    # created by `python manage.py users demo`.
+    await run_in_threadpool(prepare_database, engine)
+
 
 @app.on_event("startup")
-def on_startup():
-    SQLModel.metadata.create_all(engine)
+async def start_telematics():
+    telematics_buffer.start()
 
-    # Seed demo users (used by the frontend login page)
-    with Session(engine) as session:
-        demo_users = [
-            ("admin@fleetflow.com", "admin123", "manager"),
-            ("dispatch@fleetflow.com", "user123", "dispatcher"),
-        ]
 
-        for email, password, role in demo_users:
-            existing = session.exec(select(User).where(User.email == email)).first()
-            if existing:
-                continue
+@app.on_event("startup")
+async def warm_availability():
+    await availability.start()
+    await maintenance_schedule.start()
+    startup_timer.mark("ready")
 
-            password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-            session.add(User(email=email, password_hash=password_hash, role=role))
 
-        session.commit()
+@app.on_event("shutdown")
+async def on_shutdown():
+    await telematics_buffer.stop()
+    await availability.stop()
+    await maintenance_schedule.stop()
+    await async_engine.dispose()
+    if replica.enabled:
+        await read_engine.dispose()
 
 
 frontend_dir = Path(__file__).resolve().parent.parent / "frontend"
@@ -74,7 +98,16 @@ app.include_router(maintenance_router)
 app.include_router(fuel_router)
 app.include_router(analytics_router)
 app.include_router(auth_router)
+app.include_router(export_router)
+app.include_router(import_router)
+app.include_router(telematics_router)
+app.include_router(event_router)
+app.include_router(dispatch_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 def root():
-    return {"message": "Fleet Backend Running"}
\ No newline at end of file
+    return {"message": "Fleet Backend Running"}
+
+
+startup_timer.mark("imported")
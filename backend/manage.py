@@ -0,0 +1,228 @@
+"""
+Operational commands.
+
+Usage (from backend/):
+    python manage.py stats rebuild
+    python manage.py stats verify
+    python manage.py db migrate
+    python manage.py db indexes
+    python manage.py db check
+    python manage.py import fuel fuel_cards.csv
+    python manage.py import maintenance workshop.ndjson
+    python manage.py drivers rescore [--dry-run]
+    python manage.py fuel anomalies
+    python manage.py maintenance schedule
+    python manage.py history partitions
+    python manage.py history archive [--before 2025-01] [--table trip]
+    python manage.py history list
+    python manage.py users demo
+"""
+import argparse
+import sys
+import time
+from datetime import date
+
+from sqlmodel import Session
+
+from app.db import engine
+from app.stats import rebuild_stats, reconcile_stats
+from app.migrations import missing_indexes, create_missing_indexes
+from app.importer import IMPORTS, CHUNK_SIZE, import_logs
+from app.safety import rescore_drivers
+from app.fuel_anomalies import backfill_fuel_anomalies
+from app.maintenance_schedule import rebuild_service_schedule
+from app.partitions import PARTITIONED, ensure_partitions
+from app.bootstrap import (
+    migrate, prepare_database, schema_fingerprint, schema_lock, seed_demo_users, stored_version,
+)
+from app.archive import archive_cutoff, archive_files, archive_history
+
+
+def cmd_stats(args):
+    prepare_database(engine, "auto")
+
+    with Session(engine) as session:
+        if args.action == "rebuild":
+            counts = rebuild_stats(session)
+            print(
+                f"Rebuilt rollups for {counts['vehicles']} vehicles, {counts['drivers']} drivers "
+                f"and {counts['days']} vehicle-days"
+            )
+            return 0
+
+        mismatches = reconcile_stats(session)
+        for m in mismatches:
+            print(f"{m['kind']} {m['id']} {m['field']}: stored={m['stored']} expected={m['expected']}")
+        print(f"{len(mismatches)} mismatches")
+        return 1 if mismatches else 0
+
+
+def cmd_db(args):
+    if args.action == "check":
+        missing = missing_indexes(engine)
+        for index in missing:
+            print(f"missing: {index.table.name}.{index.name}")
+        print(f"{len(missing)} missing indexes")
+        return 1 if missing else 0
+
+    if args.action == "migrate":
+        version = schema_fingerprint()
+        previous = stored_version(engine)
+        with schema_lock(engine):
+            created = migrate(engine, version)
+        print(f"schema version {previous or 'none'} -> {version}")
+    else:
+        prepare_database(engine, "auto")
+        created = create_missing_indexes(engine)
+
+    for name in created:
+        print(f"created: {name}")
+    print(f"{len(created)} indexes created")
+    return 0
+
+
+def cmd_import(args):
+    prepare_database(engine, "auto")
+
+    fmt = args.format or ("ndjson" if args.path.lower().endswith((".ndjson", ".jsonl")) else "csv")
+
+    started = time.perf_counter()
+    with open(args.path, encoding="utf-8-sig", newline="") as stream:
+        report = import_logs(engine, args.kind, stream, fmt, args.chunk_size)
+    elapsed = time.perf_counter() - started
+
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['error']}")
+    print(
+        f"{report['imported']} imported, {report['rejected']} rejected "
+        f"in {elapsed:.1f}s ({report['imported'] / max(elapsed, 1e-9):.0f} rows/s)"
+    )
+    return 1 if report["rejected"] else 0
+
+
+def cmd_drivers(args):
+    prepare_database(engine, "auto")
+
+    started = time.perf_counter()
+    result = rescore_drivers(engine, dry_run=args.dry_run)
+    elapsed = time.perf_counter() - started
+
+    verb = "would change" if args.dry_run else "changed"
+    print(
+        f"Rescored {result['drivers']} drivers from {result['trips']} completed trips "
+        f"in {elapsed:.1f}s; {verb} {result['changed']}"
+    )
+    return 0
+
+
+def cmd_fuel(args):
+    prepare_database(engine, "auto")
+
+    started = time.perf_counter()
+    result = backfill_fuel_anomalies(engine)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"Replayed {result['fills']} fill-ups for {result['vehicles']} vehicles "
+        f"in {elapsed:.1f}s; {result['anomalies']} anomalies"
+    )
+    return 0
+
+
+def cmd_maintenance(args):
+    prepare_database(engine, "auto")
+
+    result = rebuild_service_schedule(engine)
+    print(f"Rebuilt the service schedule of {result['vehicles']} vehicles from maintenance history")
+    return 0
+
+
+def cmd_history(args):
+    prepare_database(engine, "auto")
+
+    if args.action == "partitions":
+        created = ensure_partitions(engine)
+        for name in created:
+            print(f"created: {name}")
+        print(f"{len(created)} partitions created")
+        return 0
+
+    tables = [args.table] if args.table else list(PARTITIONED)
+
+    if args.action == "list":
+        for table in tables:
+            for path in archive_files(table):
+                print(f"{table} {path.name} {path.stat().st_size / 1e6:.1f} MB")
+        return 0
+
+    before = date.fromisoformat(args.before + "-01") if args.before else archive_cutoff()
+    started = time.perf_counter()
+    results = archive_history(engine, tables, before)
+    elapsed = time.perf_counter() - started
+
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['table']} {result['month']}: skipped, {result['skipped']}")
+        elif result["rows"]:
+            print(f"{result['table']} {result['month']}: {result['rows']} rows -> {result['path']}")
+    archived = sum(r["rows"] for r in results)
+    print(f"Archived {archived} rows from before {before:%Y-%m} in {elapsed:.1f}s")
+    return 1 if any("skipped" in r for r in results) else 0
+
+
+def cmd_users(args):
+    prepare_database(engine, "auto")
+
+    added = seed_demo_users(engine)
+    print(f"{added} demo users created")
+    return 0
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="FleetFlow operational commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats = commands.add_parser("stats", help="Rebuild or verify the vehicle/driver rollup tables")
+    stats.add_argument("action", choices=["rebuild", "verify"])
+    stats.set_defaults(func=cmd_stats)
+
+    db = commands.add_parser("db", help="Migrate the schema, or create or check the indexes declared on the models")
+    db.add_argument("action", choices=["migrate", "indexes", "check"])
+    db.set_defaults(func=cmd_db)
+
+    imports = commands.add_parser("import", help="Bulk load fuel or maintenance history from CSV/NDJSON")
+    imports.add_argument("kind", choices=sorted(IMPORTS))
+    imports.add_argument("path")
+    imports.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    imports.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    imports.set_defaults(func=cmd_import)
+
+    drivers = commands.add_parser("drivers", help="Recompute every driver's safety score from trip history")
+    drivers.add_argument("action", choices=["rescore"])
+    drivers.add_argument("--dry-run", action="store_true", help="Report how many drivers would change")
+    drivers.set_defaults(func=cmd_drivers)
+
+    fuel = commands.add_parser("fuel", help="Rebuild fuel anomaly baselines and alerts from fuel history")
+    fuel.add_argument("action", choices=["anomalies"])
+    fuel.set_defaults(func=cmd_fuel)
+
+    maintenance = commands.add_parser("maintenance", help="Rebuild the service schedule from maintenance history")
+    maintenance.add_argument("action", choices=["schedule"])
+    maintenance.set_defaults(func=cmd_maintenance)
+
+    history = commands.add_parser("history", help="Manage trip/fuel partitions and the Parquet archive")
+    history.add_argument("action", choices=["partitions", "archive", "list"])
+    history.add_argument("--table", choices=sorted(PARTITIONED))
+    history.add_argument("--before", help="YYYY-MM; archive months before it (default ARCHIVE_AFTER_MONTHS)")
+    history.set_defaults(func=cmd_history)
+
+    users = commands.add_parser("users", help="Create the demo logins (admin@fleetflow.com, dispatch@fleetflow.com)")
+    users.add_argument("action", choices=["demo"])
+    users.set_defaults(func=cmd_users)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,141 @@
+"""
+Shared fixtures. The suite runs the API in-process against a throwaway
+SQLite database, so it needs no server: from backend/,
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+# The app reads its configuration at import time, so it is set before any
+# app module is imported.
+_TMP = Path(tempfile.mkdtemp(prefix="fleet-tests-"))
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_TMP / 'fleet.db'}",
+    "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{_TMP / 'fleet.db'}",
+    "READ_DATABASE_URL": "",
+    "ASYNC_READ_DATABASE_URL": "",
+    "ARCHIVE_DIR": str(_TMP / "archive"),
+    "ANALYTICS_CACHE_TTL": "0",
+    "ANALYTICS_CACHE_URL": "",
+    "AUTH_SECRET": "test-secret",
+    "BCRYPT_ROUNDS": "4",
+    "TELEMATICS_TOKEN": "",
+    "AVAILABILITY_RECONCILE_INTERVAL": "0",
+    "SCHEMA_ON_STARTUP": "auto",
+})
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+from sqlmodel import SQLModel, Session  # noqa: E402
+
+from app.bootstrap import prepare_database  # noqa: E402
+from app.db import engine  # noqa: E402
+from app.models.schema_version import SchemaVersion  # noqa: E402
+from app.security import issue_token  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    prepare_database(engine)
+    yield engine
+
+
+@pytest.fixture(autouse=True)
+def clean_tables(database):
+    """Every test starts from empty tables."""
+    yield
+    with database.begin() as conn:
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            if table.name != SchemaVersion.__tablename__:
+                conn.execute(table.delete())
+
+
+@pytest.fixture
+def session(database):
+    with Session(database) as session:
+        yield session
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    # Entering the client runs the startup hooks (schema check, availability
+    # index, maintenance schedule) and leaving it the shutdown hooks.
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def login_as(client):
+    """Send an access token for role with every later request of client."""
+
+    def login_as(role: str, user_id: int = 1):
+        client.headers["Authorization"] = f"Bearer {issue_token(user_id, role)}"
+        return client
+
+    return login_as
+
+
+@pytest.fixture
+def manager(login_as):
+    return login_as("manager")
+
+
+@pytest.fixture
+def make_vehicle(manager):
+    counter = iter(range(1, 1_000_000))
+
+    def make(**fields):
+        n = next(counter)
+        payload = {
+            "name": f"Truck {n}", "model": "Volvo FH", "license_plate": f"TRK-{n:04d}",
+            "max_capacity": 1000, "acquisition_cost": 50_000, "vehicle_type": "truck",
+            "region": "North", **fields,
+        }
+        response = manager.post("/vehicles/", json=payload)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make
+
+
+@pytest.fixture
+def make_driver(client):
+    counter = iter(range(1, 1_000_000))
+
+    def make(**fields):
+        n = next(counter)
+        payload = {
+            "name": f"Driver {n}", "license_number": f"LIC-{n:04d}", "license_category": "HMV",
+            "license_expiry": str(date.today() + timedelta(days=365)), **fields,
+        }
+        response = client.post("/drivers/", json=payload)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make
+
+
+@pytest.fixture
+def dispatch(manager, make_vehicle, make_driver):
+    """Dispatch a trip on a new vehicle and driver; returns the trip."""
+
+    def dispatch(**fields):
+        vehicle = make_vehicle()
+        driver = make_driver()
+        payload = {
+            "vehicle_id": vehicle["id"], "driver_id": driver["id"], "cargo_weight": 500,
+            "origin": "Warehouse", "destination": "Depot", "start_odometer": 0, **fields,
+        }
+        response = manager.post("/trips/", json=payload)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return dispatch
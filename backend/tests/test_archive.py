@@ -0,0 +1,121 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlmodel import func, select
+
+pytest.importorskip("pyarrow")
+
+from app import archive  # noqa: E402
+from app.archive import archive_history, archive_month, read_archive  # noqa: E402
+from app.fuel_anomalies import backfill_fuel_anomalies  # noqa: E402
+from app.models.driver import Driver  # noqa: E402
+from app.models.fuel import Fuel  # noqa: E402
+from app.models.fuel_anomaly import FuelAnomaly  # noqa: E402
+from app.models.trip import Trip  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402
+from app.stats import rebuild_stats, reconcile_stats  # noqa: E402
+
+JANUARY = date(2023, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def history(session):
+    """A vehicle and driver with completed trips and fuel logs in January and February 2023."""
+    vehicle = Vehicle(name="Truck", model="Volvo FH", license_plate="TRK-0001", max_capacity=1000,
+                      acquisition_cost=50_000, vehicle_type="truck", region="North")
+    driver = Driver(name="Driver", license_number="LIC-0001", license_category="HMV",
+                    license_expiry=date(2030, 1, 1))
+    session.add(vehicle)
+    session.add(driver)
+    session.flush()
+
+    odometer = 1000
+    for day in range(0, 50, 5):
+        when = datetime(2023, 1, 1, 9) + timedelta(days=day)
+        session.add(Trip(
+            vehicle_id=vehicle.id, driver_id=driver.id, cargo_weight=500, origin="A", destination="B",
+            status="completed", start_odometer=odometer, end_odometer=odometer + 400, revenue=300,
+            overspeed_count=day % 2, created_at=when,
+        ))
+        odometer += 400
+        session.add(Fuel(vehicle_id=vehicle.id, liters=40, cost=60 if day != 45 else 240,
+                         fuel_date=when + timedelta(hours=10)))
+    session.commit()
+    rebuild_stats(session)
+    return vehicle
+
+
+def _count(session, model, column, month):
+    start, end = datetime(month.year, month.month, 1), datetime(month.year, month.month + 1, 1)
+    return session.exec(select(func.count()).select_from(model).where(column >= start, column < end)).one()
+
+
+def test_month_moves_to_parquet(database, session, history):
+    january_trips = _count(session, Trip, Trip.created_at, JANUARY)
+
+    result = archive_month(database, "trip", JANUARY)
+
+    assert result["rows"] == january_trips
+    assert result["path"].endswith("trip/2023-01.parquet")
+    assert _count(session, Trip, Trip.created_at, JANUARY) == 0
+    assert _count(session, Trip, Trip.created_at, date(2023, 2, 1)) > 0
+
+    archived = read_archive("trip")
+    assert archived.num_rows == january_trips
+    assert set(archived["status"].to_pylist()) == {"completed"}
+    assert all(t.month == 1 for t in archived["created_at"].to_pylist())
+
+
+def test_month_with_open_trips_is_left_in_place(database, session, history, archive_dir):
+    driver_id = session.exec(select(Driver.id)).one()
+    session.add(Trip(vehicle_id=history.id, driver_id=driver_id, cargo_weight=1, origin="A", destination="B",
+                     status="dispatched", start_odometer=0, created_at=datetime(2023, 1, 20)))
+    session.commit()
+    january_trips = _count(session, Trip, Trip.created_at, JANUARY)
+
+    result = archive_month(database, "trip", JANUARY)
+
+    assert result["skipped"] == "1 trips still open"
+    assert _count(session, Trip, Trip.created_at, JANUARY) == january_trips
+    assert read_archive("trip") is None
+    assert list(archive_dir.rglob("*.parquet")) == []
+
+
+def test_rearchived_month_gets_a_second_file(database, session, history, archive_dir):
+    archive_month(database, "fuel", JANUARY)
+    session.add(Fuel(vehicle_id=history.id, liters=10, cost=15, fuel_date=datetime(2023, 1, 31)))
+    session.commit()
+
+    archive_month(database, "fuel", JANUARY)
+
+    assert sorted(p.name for p in (archive_dir / "fuel").iterdir()) == ["2023-01.1.parquet", "2023-01.parquet"]
+    assert read_archive("fuel", date_from=JANUARY, date_to=date(2023, 2, 1)).num_rows == 8
+
+
+def test_rollups_still_reconcile_after_archiving(database, session, history):
+    results = archive_history(database, before=date(2023, 2, 1))
+
+    assert [(r["table"], r["month"]) for r in results] == [("trip", "2023-01"), ("fuel", "2023-01")]
+    assert reconcile_stats(session) == []
+
+    rebuild_stats(session)
+    assert reconcile_stats(session) == []
+
+
+def test_anomaly_backfill_reads_the_archive(database, session, history):
+    backfill_fuel_anomalies(database)
+    before = session.exec(select(FuelAnomaly.metric, FuelAnomaly.fuel_date).order_by(FuelAnomaly.fuel_date)).all()
+    assert ("cost_per_liter", datetime(2023, 2, 15, 19)) in before
+
+    archive_history(database, before=date(2023, 2, 1))
+    backfill_fuel_anomalies(database)
+    session.expire_all()
+
+    after = session.exec(select(FuelAnomaly.metric, FuelAnomaly.fuel_date).order_by(FuelAnomaly.fuel_date)).all()
+    assert after == before
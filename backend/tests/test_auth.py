@@ -0,0 +1,137 @@
+import time
+
+import pytest
+
+from app import security
+from app.security import (
+    ACCESS_TOKEN_TTL, BCRYPT_ROUNDS, DEV_SECRET, check_auth_secret, hash_password_sync, issue_token, needs_rehash,
+    request_token, verify_token,
+)
+from app.security import _check
+
+
+def _tamper(token: str) -> str:
+    header, payload, signature = token.split(".")
+    return ".".join([header, payload, signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")])
+
+
+# =========================
+# TOKENS
+# =========================
+def test_token_round_trip():
+    claims = verify_token(issue_token(7, "dispatcher"))
+
+    assert claims["user_id"] == 7
+    assert claims["role"] == "dispatcher"
+    assert claims["exp"] - claims["iat"] == ACCESS_TOKEN_TTL
+
+
+def test_development_key_needs_dev_mode(monkeypatch):
+    monkeypatch.setattr(security, "AUTH_SECRET", DEV_SECRET)
+    monkeypatch.setattr(security, "AUTH_DEV_MODE", False)
+    with pytest.raises(RuntimeError, match="AUTH_SECRET"):
+        check_auth_secret()
+
+    monkeypatch.setattr(security, "AUTH_DEV_MODE", True)
+    check_auth_secret()
+
+
+def test_configured_secret_starts():
+    check_auth_secret()
+
+
+def test_tampered_token_is_rejected():
+    assert verify_token(_tamper(issue_token(7, "dispatcher"))) is None
+    assert verify_token("not-a-token") is None
+    assert verify_token(None) is None
+
+
+def test_expired_token_is_rejected():
+    token = issue_token(7, "manager", now=time.time() - ACCESS_TOKEN_TTL - 1)
+    assert verify_token(token) is None
+
+
+def test_token_kinds_are_not_interchangeable():
+    refresh = issue_token(7, "manager", kind="refresh")
+
+    assert verify_token(refresh) is None
+    assert verify_token(refresh, kind="refresh")["user_id"] == 7
+    assert verify_token(issue_token(7, "manager"), kind="refresh") is None
+
+
+def test_request_token_prefers_bearer_header():
+    assert request_token({"authorization": "Bearer abc"}, {"access_token": "def"}) == "abc"
+    assert request_token({}, {"access_token": "def"}) == "def"
+    assert request_token({}, {}) is None
+
+
+# =========================
+# PASSWORDS
+# =========================
+def test_password_hash_round_trip():
+    password_hash = hash_password_sync("s3cret")
+
+    assert _check("s3cret", password_hash)
+    assert not _check("wrong", password_hash)
+    assert not needs_rehash(password_hash)
+    assert needs_rehash(hash_password_sync("s3cret", rounds=BCRYPT_ROUNDS + 1))
+    assert needs_rehash("garbage")
+
+
+# =========================
+# ROUTES
+# =========================
+def _register(client, email="ops@example.com", password="s3cret", role="manager"):
+    return client.post("/auth/register", data={"email": email, "password": password, "role": role})
+
+
+def test_login_sets_tokens_and_me_reads_them(client):
+    assert _register(client).status_code == 200
+
+    response = client.post("/auth/login", data={"email": "ops@example.com", "password": "s3cret"})
+    assert response.status_code == 200
+    assert response.json()["role"] == "manager"
+    assert "access_token" in response.cookies
+
+    me = client.get("/auth/me")
+    assert me.status_code == 200
+    assert me.json()["role"] == "manager"
+
+
+def test_login_with_wrong_password_fails(client):
+    _register(client)
+
+    response = client.post("/auth/login", data={"email": "ops@example.com", "password": "nope"})
+    assert response.status_code == 401
+    assert client.get("/auth/me").status_code == 401
+
+
+def test_duplicate_registration_fails(client):
+    assert _register(client).status_code == 200
+    assert _register(client).status_code == 400
+
+
+def test_refresh_issues_a_new_access_token(client):
+    _register(client, role="dispatcher")
+    client.post("/auth/login", data={"email": "ops@example.com", "password": "s3cret"})
+    client.cookies.delete("access_token")
+
+    response = client.post("/auth/refresh")
+    assert response.status_code == 200
+    assert response.json()["role"] == "dispatcher"
+    assert client.get("/auth/me").json()["role"] == "dispatcher"
+
+
+def test_refresh_without_cookie_fails(client):
+    assert client.post("/auth/refresh").status_code == 401
+
+
+def test_role_checks(client, login_as):
+    assert client.get("/vehicles/").status_code == 403
+
+    login_as("dispatcher")
+    assert client.get("/vehicles/").status_code == 200
+    assert client.post("/vehicles/", json={}).status_code == 403
+
+    client.headers["Authorization"] = f"Bearer {_tamper(issue_token(1, 'manager'))}"
+    assert client.get("/vehicles/").status_code == 403
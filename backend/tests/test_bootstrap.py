@@ -0,0 +1,21 @@
+from sqlalchemy import inspect, text
+from sqlmodel import Session
+
+from app.bootstrap import prepare_database, schema_fingerprint, stored_version
+from app.models.schema_version import SchemaVersion
+from app.models.trip import Trip
+
+
+def test_migration_builds_indexes_missing_from_existing_tables(database):
+    index = sorted(Trip.__table__.indexes, key=lambda ix: ix.name)[0]
+    with database.begin() as conn:
+        conn.execute(text(f"DROP INDEX {index.name}"))
+    with Session(database) as session:
+        session.merge(SchemaVersion(id=1, version="stale"))
+        session.commit()
+
+    assert prepare_database(database) == "migrated"
+
+    assert index.name in {ix["name"] for ix in inspect(database).get_indexes(Trip.__tablename__)}
+    assert stored_version(database) == schema_fingerprint()
+    assert prepare_database(database) == "current"
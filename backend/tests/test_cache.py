@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.cache import AnalyticsCache, CacheBackend, MemoryBackend
+
+
+def test_incomplete_backend_fails_when_built():
+    class NoBump(CacheBackend):
+        async def get(self, key):
+            return None
+
+        async def set(self, key, value, ttl):
+            pass
+
+        async def generations(self, tables):
+            return [0 for _ in tables]
+
+    with pytest.raises(TypeError, match="bump"):
+        NoBump()
+
+
+def test_invalidated_table_misses():
+    cache = AnalyticsCache(MemoryBackend(), ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    async def run():
+        first = await cache.get_or_compute("dashboard", {}, ("trip",), compute)
+        cached = await cache.get_or_compute("dashboard", {}, ("trip",), compute)
+        await cache.backend.bump(["trip"])
+        fresh = await cache.get_or_compute("dashboard", {}, ("trip",), compute)
+        return first, cached, fresh
+
+    assert asyncio.run(run()) == ({"n": 1}, {"n": 1}, {"n": 2})
@@ -0,0 +1,15 @@
+import json
+
+
+def test_aware_bounds_are_compared_in_utc(manager, make_vehicle):
+    vehicle_id = make_vehicle()["id"]
+    for liters, fuel_date in ((10, "2024-01-02T04:00:00"), (20, "2024-01-02T05:00:00"), (30, "2024-01-02T07:00:00")):
+        manager.post("/fuel/", json={"vehicle_id": vehicle_id, "liters": liters, "cost": 15, "fuel_date": fuel_date})
+
+    response = manager.get("/export/fuel", params={
+        "format": "ndjson", "from": "2024-01-02T10:00:00+05:30", "to": "2024-01-02T06:00:00Z",
+    })
+
+    assert response.status_code == 200, response.text
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["liters"], row["fuel_date"]) for row in rows] == [(20, "2024-01-02T05:00:00")]
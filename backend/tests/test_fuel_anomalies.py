@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import select
+
+from app.fuel_anomalies import MIN_SAMPLES, Z_THRESHOLD, new_baseline, observe_fill
+from app.models.fuel import Fuel
+from app.models.fuel_anomaly import FuelAnomaly
+from app.models.fuel_baseline import FuelBaseline
+
+START = datetime(2024, 1, 1, 8)
+
+
+def _history(baseline, fills, cost_per_liter=1.5, liters=50, km=500, hours=24):
+    """Regular fill-ups with a little noise, so the baselines have some spread."""
+    for i in range(fills):
+        wobble = 1 + 0.01 * (-1) ** i
+        observe_fill(
+            baseline, liters * wobble, liters * wobble * cost_per_liter * wobble,
+            START + timedelta(hours=hours * i), km * i,
+        )
+
+
+def test_regular_fill_ups_raise_nothing():
+    baseline = new_baseline(1)
+    anomalies = []
+    for i in range(20):
+        anomalies += observe_fill(baseline, 50, 75, START + timedelta(days=i), 500 * i)
+
+    assert anomalies == []
+    assert baseline.fill_count == 20
+    assert baseline.cost_per_liter_mean == 1.5
+    assert baseline.liters_per_km_count == 19
+    assert baseline.fill_interval_hours_count == 19
+
+
+def test_price_spike_is_flagged():
+    baseline = new_baseline(1)
+    _history(baseline, 10)
+
+    anomalies = observe_fill(baseline, 50, 50 * 4.0, START + timedelta(days=10), 5000)
+
+    assert [a["metric"] for a in anomalies] == ["cost_per_liter"]
+    assert anomalies[0]["z_score"] > Z_THRESHOLD
+    assert anomalies[0]["value"] == 4.0
+
+
+def test_high_consumption_is_flagged_but_low_is_not():
+    baseline = new_baseline(1)
+    _history(baseline, 10)
+    high = observe_fill(baseline, 150, 225, START + timedelta(days=10), 5000)
+
+    baseline = new_baseline(1)
+    _history(baseline, 10)
+    low = observe_fill(baseline, 5, 7.5, START + timedelta(days=10), 5000)
+
+    assert [a["metric"] for a in high] == ["liters_per_km"]
+    assert low == []
+
+
+def test_early_fill_up_is_flagged_but_late_is_not():
+    baseline = new_baseline(1)
+    _history(baseline, 10, km=0)
+    early = observe_fill(baseline, 50, 75, START + timedelta(days=9, hours=1), 0)
+
+    baseline = new_baseline(1)
+    _history(baseline, 10, km=0)
+    late = observe_fill(baseline, 50, 75, START + timedelta(days=30), 0)
+
+    assert [a["metric"] for a in early] == ["fill_interval_hours"]
+    assert late == []
+
+
+def test_nothing_is_checked_before_min_samples():
+    baseline = new_baseline(1)
+    _history(baseline, MIN_SAMPLES - 1)
+
+    assert observe_fill(baseline, 50, 50 * 10.0, START + timedelta(days=30), 0) == []
+
+
+def test_liters_without_distance_are_carried_forward():
+    baseline = new_baseline(1)
+    observe_fill(baseline, 40, 60, START, 1000)
+    observe_fill(baseline, 10, 15, START + timedelta(days=1), 1000)
+
+    assert baseline.carried_liters == 10
+    assert baseline.liters_per_km_count == 0
+
+    observe_fill(baseline, 30, 45, START + timedelta(days=2), 1400)
+
+    assert baseline.carried_liters == 0
+    assert baseline.liters_per_km_mean == (10 + 30) / 400
+
+
+def test_out_of_order_fill_up_does_not_move_the_interval_clock():
+    baseline = new_baseline(1)
+    observe_fill(baseline, 50, 75, START + timedelta(days=2), None)
+    observe_fill(baseline, 50, 75, START, None)
+
+    assert baseline.last_fuel_date == START + timedelta(days=2)
+    assert baseline.fill_interval_hours_count == 0
+
+
+def test_fuel_route_keeps_one_baseline_and_stores_anomalies(manager, make_vehicle, session):
+    vehicle_id = make_vehicle()["id"]
+
+    def fuel(cost, day):
+        response = manager.post("/fuel/", json={
+            "vehicle_id": vehicle_id, "liters": 50, "cost": cost,
+            "fuel_date": (START + timedelta(days=day)).isoformat(),
+        })
+        assert response.status_code == 200, response.text
+        return response.json()["anomalies"]
+
+    for day in range(MIN_SAMPLES + 2):
+        assert fuel(75 + (-1) ** day, day) == []
+    anomalies = fuel(200, MIN_SAMPLES + 2)
+
+    assert [a["metric"] for a in anomalies] == ["cost_per_liter"]
+    assert len(session.exec(select(FuelBaseline)).all()) == 1
+    stored = session.exec(select(FuelAnomaly)).all()
+    assert [(a.vehicle_id, a.metric) for a in stored] == [(vehicle_id, "cost_per_liter")]
+
+    listed = manager.get("/analytics/fuel/anomalies", params={"vehicle_id": vehicle_id}).json()
+    assert [a["metric"] for a in listed] == ["cost_per_liter"]
+
+
+def test_aware_fuel_date_is_stored_as_naive_utc(manager, make_vehicle, session):
+    vehicle_id = make_vehicle()["id"]
+    for fuel_date in ("2024-01-01T08:00:00", "2024-01-02T10:00:00+05:30"):
+        response = manager.post("/fuel/", json={
+            "vehicle_id": vehicle_id, "liters": 50, "cost": 75, "fuel_date": fuel_date,
+        })
+        assert response.status_code == 200, response.text
+
+    dates = session.exec(select(Fuel.fuel_date).order_by(Fuel.id)).all()
+    assert dates == [datetime(2024, 1, 1, 8), datetime(2024, 1, 2, 4, 30)]
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlmodel import select
+
+from app.models.fuel import Fuel
+
+
+def test_imported_dates_are_stored_as_naive_utc(manager, make_vehicle, session):
+    vehicle_id = make_vehicle()["id"]
+    csv = (
+        "vehicle_id,liters,cost,fuel_date\n"
+        f"{vehicle_id},50,75,2024-01-01T08:00:00\n"
+        f"{vehicle_id},50,75,2024-01-02T10:00:00+05:30\n"
+    )
+
+    response = manager.post("/import/fuel", files={"file": ("fuel.csv", csv)})
+
+    assert response.status_code == 200, response.text
+    dates = session.exec(select(Fuel.fuel_date).order_by(Fuel.fuel_date)).all()
+    assert dates == [datetime(2024, 1, 1, 8), datetime(2024, 1, 2, 4, 30)]
@@ -0,0 +1,97 @@
+from app.pagination import MAX_PAGE_SIZE
+
+
+def _walk(client, path, **params):
+    """Every page of path as (ids, headers) pairs, following X-Next-After-Id."""
+    pages = []
+    after_id = None
+    while True:
+        response = client.get(path, params={**params, **({"after_id": after_id} if after_id else {})})
+        assert response.status_code == 200, response.text
+        pages.append(([row["id"] for row in response.json()], response.headers))
+        after_id = response.headers.get("X-Next-After-Id")
+        if after_id is None:
+            return pages
+
+
+def test_cursor_walks_every_row_once(manager, make_vehicle):
+    ids = [make_vehicle()["id"] for _ in range(5)]
+
+    pages = _walk(manager, "/vehicles/", limit=2)
+
+    assert [page_ids for page_ids, _ in pages] == [ids[0:2], ids[2:4], ids[4:5]]
+    assert pages[0][1]["X-Next-After-Id"] == str(ids[1])
+    assert pages[1][1]["X-Next-After-Id"] == str(ids[3])
+
+
+def test_total_is_only_sent_on_the_first_page(manager, make_vehicle):
+    for _ in range(3):
+        make_vehicle()
+
+    pages = _walk(manager, "/vehicles/", limit=2)
+
+    assert pages[0][1]["X-Total-Count"] == "3"
+    assert "X-Total-Count" not in pages[1][1]
+
+
+def test_exact_last_page_has_no_cursor(manager, make_vehicle):
+    for _ in range(4):
+        make_vehicle()
+
+    pages = _walk(manager, "/vehicles/", limit=2)
+
+    assert len(pages) == 2
+    assert "X-Next-After-Id" not in pages[-1][1]
+
+
+def test_descending_cursor(manager, make_vehicle):
+    ids = [make_vehicle()["id"] for _ in range(5)]
+
+    pages = _walk(manager, "/vehicles/", limit=2, order="desc")
+
+    assert [i for page_ids, _ in pages for i in page_ids] == ids[::-1]
+
+
+def test_filters_apply_to_pages_and_total(manager, make_vehicle):
+    north = [make_vehicle(region="North")["id"] for _ in range(3)]
+    make_vehicle(region="South")
+
+    pages = _walk(manager, "/vehicles/", limit=2, region="North")
+
+    assert [i for page_ids, _ in pages for i in page_ids] == north
+    assert pages[0][1]["X-Total-Count"] == "3"
+
+
+def test_ids_filter(manager, make_vehicle):
+    ids = [make_vehicle()["id"] for _ in range(4)]
+
+    response = manager.get("/vehicles/", params={"ids": [ids[3], ids[1]]})
+
+    assert [v["id"] for v in response.json()] == [ids[1], ids[3]]
+
+
+def test_limit_is_bounded(manager):
+    assert manager.get("/vehicles/", params={"limit": MAX_PAGE_SIZE + 1}).status_code == 422
+    assert manager.get("/vehicles/", params={"limit": 0}).status_code == 422
+
+
+def test_urgent_maintenance_total(manager, make_vehicle):
+    vehicle_id = make_vehicle()["id"]
+    for description in ("Engine overhaul", "Oil change", "Body work", "Tyres"):
+        manager.post("/maintenance/", json={"vehicle_id": vehicle_id, "description": description, "cost": 10})
+
+    response = manager.get("/maintenance/", params={"urgent": True, "limit": 1})
+
+    assert response.headers["X-Total-Count"] == "2"
+    assert "X-Next-After-Id" in response.headers
+
+
+def test_aware_date_filters_compare_in_utc(manager, make_vehicle):
+    vehicle_id = make_vehicle()["id"]
+    for liters, fuel_date in ((10, "2024-01-02T04:00:00"), (20, "2024-01-02T05:00:00")):
+        manager.post("/fuel/", json={"vehicle_id": vehicle_id, "liters": liters, "cost": 15, "fuel_date": fuel_date})
+
+    response = manager.get("/fuel/", params={"from": "2024-01-02T10:00:00+05:30"})
+
+    assert response.headers["X-Total-Count"] == "1"
+    assert [(log["liters"], log["fuel_date"]) for log in response.json()] == [(20, "2024-01-02T05:00:00")]
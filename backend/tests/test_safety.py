@@ -0,0 +1,96 @@
+from datetime import date, datetime
+
+import pytest
+from sqlmodel import select
+
+from app.models.driver import Driver
+from app.models.trip import Trip
+from app.models.vehicle import Vehicle
+from app.safety import BASE_SCORE, apply_trip, rescore_drivers, trip_penalty
+
+
+@pytest.fixture
+def fleet(session):
+    """Three drivers: two with completed trips, one without; plus one cancelled trip."""
+    vehicle = Vehicle(name="Truck", model="Volvo FH", license_plate="TRK-0001", max_capacity=1000,
+                      acquisition_cost=50_000, vehicle_type="truck", region="North")
+    drivers = [
+        Driver(name=f"Driver {n}", license_number=f"LIC-{n:04d}", license_category="HMV",
+               license_expiry=date(2030, 1, 1), safety_score=BASE_SCORE, risk_level="Low")
+        for n in range(3)
+    ]
+    session.add(vehicle)
+    session.add_all(drivers)
+    session.flush()
+
+    def trip(driver, status="completed", **behaviour):
+        session.add(Trip(vehicle_id=vehicle.id, driver_id=driver.id, cargo_weight=1, origin="A", destination="B",
+                         status=status, start_odometer=0, created_at=datetime(2024, 1, 1, 12), **behaviour))
+
+    trip(drivers[0], overspeed_count=3, harsh_brake_count=2)
+    trip(drivers[0], accident_reported=True, is_night_trip=True)
+    trip(drivers[0], overspeed_count=1)
+    for _ in range(3):
+        trip(drivers[1], accident_reported=True)
+    trip(drivers[2], status="cancelled", accident_reported=True)
+    session.commit()
+    return [d.id for d in drivers]
+
+
+def _scores(session):
+    session.expire_all()
+    return {d.id: (d.safety_score, d.risk_level) for d in session.exec(select(Driver)).all()}
+
+
+def test_rescore_sums_completed_trips_per_driver(database, session, fleet):
+    careful, reckless, idle = fleet
+
+    result = rescore_drivers(database, chunk_size=2)
+
+    penalty = trip_penalty(3, 2, 0, 0) + trip_penalty(0, 0, 1, 1) + trip_penalty(1, 0, 0, 0)
+    assert _scores(session) == {
+        careful: (BASE_SCORE - penalty, "Medium"),
+        reckless: (BASE_SCORE - 60, "High"),
+        idle: (BASE_SCORE, "Low"),
+    }
+    assert result == {"drivers": 3, "changed": 2, "trips": 6}
+
+
+def test_rescore_matches_trip_by_trip_scoring(database, session, fleet):
+    expected = {}
+    for driver in session.exec(select(Driver)).all():
+        for trip in session.exec(select(Trip).where(Trip.driver_id == driver.id, Trip.status == "completed")):
+            apply_trip(driver, trip)
+        expected[driver.id] = (driver.safety_score, driver.risk_level)
+    session.rollback()
+
+    rescore_drivers(database)
+
+    assert _scores(session) == expected
+
+
+def test_dry_run_writes_nothing(database, session, fleet):
+    before = _scores(session)
+
+    result = rescore_drivers(database, dry_run=True)
+
+    assert result["changed"] == 2
+    assert _scores(session) == before
+
+
+def test_rescore_route_needs_a_manager(client, login_as, fleet):
+    assert login_as("dispatcher").post("/drivers/rescore").status_code == 403
+    assert login_as("manager").post("/drivers/rescore").json()["changed"] == 2
+
+
+def test_sparse_driver_ids_do_not_size_the_accumulators(database, session, fleet):
+    driver = Driver(id=10 ** 12, name="Late hire", license_number="LIC-9999", license_category="HMV",
+                    license_expiry=date(2030, 1, 1), safety_score=BASE_SCORE, risk_level="Low")
+    session.add(driver)
+    session.add(Trip(vehicle_id=session.exec(select(Vehicle.id)).one(), driver_id=driver.id, cargo_weight=1,
+                     origin="A", destination="B", status="completed", start_odometer=0,
+                     created_at=datetime(2024, 1, 1, 12), overspeed_count=5))
+    session.commit()
+
+    assert rescore_drivers(database)["drivers"] == 4
+    assert _scores(session)[10 ** 12] == (BASE_SCORE - trip_penalty(5, 0, 0, 0), "Low")
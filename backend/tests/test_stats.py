@@ -0,0 +1,79 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+
+from app.models.driver_stats import DriverStats
+from app.models.vehicle_daily import VehicleDaily
+from app.models.vehicle_stats import VehicleStats
+from app.stats import rebuild_stats, reconcile_stats, rollup_upsert
+
+
+def test_rollup_upsert_adds_onto_the_existing_row():
+    for name, dialect in (("postgresql", postgresql.dialect()), ("sqlite", sqlite.dialect())):
+        sql = str(rollup_upsert(name, VehicleStats, ("vehicle_id",), ["fuel_cost"]).compile(dialect=dialect))
+
+        assert "ON CONFLICT (vehicle_id) DO UPDATE" in sql
+        assert "fuel_cost = (vehiclestats.fuel_cost + excluded.fuel_cost)" in sql
+
+
+def test_writes_increment_the_rollups(manager, dispatch, session):
+    trip = dispatch(start_odometer=100)
+    vehicle_id = trip["vehicle_id"]
+    manager.patch(f"/trips/{trip['id']}/complete", params={"end_odometer": 250, "revenue": 400})
+    for cost in (60, 40):
+        assert manager.post("/fuel/", json={"vehicle_id": vehicle_id, "liters": 20, "cost": cost}).status_code == 200
+    assert manager.post("/maintenance/", json={
+        "vehicle_id": vehicle_id, "description": "Oil change", "cost": 75,
+    }).status_code == 200
+
+    stats = session.get(VehicleStats, vehicle_id)
+    assert stats.model_dump() == {
+        "vehicle_id": vehicle_id, "total_km": 150, "total_liters": 40, "fuel_cost": 100,
+        "maintenance_cost": 75, "revenue": 400, "trip_count": 1,
+    }
+    driver_stats = session.get(DriverStats, trip["driver_id"])
+    assert (driver_stats.total_km, driver_stats.revenue, driver_stats.trip_count) == (150, 400, 1)
+    days = session.exec(select(VehicleDaily).where(VehicleDaily.vehicle_id == vehicle_id)).all()
+    assert sum(d.fuel_cost for d in days) == 100
+
+    assert reconcile_stats(session) == []
+
+
+def test_bulk_completion_sums_per_vehicle_and_driver(manager, dispatch, session):
+    trips = [dispatch(start_odometer=1) for _ in range(3)]
+    manager.patch("/trips/complete/bulk", json=[
+        {"trip_id": t["id"], "end_odometer": 1 + 10 * (i + 1), "revenue": 100} for i, t in enumerate(trips)
+    ])
+
+    totals = session.exec(select(VehicleStats.total_km).order_by(VehicleStats.vehicle_id)).all()
+    assert totals == [10, 20, 30]
+    assert reconcile_stats(session) == []
+
+
+def test_reconcile_reports_drift_and_rebuild_repairs_it(manager, make_vehicle, session):
+    vehicle_id = make_vehicle()["id"]
+    manager.post("/fuel/", json={"vehicle_id": vehicle_id, "liters": 10, "cost": 15})
+
+    stats = session.get(VehicleStats, vehicle_id)
+    stats.fuel_cost = 999
+    session.add(stats)
+    session.commit()
+
+    mismatches = reconcile_stats(session)
+    assert [(m["kind"], m["field"], m["expected"], m["stored"]) for m in mismatches] == [
+        ("vehicle", "fuel_cost", 15, 999),
+    ]
+
+    rebuild_stats(session)
+    assert reconcile_stats(session) == []
+
+
+def test_fleet_costs_come_from_the_rollups(manager, make_vehicle):
+    north, south = make_vehicle(region="North")["id"], make_vehicle(region="South")["id"]
+    manager.post("/fuel/", json={"vehicle_id": north, "liters": 10, "cost": 20})
+    manager.post("/fuel/", json={"vehicle_id": south, "liters": 5, "cost": 8})
+    manager.post("/maintenance/", json={"vehicle_id": south, "description": "Oil change", "cost": 30})
+
+    assert manager.get("/analytics/costs").json() == {
+        "fuel_cost": 28, "maintenance_cost": 30, "total_liters": 15, "total_operational_cost": 58,
+    }
+    assert manager.get("/analytics/costs", params={"region": "North"}).json()["fuel_cost"] == 20
@@ -0,0 +1,143 @@
+from sqlmodel import select
+
+from app.models.driver import Driver
+from app.models.trip import Trip
+from app.models.vehicle import Vehicle
+
+
+def _complete(client, trip_id, end_odometer=120, revenue=500):
+    return client.patch(f"/trips/{trip_id}/complete", params={"end_odometer": end_odometer, "revenue": revenue})
+
+
+def _complete_bulk(client, *trip_ids, end_odometer=120, revenue=500):
+    completions = [{"trip_id": t, "end_odometer": end_odometer, "revenue": revenue} for t in trip_ids]
+    response = client.patch("/trips/complete/bulk", json=completions)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+# =========================
+# SINGLE
+# =========================
+def test_complete_releases_vehicle_and_driver(manager, dispatch, session):
+    trip = dispatch()
+
+    response = _complete(manager, trip["id"])
+
+    assert response.status_code == 200, response.text
+    assert session.get(Trip, trip["id"]).status == "completed"
+    vehicle = session.get(Vehicle, trip["vehicle_id"])
+    assert (vehicle.status, vehicle.odometer) == ("available", 120)
+    driver = session.get(Driver, trip["driver_id"])
+    assert (driver.status, driver.trip_completed) == ("available", 1)
+
+
+def test_vehicle_sent_to_the_shop_during_the_trip_stays_there(manager, dispatch, session):
+    trip = dispatch()
+    manager.post("/maintenance/", json={"vehicle_id": trip["vehicle_id"], "description": "Brakes", "cost": 50})
+
+    assert _complete(manager, trip["id"]).status_code == 200
+
+    vehicle = session.get(Vehicle, trip["vehicle_id"])
+    assert (vehicle.status, vehicle.odometer) == ("in_shop", 120)
+    assert session.get(Driver, trip["driver_id"]).status == "available"
+
+
+def test_driver_suspended_during_the_trip_stays_suspended(manager, dispatch, session):
+    trip = dispatch()
+    assert manager.patch(f"/drivers/{trip['driver_id']}/suspend").status_code == 200
+
+    assert _complete(manager, trip["id"]).status_code == 200
+
+    driver = session.get(Driver, trip["driver_id"])
+    assert (driver.status, driver.trip_completed) == ("suspended", 1)
+    assert session.get(Vehicle, trip["vehicle_id"]).status == "available"
+
+
+def test_bulk_completion_leaves_other_statuses_alone(manager, dispatch, session):
+    shop, suspended = dispatch(), dispatch()
+    manager.post("/maintenance/", json={"vehicle_id": shop["vehicle_id"], "description": "Brakes", "cost": 50})
+    manager.patch(f"/drivers/{suspended['driver_id']}/suspend")
+
+    _complete_bulk(manager, shop["id"], suspended["id"])
+
+    assert session.get(Vehicle, shop["vehicle_id"]).status == "in_shop"
+    assert session.get(Driver, shop["driver_id"]).status == "available"
+    assert session.get(Driver, suspended["driver_id"]).status == "suspended"
+    assert session.get(Vehicle, suspended["vehicle_id"]).status == "available"
+
+
+def test_second_completion_is_a_conflict(manager, dispatch, session):
+    trip = dispatch()
+    assert _complete(manager, trip["id"]).status_code == 200
+
+    response = _complete(manager, trip["id"], end_odometer=999, revenue=1)
+
+    assert response.status_code == 409
+    assert session.get(Vehicle, trip["vehicle_id"]).odometer == 120
+    assert session.get(Driver, trip["driver_id"]).trip_completed == 1
+
+
+def test_cancelled_trip_cannot_be_completed(manager, dispatch, session):
+    trip = dispatch()
+    assert manager.patch(f"/trips/{trip['id']}/cancel").status_code == 200
+
+    assert _complete(manager, trip["id"]).status_code == 409
+    assert session.get(Trip, trip["id"]).status == "cancelled"
+
+
+def test_odometer_going_backwards_is_rejected(manager, dispatch, session):
+    trip = dispatch(start_odometer=100)
+
+    assert _complete(manager, trip["id"], end_odometer=50).status_code == 400
+    assert session.get(Trip, trip["id"]).status == "dispatched"
+
+
+def test_unknown_trip(manager):
+    assert _complete(manager, 999_999).status_code == 404
+
+
+def test_completion_needs_a_dispatcher(client, login_as, dispatch):
+    trip = dispatch()
+    client.headers.pop("Authorization")
+
+    assert _complete(client, trip["id"]).status_code == 403
+    assert _complete(login_as("dispatcher"), trip["id"]).status_code == 200
+
+
+# =========================
+# BULK
+# =========================
+def test_bulk_completes_each_trip_once(manager, dispatch, session):
+    first, second = dispatch(), dispatch()
+
+    result = _complete_bulk(manager, first["id"], second["id"], first["id"])
+
+    assert [c["trip_id"] for c in result["completed"]] == [first["id"], second["id"]]
+    assert [(e["index"], e["status_code"]) for e in result["errors"]] == [(2, 400)]
+    statuses = session.exec(select(Trip.status).where(Trip.id.in_([first["id"], second["id"]]))).all()
+    assert statuses == ["completed", "completed"]
+
+
+def test_bulk_rejects_trips_that_are_not_dispatched(manager, dispatch):
+    done, cancelled, open_trip = dispatch(), dispatch(), dispatch()
+    _complete(manager, done["id"])
+    manager.patch(f"/trips/{cancelled['id']}/cancel")
+
+    result = _complete_bulk(manager, done["id"], cancelled["id"], open_trip["id"], 999_999)
+
+    assert [c["trip_id"] for c in result["completed"]] == [open_trip["id"]]
+    assert [(e["trip_id"], e["status_code"]) for e in result["errors"]] == [
+        (done["id"], 409), (cancelled["id"], 409), (999_999, 404),
+    ]
+
+
+def test_bulk_after_single_completion_changes_nothing(manager, dispatch, session):
+    trip = dispatch()
+    _complete(manager, trip["id"])
+
+    result = _complete_bulk(manager, trip["id"], end_odometer=999)
+
+    assert result["completed"] == []
+    assert session.get(Vehicle, trip["vehicle_id"]).odometer == 120
+    assert session.get(Driver, trip["driver_id"]).trip_completed == 1
@@ -1,17 +1,34 @@
 (() => {
     const API_BASE_URL = (window.API_BASE_URL || "").replace(/\/$/, "");
+    const PAGE_SIZE = 200;
+    const CHART_VEHICLES = 25;
 
     function capitalize(word) {
         if (!word) return "";
         return word.charAt(0).toUpperCase() + word.slice(1);
     }
 
-    async function apiFetch(path, options = {}) {
+    // Access tokens are short-lived; one refresh is shared by every request
+    // that hit a 401 at the same time.
+    let refreshing = null;
+
+    function refreshAccessToken() {
+        if (!refreshing) {
+            refreshing = fetch(`${API_BASE_URL}/auth/refresh`, { method: "POST", credentials: "include" })
+                .then((response) => response.ok)
+                .catch(() => false)
+                .finally(() => { refreshing = null; });
+        }
+        return refreshing;
+    }
+
+    async function apiRequest(path, options = {}) {
         const url = `${API_BASE_URL}${path}`;
-        const response = await fetch(url, {
-            credentials: "include",
-            ...options,
-        });
+        const send = () => fetch(url, { credentials: "include", ...options });
+        let response = await send();
+        if (response.status === 401 && !path.startsWith("/auth/") && await refreshAccessToken()) {
+            response = await send();
+        }
 
         const contentType = response.headers.get("content-type") || "";
         const isJson = contentType.includes("application/json");
@@ -25,6 +42,11 @@
             throw error;
         }
 
+        return { payload, headers: response.headers };
+    }
+
+    async function apiFetch(path, options = {}) {
+        const { payload } = await apiRequest(path, options);
         return payload;
     }
 
@@ -32,11 +54,90 @@
         const body = new URLSearchParams();
         Object.entries(data).forEach(([key, value]) => {
             if (value === undefined || value === null) return;
-            body.set(key, String(value));
+            if (Array.isArray(value)) value.forEach((item) => body.append(key, String(item)));
+            else body.set(key, String(value));
         });
         return body;
     }
 
+    // One page of a keyset-paginated list endpoint. `total` is only sent for
+    // the first page; `next` is the cursor of the following page, null on the last.
+    async function fetchPage(path, filters = {}, afterId = null) {
+        const query = formEncode({ limit: PAGE_SIZE, ...filters, after_id: afterId });
+        const { payload, headers } = await apiRequest(`${path}?${query}`);
+        const total = headers.get("X-Total-Count");
+        return {
+            items: payload || [],
+            total: total === null ? null : Number(total),
+            next: headers.get("X-Next-After-Id"),
+        };
+    }
+
+    // Every page; only for lists bounded by what is in motion (dispatched trips).
+    async function fetchAllPages(path, filters = {}) {
+        const items = [];
+        let afterId = null;
+        do {
+            const page = await fetchPage(path, filters, afterId);
+            items.push(...page.items);
+            afterId = page.next;
+        } while (afterId);
+        return items;
+    }
+
+    // The rows with the given ids, PAGE_SIZE ids per request.
+    async function fetchByIds(path, ids) {
+        const unique = [...new Set(ids)];
+        const chunks = [];
+        for (let i = 0; i < unique.length; i += PAGE_SIZE) chunks.push(unique.slice(i, i + PAGE_SIZE));
+        const pages = await Promise.all(chunks.map((chunk) => fetchPage(path, { ids: chunk })));
+        return pages.flatMap((page) => page.items);
+    }
+
+    // Shows a list one page at a time: load(filters) renders the first page,
+    // the "Load more" button placed after `anchor` appends the next one.
+    // renderPage(page, first) gets first = true when the list starts over.
+    function createPager(anchor, getPage, renderPage) {
+        const button = document.createElement("button");
+        button.type = "button";
+        button.className = "load-more";
+        button.textContent = "Load more";
+        button.hidden = true;
+        anchor.after(button);
+
+        let filters = {};
+        let next = null;
+        let generation = 0;
+
+        async function fetchNext(afterId) {
+            const current = generation;
+            button.disabled = true;
+            try {
+                const page = await getPage(filters, afterId);
+                // A reload started meanwhile; its first page wins.
+                if (current !== generation) return;
+                next = page.next;
+                await renderPage(page, afterId === null);
+            } finally {
+                if (current === generation) {
+                    button.disabled = false;
+                    button.hidden = !next;
+                }
+            }
+        }
+
+        button.addEventListener("click", () => fetchNext(next));
+
+        return {
+            load(nextFilters = filters) {
+                filters = nextFilters;
+                generation += 1;
+                next = null;
+                return fetchNext(null);
+            },
+        };
+    }
+
     function getPageName() {
         const path = window.location.pathname;
         const name = path.split("/").pop() || "";
@@ -82,9 +183,11 @@
                 body: formEncode({ email, password, role }),
             }),
         logout: () => apiFetch("/auth/logout", { method: "POST" }),
+        refresh: refreshAccessToken,
         me: () => apiFetch("/auth/me"),
 
-        getVehicles: () => apiFetch("/vehicles"),
+        getVehiclePage: (filters, afterId) => fetchPage("/vehicles/", filters, afterId),
+        getVehiclesByIds: (ids) => fetchByIds("/vehicles/", ids),
         getAvailableVehicles: () => apiFetch("/vehicles/available"),
         createVehicle: (vehicle) =>
             apiFetch("/vehicles/", {
@@ -94,7 +197,8 @@
             }),
         retireVehicle: (vehicleId) => apiFetch(`/vehicles/${vehicleId}/retire`, { method: "PATCH" }),
 
-        getDrivers: () => apiFetch("/drivers"),
+        getDriverPage: (filters, afterId) => fetchPage("/drivers/", filters, afterId),
+        getDriversByIds: (ids) => fetchByIds("/drivers/", ids),
         getAvailableDrivers: () => apiFetch("/drivers/available"),
         createDriver: (driver) =>
             apiFetch("/drivers/", {
@@ -105,7 +209,7 @@
         suspendDriver: (driverId) => apiFetch(`/drivers/${driverId}/suspend`, { method: "PATCH" }),
         setDriverStatus: (driverId, status) => apiFetch(`/drivers/${driverId}/status?status=${encodeURIComponent(status)}`, { method: "PATCH" }),
 
-        getTrips: () => apiFetch("/trips"),
+        getTrips: (filters) => fetchAllPages("/trips/", filters),
         createTrip: (trip) =>
             apiFetch("/trips/", {
                 method: "POST",
@@ -113,7 +217,8 @@
                 body: JSON.stringify(trip),
             }),
 
-        getMaintenance: () => apiFetch("/maintenance"),
+        getMaintenancePage: (filters, afterId) => fetchPage("/maintenance/", filters, afterId),
+        countMaintenance: (filters) => fetchPage("/maintenance/", { ...filters, limit: 1 }).then((page) => page.total),
         addMaintenance: (log) =>
             apiFetch("/maintenance/", {
                 method: "POST",
@@ -121,7 +226,7 @@
                 body: JSON.stringify(log),
             }),
 
-        getFuelLogs: () => apiFetch("/fuel"),
+        getFuelPage: (filters, afterId) => fetchPage("/fuel/", filters, afterId),
         addFuelLog: (log) =>
             apiFetch("/fuel/", {
                 method: "POST",
@@ -129,12 +234,46 @@
                 body: JSON.stringify(log),
             }),
 
-        getDashboard: () => apiFetch("/analytics/dashboard"),
-        getVehicleRoi: (vehicleId) => apiFetch(`/analytics/vehicle/${vehicleId}/roi`),
+        // Analytics filters: { region, from, to } (dates as YYYY-MM-DD, "to" exclusive)
+        getDashboard: (filters = {}) => apiFetch(`/analytics/dashboard?${formEncode(filters)}`),
+        getCosts: (filters = {}) => apiFetch(`/analytics/costs?${formEncode(filters)}`),
+        getRegions: () => apiFetch("/analytics/regions"),
+        getOverview: (filters = {}) => apiFetch(`/analytics/overview?${formEncode(filters)}`),
+        getDailyTrend: (filters = {}) => apiFetch(`/analytics/daily?${formEncode(filters)}`),
+        getVehicleRoi: (vehicleId, filters = {}) => apiFetch(`/analytics/vehicle/${vehicleId}/roi?${formEncode(filters)}`),
+        getFleetRoi: (filters = {}) => apiFetch(`/analytics/roi?${formEncode(filters)}`),
     };
 
     window.FleetApi = FleetApi;
 
+    // Live change feed (GET /events/stream). `handlers` maps event names
+    // ("trip.dispatched", "vehicle.status", "kpi", ...) to callbacks taking the
+    // parsed payload; "resync" is called when events were missed and the page
+    // should reload its state once. The browser reconnects on its own, except
+    // after a 401 (expired access token): then the token is refreshed and the
+    // stream re-opened, with a resync since events may have been missed.
+    function subscribeToChanges(handlers) {
+        if (!window.EventSource) return;
+        let source = null;
+
+        function open() {
+            source = new EventSource(`${API_BASE_URL}/events/stream`, { withCredentials: true });
+            Object.entries(handlers).forEach(([type, handler]) => {
+                source.addEventListener(type, (e) => handler(JSON.parse(e.data || "{}")));
+            });
+            source.addEventListener("error", async () => {
+                if (source.readyState !== EventSource.CLOSED) return;
+                if (await refreshAccessToken()) {
+                    open();
+                    handlers.resync?.({});
+                }
+            });
+        }
+
+        open();
+        window.addEventListener("beforeunload", () => source.close());
+    }
+
     async function requireSession() {
         const page = getPageName();
         if (page === "login.html" || page === "") return;
@@ -211,27 +350,86 @@
         const filterDropdown = document.querySelector(".filter-dropdown");
         if (!tableBody) return;
 
-        const [dashboard, vehicles, trips, drivers] = await Promise.all([
-            FleetApi.getDashboard().catch(() => null),
-            FleetApi.getVehicles().catch(() => []),
-            FleetApi.getTrips().catch(() => []),
-            FleetApi.getDrivers().catch(() => []),
-        ]);
+        // Only the vehicles of the pages shown so far are kept, with the
+        // dispatched trip and the driver of each.
+        let dashboard = null;
+        const vehicleById = new Map();
+        const driverById = new Map();
+        const latestDispatchedTripByVehicle = new Map();
+
+        function setTrip(trip) {
+            const current = latestDispatchedTripByVehicle.get(trip.vehicle_id);
+            if (!current || new Date(trip.created_at) > new Date(current.created_at)) {
+                latestDispatchedTripByVehicle.set(trip.vehicle_id, trip);
+            }
+        }
 
-        const driverById = new Map(drivers.map((d) => [d.id, d]));
+        async function loadDrivers(ids) {
+            const missing = ids.filter((id) => !driverById.has(id));
+            if (!missing.length) return;
+            const drivers = await FleetApi.getDriversByIds(missing).catch(() => []);
+            drivers.forEach((d) => driverById.set(d.id, d));
+        }
+
+        const pager = createPager(tableBody.closest("table"), FleetApi.getVehiclePage, async (page, first) => {
+            const ids = page.items.map((v) => v.id);
+            const trips = ids.length
+                ? await FleetApi.getTrips({ status: "dispatched", vehicle_ids: ids }).catch(() => [])
+                : [];
+            await loadDrivers(trips.map((t) => t.driver_id));
+
+            if (first) {
+                vehicleById.clear();
+                latestDispatchedTripByVehicle.clear();
+            }
+            page.items.forEach((v) => vehicleById.set(v.id, v));
+            trips.forEach(setTrip);
+            renderRows();
+        });
+
+        function vehicleFilters() {
+            const selectedType = String(filterDropdown?.value || "all").toLowerCase();
+            return { vehicle_type: selectedType === "all" ? undefined : selectedType };
+        }
+
+        async function load() {
+            const [nextDashboard] = await Promise.all([
+                FleetApi.getDashboard().catch(() => null),
+                pager.load(vehicleFilters()).catch(() => null),
+            ]);
+            dashboard = nextDashboard;
+        }
 
         // Update KPIs (order matches the existing HTML cards)
-        const kpiCards = document.querySelectorAll(".card .big-number");
-        if (dashboard && kpiCards.length >= 4) {
-            kpiCards[0].textContent = String(dashboard.active_vehicles ?? "-");
-            kpiCards[1].textContent = String(dashboard.in_shop ?? "-");
-            kpiCards[2].textContent = `${Math.round((dashboard.utilization_rate || 0) * 100)}%`;
-            kpiCards[3].textContent = String(dashboard.pending_trips ?? "-");
+        function renderKpis() {
+            const kpiCards = document.querySelectorAll(".card .big-number");
+            if (dashboard && kpiCards.length >= 4) {
+                kpiCards[0].textContent = String(dashboard.active_vehicles ?? "-");
+                kpiCards[1].textContent = String(dashboard.in_shop ?? "-");
+                kpiCards[2].textContent = `${Math.round((dashboard.utilization_rate || 0) * 100)}%`;
+                kpiCards[3].textContent = String(dashboard.pending_trips ?? "-");
+            }
+        }
+
+        function buildRows() {
+            return Array.from(vehicleById.values()).map((v) => {
+                const trip = latestDispatchedTripByVehicle.get(v.id);
+                const driver = trip ? driverById.get(trip.driver_id) : null;
+                const pill = statusToPill(v.status);
+                return {
+                    plate: v.license_plate,
+                    driver: driver?.name || "Unassigned",
+                    statusText: pill.text,
+                    statusClass: pill.className,
+                    destination: trip?.destination || "Depot",
+                    eta: "-",
+                };
+            });
         }
 
-        function renderRows(rows) {
+        function renderRows() {
             tableBody.innerHTML = "";
-            rows.forEach((row) => {
+            buildRows().forEach((row) => {
                 const tr = document.createElement("tr");
                 tr.innerHTML = `
                     <td><strong>${row.plate}</strong></td>
@@ -244,37 +442,65 @@
             });
         }
 
-        const latestDispatchedTripByVehicle = new Map();
-        trips
-            .filter((t) => t.status === "dispatched")
-            .sort((a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime())
-            .forEach((t) => {
-                if (!latestDispatchedTripByVehicle.has(t.vehicle_id)) latestDispatchedTripByVehicle.set(t.vehicle_id, t);
+        // Several events often arrive together (one trip moves a vehicle,
+        // a driver and the KPIs); draw once per animation frame.
+        let renderQueued = false;
+        function scheduleRender() {
+            if (renderQueued) return;
+            renderQueued = true;
+            requestAnimationFrame(() => {
+                renderQueued = false;
+                renderKpis();
+                renderRows();
             });
+        }
 
-        const rows = vehicles.map((v) => {
-            const trip = latestDispatchedTripByVehicle.get(v.id);
-            const driver = trip ? driverById.get(trip.driver_id) : null;
-            const pill = statusToPill(v.status);
-            return {
-                type: (v.vehicle_type || inferVehicleTypeFromPlate(v.license_plate)).toLowerCase(),
-                plate: v.license_plate,
-                driver: driver?.name || "Unassigned",
-                statusText: pill.text,
-                statusClass: pill.className,
-                destination: trip?.destination || "Depot",
-                eta: "-",
-            };
-        });
+        function endTrip(trip) {
+            if (latestDispatchedTripByVehicle.get(trip.vehicle_id)?.id === trip.id) {
+                latestDispatchedTripByVehicle.delete(trip.vehicle_id);
+                scheduleRender();
+            }
+        }
 
-        renderRows(rows);
+        await load();
+        renderKpis();
 
         if (filterDropdown) {
-            filterDropdown.addEventListener("change", (e) => {
-                const selectedType = String(e.target.value || "all").toLowerCase();
-                renderRows(selectedType === "all" ? rows : rows.filter((r) => r.type === selectedType));
-            });
+            filterDropdown.addEventListener("change", () => pager.load(vehicleFilters()));
         }
+
+        subscribeToChanges({
+            "trip.dispatched": async (trip) => {
+                if (!vehicleById.has(trip.vehicle_id)) return;
+                setTrip(trip);
+                await loadDrivers([trip.driver_id]);
+                scheduleRender();
+            },
+            "trip.completed": endTrip,
+            "trip.cancelled": endTrip,
+            "vehicle.status": (vehicle) => {
+                if (!vehicleById.has(vehicle.id)) return;
+                vehicleById.set(vehicle.id, { ...vehicleById.get(vehicle.id), ...vehicle });
+                scheduleRender();
+            },
+            "driver.status": (driver) => {
+                if (!driverById.has(driver.id)) return;
+                driverById.set(driver.id, { ...driverById.get(driver.id), ...driver });
+                scheduleRender();
+            },
+            kpi: ({ deltas }) => {
+                if (!dashboard) return;
+                Object.entries(deltas).forEach(([key, delta]) => {
+                    dashboard[key] = (dashboard[key] || 0) + delta;
+                });
+                dashboard.utilization_rate = dashboard.total_vehicles ? dashboard.active_vehicles / dashboard.total_vehicles : 0;
+                scheduleRender();
+            },
+            resync: async () => {
+                await load();
+                scheduleRender();
+            },
+        });
     }
 
     async function initRegistryPage() {
@@ -282,9 +508,7 @@
         const tableBody = document.getElementById("registry-data");
         if (!form || !tableBody) return;
 
-        async function refresh() {
-            const vehicles = await FleetApi.getVehicles();
-            tableBody.innerHTML = "";
+        function appendRows(vehicles) {
             vehicles.forEach((v) => {
                 const tr = document.createElement("tr");
                 const pill = statusToPill(v.status);
@@ -300,17 +524,26 @@
                     </td>
                 `;
                 tableBody.appendChild(tr);
-            });
 
-            tableBody.querySelectorAll("button[data-retire]").forEach((btn) => {
-                btn.addEventListener("click", async () => {
-                    const vehicleId = btn.getAttribute("data-retire");
-                    await FleetApi.retireVehicle(vehicleId);
-                    await refresh();
+                tr.querySelectorAll("button[data-retire]").forEach((btn) => {
+                    btn.addEventListener("click", async () => {
+                        const vehicleId = btn.getAttribute("data-retire");
+                        await FleetApi.retireVehicle(vehicleId);
+                        await refresh();
+                    });
                 });
             });
         }
 
+        const pager = createPager(tableBody.closest("table"), FleetApi.getVehiclePage, (page, first) => {
+            if (first) tableBody.innerHTML = "";
+            appendRows(page.items);
+        });
+
+        function refresh() {
+            return pager.load();
+        }
+
         form.addEventListener("submit", async (e) => {
             e.preventDefault();
             const model = document.getElementById("v-model")?.value?.trim();
@@ -345,9 +578,7 @@
             return String(value).slice(0, 10);
         }
 
-        async function refresh() {
-            const drivers = await FleetApi.getDrivers();
-            tableBody.innerHTML = "";
+        function appendRows(drivers) {
             const today = new Date();
 
             drivers.forEach((d) => {
@@ -368,22 +599,31 @@
                     </td>
                 `;
                 tableBody.appendChild(tr);
-            });
 
-            tableBody.querySelectorAll("button[data-toggle]").forEach((btn) => {
-                btn.addEventListener("click", async () => {
-                    const driverId = btn.getAttribute("data-toggle");
-                    const status = btn.getAttribute("data-status");
-                    if (status === "suspended") {
-                        await FleetApi.setDriverStatus(driverId, "available");
-                    } else {
-                        await FleetApi.suspendDriver(driverId);
-                    }
-                    await refresh();
+                tr.querySelectorAll("button[data-toggle]").forEach((btn) => {
+                    btn.addEventListener("click", async () => {
+                        const driverId = btn.getAttribute("data-toggle");
+                        const status = btn.getAttribute("data-status");
+                        if (status === "suspended") {
+                            await FleetApi.setDriverStatus(driverId, "available");
+                        } else {
+                            await FleetApi.suspendDriver(driverId);
+                        }
+                        await refresh();
+                    });
                 });
             });
         }
 
+        const pager = createPager(tableBody.closest("table"), FleetApi.getDriverPage, (page, first) => {
+            if (first) tableBody.innerHTML = "";
+            appendRows(page.items);
+        });
+
+        function refresh() {
+            return pager.load();
+        }
+
         form.addEventListener("submit", async (e) => {
             e.preventDefault();
             const name = document.getElementById("d-name")?.value?.trim();
@@ -412,41 +652,59 @@
         if (!form || !vehicleSelect || !driverSelect || !tableBody) return;
 
         const errorMsg = document.getElementById("error-msg");
-        const [vehicles, drivers] = await Promise.all([FleetApi.getAvailableVehicles(), FleetApi.getAvailableDrivers()]);
-        const vehicleById = new Map(vehicles.map((v) => [String(v.id), v]));
-        const driverById = new Map(drivers.map((d) => [String(d.id), d]));
-
-        vehicleSelect.innerHTML = '<option value="">-- Choose Available --</option>';
-        vehicles.forEach((v) => {
-            const opt = document.createElement("option");
-            opt.value = String(v.id);
-            opt.textContent = `${v.license_plate} - ${v.model} (Max: ${v.max_capacity}kg)`;
-            vehicleSelect.appendChild(opt);
-        });
 
-        driverSelect.innerHTML = '<option value="">-- Choose Driver --</option>';
-        drivers.forEach((d) => {
-            const opt = document.createElement("option");
-            opt.value = String(d.id);
-            opt.textContent = `${d.name} (Lic exp: ${String(d.license_expiry).slice(0, 10)})`;
-            driverSelect.appendChild(opt);
-        });
+        // Available vehicles/drivers feed the selects; the vehicles/drivers of
+        // the dispatched trips, and every one seen since, are kept for the
+        // plate and name columns of the trips table.
+        const vehicleById = new Map();
+        const driverById = new Map();
+        const availableVehicles = new Map();
+        const availableDrivers = new Map();
+        const dispatchedTrips = new Map();
+
+        async function load() {
+            const [vehicles, drivers, trips] = await Promise.all([
+                FleetApi.getAvailableVehicles(),
+                FleetApi.getAvailableDrivers(),
+                FleetApi.getTrips({ status: "dispatched", order: "desc" }),
+            ]);
+            const [tripVehicles, tripDrivers] = await Promise.all([
+                FleetApi.getVehiclesByIds(trips.map((t) => t.vehicle_id)).catch(() => []),
+                FleetApi.getDriversByIds(trips.map((t) => t.driver_id)).catch(() => []),
+            ]);
+
+            [vehicleById, driverById, availableVehicles, availableDrivers, dispatchedTrips].forEach((m) => m.clear());
+            [...tripVehicles, ...vehicles].forEach((v) => vehicleById.set(String(v.id), v));
+            [...tripDrivers, ...drivers].forEach((d) => driverById.set(String(d.id), d));
+            vehicles.forEach((v) => availableVehicles.set(String(v.id), v));
+            drivers.forEach((d) => availableDrivers.set(String(d.id), d));
+            trips.forEach((t) => dispatchedTrips.set(t.id, t));
+        }
 
-        async function refreshTrips() {
-            const trips = await FleetApi.getTrips();
-            const allVehicles = await FleetApi.getVehicles().catch(() => vehicles);
-            const allDrivers = await FleetApi.getDrivers().catch(() => drivers);
+        function renderSelect(select, placeholder, items, label) {
+            const selected = select.value;
+            select.innerHTML = `<option value="">${placeholder}</option>`;
+            items.forEach((item) => {
+                const opt = document.createElement("option");
+                opt.value = String(item.id);
+                opt.textContent = label(item);
+                select.appendChild(opt);
+            });
+            if (items.has(selected)) select.value = selected;
+        }
 
-            const vById = new Map(allVehicles.map((v) => [v.id, v]));
-            const dById = new Map(allDrivers.map((d) => [d.id, d]));
+        function renderSelects() {
+            renderSelect(vehicleSelect, "-- Choose Available --", availableVehicles, (v) => `${v.license_plate} - ${v.model} (Max: ${v.max_capacity}kg)`);
+            renderSelect(driverSelect, "-- Choose Driver --", availableDrivers, (d) => `${d.name} (Lic exp: ${String(d.license_expiry).slice(0, 10)})`);
+        }
 
+        function renderTrips() {
             tableBody.innerHTML = "";
-            trips
-                .filter((t) => t.status === "dispatched")
-                .sort((a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime())
+            Array.from(dispatchedTrips.values())
+                .sort((a, b) => b.id - a.id)
                 .forEach((t) => {
-                    const v = vById.get(t.vehicle_id);
-                    const d = dById.get(t.driver_id);
+                    const v = vehicleById.get(String(t.vehicle_id));
+                    const d = driverById.get(String(t.driver_id));
                     const tr = document.createElement("tr");
                     tr.innerHTML = `
                         <td><strong>${t.id}</strong></td>
@@ -460,6 +718,28 @@
                 });
         }
 
+        function setStatus(all, available, item, status) {
+            const key = String(item.id);
+            all.set(key, { ...all.get(key), ...item });
+            if (status === "available") available.set(key, all.get(key));
+            else available.delete(key);
+        }
+
+        let renderQueued = false;
+        function scheduleRender() {
+            if (renderQueued) return;
+            renderQueued = true;
+            requestAnimationFrame(() => {
+                renderQueued = false;
+                renderSelects();
+                renderTrips();
+            });
+        }
+
+        function endTrip(trip) {
+            if (dispatchedTrips.delete(trip.id)) scheduleRender();
+        }
+
         form.addEventListener("submit", async (e) => {
             e.preventDefault();
             if (errorMsg) errorMsg.style.display = "none";
@@ -468,12 +748,12 @@
             const driverId = driverSelect.value;
             const weight = Number(document.getElementById("trip-weight")?.value);
             const destination = document.getElementById("trip-dest")?.value?.trim();
-            const vehicle = vehicleById.get(vehicleId);
-            const driver = driverById.get(driverId);
+            const vehicle = availableVehicles.get(vehicleId);
+            const driver = availableDrivers.get(driverId);
             if (!vehicle || !driver) return;
 
             try {
-                await FleetApi.createTrip({
+                const trip = await FleetApi.createTrip({
                     vehicle_id: Number(vehicleId),
                     driver_id: Number(driverId),
                     cargo_weight: weight,
@@ -482,7 +762,12 @@
                     start_odometer: vehicle.odometer || 0,
                 });
                 form.reset();
-                await refreshTrips();
+                // The change feed reports the same trip; applying it here as
+                // well keeps the form usable when the feed is unavailable.
+                dispatchedTrips.set(trip.id, trip);
+                setStatus(vehicleById, availableVehicles, vehicle, "on_trip");
+                setStatus(driverById, availableDrivers, driver, "on_trip");
+                scheduleRender();
             } catch (err) {
                 if (errorMsg) {
                     errorMsg.style.display = "block";
@@ -491,7 +776,72 @@
             }
         });
 
-        await refreshTrips();
+        await load();
+        renderSelects();
+        renderTrips();
+
+        subscribeToChanges({
+            "trip.dispatched": (trip) => {
+                dispatchedTrips.set(trip.id, trip);
+                scheduleRender();
+            },
+            "trip.completed": endTrip,
+            "trip.cancelled": endTrip,
+            "vehicle.status": (vehicle) => {
+                setStatus(vehicleById, availableVehicles, vehicle, vehicle.status);
+                scheduleRender();
+            },
+            "driver.status": (driver) => {
+                setStatus(driverById, availableDrivers, driver, driver.status);
+                scheduleRender();
+            },
+            resync: async () => {
+                await load();
+                scheduleRender();
+            },
+        });
+    }
+
+    // Fills a vehicle <select> one page at a time: the trailing "More
+    // vehicles..." option loads the next page. Every vehicle listed is added
+    // to vehicleById.
+    async function fillVehicleSelect(select, label, vehicleById) {
+        const more = document.createElement("option");
+        more.value = "";
+        more.textContent = "More vehicles...";
+        let next = null;
+
+        async function loadPage(afterId) {
+            const page = await FleetApi.getVehiclePage({}, afterId);
+            more.remove();
+            page.items.forEach((v) => {
+                vehicleById.set(String(v.id), v);
+                const opt = document.createElement("option");
+                opt.value = String(v.id);
+                opt.textContent = label(v);
+                select.appendChild(opt);
+            });
+            next = page.next;
+            if (next) select.appendChild(more);
+        }
+
+        select.addEventListener("change", async () => {
+            if (select.selectedOptions[0] !== more) return;
+            const firstNew = select.options.length - 1;
+            await loadPage(next);
+            select.selectedIndex = firstNew;
+        });
+
+        select.innerHTML = "";
+        await loadPage(null);
+    }
+
+    // Plates for the rows of a log page, fetching the vehicles not seen yet.
+    async function loadVehicles(vehicleById, logs) {
+        const missing = logs.map((l) => l.vehicle_id).filter((id) => !vehicleById.has(String(id)));
+        if (!missing.length) return;
+        const vehicles = await FleetApi.getVehiclesByIds(missing).catch(() => []);
+        vehicles.forEach((v) => vehicleById.set(String(v.id), v));
     }
 
     async function initMaintenancePage() {
@@ -500,46 +850,42 @@
         const tableBody = document.getElementById("maintenance-data");
         if (!form || !vehicleSelect || !tableBody) return;
 
-        const vehicles = await FleetApi.getVehicles();
-        const vehicleById = new Map(vehicles.map((v) => [String(v.id), v]));
-
-        vehicleSelect.innerHTML = "";
-        vehicles.forEach((v) => {
-            const opt = document.createElement("option");
-            opt.value = String(v.id);
-            opt.textContent = `${v.license_plate} (${v.model})`;
-            vehicleSelect.appendChild(opt);
-        });
-
-        async function refresh() {
-            const logs = await FleetApi.getMaintenance();
-            const total = logs.reduce((sum, l) => sum + (Number(l.cost) || 0), 0);
-            const urgent = logs.filter((l) => {
-                const desc = String(l.description || "").toLowerCase();
-                return desc.includes("engine") || desc.includes("body");
-            }).length;
+        const vehicleById = new Map();
+        await fillVehicleSelect(vehicleSelect, (v) => `${v.license_plate} (${v.model})`, vehicleById);
 
+        // The totals are fleet-wide aggregates from the server, not sums of the rows shown.
+        async function refreshTotals() {
             const urgentEl = document.getElementById("urgent-count");
             const totalEl = document.getElementById("total-spend");
-            if (urgentEl) urgentEl.textContent = String(urgent);
-            if (totalEl) totalEl.textContent = "$" + total.toLocaleString();
+            const [costs, urgent] = await Promise.all([
+                FleetApi.getCosts().catch(() => null),
+                FleetApi.countMaintenance({ urgent: true }).catch(() => null),
+            ]);
+            if (urgentEl && urgent !== null) urgentEl.textContent = String(urgent);
+            if (totalEl && costs) totalEl.textContent = "$" + Number(costs.maintenance_cost).toLocaleString();
+        }
 
-            tableBody.innerHTML = "";
-            logs
-                .sort((a, b) => new Date(b.service_date).getTime() - new Date(a.service_date).getTime())
-                .forEach((l) => {
-                    const v = vehicleById.get(String(l.vehicle_id));
-                    const date = l.service_date ? new Date(l.service_date).toLocaleDateString() : "-";
-                    const tr = document.createElement("tr");
-                    tr.innerHTML = `
-                        <td>${date}</td>
-                        <td><strong>${v?.license_plate || l.vehicle_id}</strong></td>
-                        <td>${l.description}</td>
-                        <td>$${Number(l.cost).toFixed(2)}</td>
-                        <td><span class="status-pill status-inshop">In Shop</span></td>
-                    `;
-                    tableBody.appendChild(tr);
-                });
+        const pager = createPager(tableBody.closest("table"), FleetApi.getMaintenancePage, async (page, first) => {
+            await loadVehicles(vehicleById, page.items);
+            if (first) tableBody.innerHTML = "";
+
+            page.items.forEach((l) => {
+                const v = vehicleById.get(String(l.vehicle_id));
+                const date = l.service_date ? new Date(l.service_date).toLocaleDateString() : "-";
+                const tr = document.createElement("tr");
+                tr.innerHTML = `
+                    <td>${date}</td>
+                    <td><strong>${v?.license_plate || l.vehicle_id}</strong></td>
+                    <td>${l.description}</td>
+                    <td>$${Number(l.cost).toFixed(2)}</td>
+                    <td><span class="status-pill status-inshop">In Shop</span></td>
+                `;
+                tableBody.appendChild(tr);
+            });
+        });
+
+        async function refresh() {
+            await Promise.all([pager.load({ order: "desc" }), refreshTotals()]);
         }
 
         form.addEventListener("submit", async (e) => {
@@ -572,39 +918,36 @@
         const tableBody = document.getElementById("fuel-table-body");
         if (!form || !vehicleSelect || !tableBody) return;
 
-        const vehicles = await FleetApi.getVehicles();
-        const vehicleById = new Map(vehicles.map((v) => [String(v.id), v]));
+        const vehicleById = new Map();
+        await fillVehicleSelect(vehicleSelect, (v) => v.license_plate, vehicleById);
+
+        async function refreshTotal() {
+            const totalDisplay = document.getElementById("total-fuel-cost");
+            const costs = await FleetApi.getCosts().catch(() => null);
+            if (totalDisplay && costs) totalDisplay.textContent = "$" + Number(costs.fuel_cost).toLocaleString();
+        }
+
+        const pager = createPager(tableBody.closest("table"), FleetApi.getFuelPage, async (page, first) => {
+            await loadVehicles(vehicleById, page.items);
+            if (first) tableBody.innerHTML = "";
 
-        vehicleSelect.innerHTML = "";
-        vehicles.forEach((v) => {
-            const opt = document.createElement("option");
-            opt.value = String(v.id);
-            opt.textContent = v.license_plate;
-            vehicleSelect.appendChild(opt);
+            page.items.forEach((l) => {
+                const date = l.fuel_date ? new Date(l.fuel_date).toLocaleDateString() : "-";
+                const v = vehicleById.get(String(l.vehicle_id));
+                const tr = document.createElement("tr");
+                tr.innerHTML = `
+                    <td>${date}</td>
+                    <td><strong>${v?.license_plate || l.vehicle_id}</strong></td>
+                    <td>${l.liters} L</td>
+                    <td>$${l.total_cost}</td>
+                    <td>-</td>
+                `;
+                tableBody.appendChild(tr);
+            });
         });
 
         async function refresh() {
-            const logs = await FleetApi.getFuelLogs();
-            const total = logs.reduce((sum, l) => sum + (Number(l.total_cost) || 0), 0);
-            const totalDisplay = document.getElementById("total-fuel-cost");
-            if (totalDisplay) totalDisplay.textContent = "$" + total.toLocaleString();
-
-            tableBody.innerHTML = "";
-            logs
-                .sort((a, b) => (b.id || 0) - (a.id || 0))
-                .forEach((l) => {
-                    const date = new Date().toLocaleDateString();
-                    const v = vehicleById.get(String(l.vehicle_id));
-                    const tr = document.createElement("tr");
-                    tr.innerHTML = `
-                        <td>${date}</td>
-                        <td><strong>${v?.license_plate || l.vehicle_id}</strong></td>
-                        <td>${l.liters} L</td>
-                        <td>$${l.total_cost}</td>
-                        <td>-</td>
-                    `;
-                    tableBody.appendChild(tr);
-                });
+            await Promise.all([pager.load({ order: "desc" }), refreshTotal()]);
         }
 
         form.addEventListener("submit", async (e) => {
@@ -620,6 +963,16 @@
         await refresh();
     }
 
+    function analyticsFilters() {
+        const region = document.getElementById("analytics-region")?.value || undefined;
+        const days = Number(document.getElementById("analytics-window")?.value);
+        if (!days) return { region };
+
+        const from = new Date();
+        from.setDate(from.getDate() - days);
+        return { region, from: from.toISOString().slice(0, 10) };
+    }
+
     async function initAnalyticsPage() {
         const financeCanvas = document.getElementById("financeChart");
         const statusCanvas = document.getElementById("statusChart");
@@ -627,50 +980,78 @@
 
         const loader = document.getElementById("loading-spinner");
         const content = document.getElementById("analytics-content");
+        const regionSelect = document.getElementById("analytics-region");
+        const windowSelect = document.getElementById("analytics-window");
         if (loader) loader.style.display = "block";
         if (content) content.style.display = "none";
 
-        const vehicles = await FleetApi.getVehicles();
-        const counts = {
-            on_trip: vehicles.filter((v) => v.status === "on_trip").length,
-            in_shop: vehicles.filter((v) => v.status === "in_shop").length,
-            available: vehicles.filter((v) => v.status === "available").length,
-        };
+        const regions = await FleetApi.getRegions().catch(() => []);
 
-        const rois = await Promise.all(
-            vehicles.map((v) => FleetApi.getVehicleRoi(v.id).catch(() => ({ vehicle_id: v.id, total_revenue: 0, total_cost: 0, roi: 0 })))
-        );
-
-        if (loader) loader.style.display = "none";
-        if (content) content.style.display = "block";
-
-        const labels = vehicles.map((v) => v.license_plate);
-        const revenue = rois.map((r) => Number(r.total_revenue) || 0);
-        const costs = rois.map((r) => Number(r.total_cost) || 0);
-
-        new Chart(financeCanvas.getContext("2d"), {
-            type: "bar",
-            data: {
-                labels,
-                datasets: [
-                    { label: "Revenue", data: revenue, backgroundColor: "#27ae60" },
-                    { label: "Costs", data: costs, backgroundColor: "#e74c3c" },
-                ],
-            },
-        });
+        if (regionSelect) {
+            regions.map((r) => r.region).filter(Boolean).forEach((region) => {
+                const option = document.createElement("option");
+                option.value = region;
+                option.textContent = region;
+                regionSelect.appendChild(option);
+            });
+        }
 
-        new Chart(statusCanvas.getContext("2d"), {
-            type: "doughnut",
-            data: {
-                labels: ["Active", "In Shop", "Idle"],
-                datasets: [
-                    {
-                        data: [counts.on_trip, counts.in_shop, counts.available],
-                        backgroundColor: ["#27ae60", "#ff6b00", "#95a5a6"],
-                    },
-                ],
-            },
-        });
+        let financeChart = null;
+        let statusChart = null;
+
+        async function render() {
+            const filters = analyticsFilters();
+            const [dashboard, fleetRoi] = await Promise.all([
+                FleetApi.getDashboard({ region: filters.region }).catch(() => ({})),
+                FleetApi.getFleetRoi(filters).catch(() => []),
+            ]);
+
+            // Chart the top earners only; their plates are fetched by id.
+            const rois = fleetRoi
+                .sort((a, b) => (Number(b.total_revenue) || 0) - (Number(a.total_revenue) || 0))
+                .slice(0, CHART_VEHICLES);
+            const vehicles = await FleetApi.getVehiclesByIds(rois.map((r) => r.vehicle_id)).catch(() => []);
+            const plateById = new Map(vehicles.map((v) => [v.id, v.license_plate]));
+
+            if (loader) loader.style.display = "none";
+            if (content) content.style.display = "block";
+
+            const labels = rois.map((r) => plateById.get(r.vehicle_id) || String(r.vehicle_id));
+            const revenue = rois.map((r) => Number(r.total_revenue) || 0);
+            const costs = rois.map((r) => Number(r.total_cost) || 0);
+
+            if (financeChart) financeChart.destroy();
+            if (statusChart) statusChart.destroy();
+
+            financeChart = new Chart(financeCanvas.getContext("2d"), {
+                type: "bar",
+                data: {
+                    labels,
+                    datasets: [
+                        { label: "Revenue", data: revenue, backgroundColor: "#27ae60" },
+                        { label: "Costs", data: costs, backgroundColor: "#e74c3c" },
+                    ],
+                },
+            });
+
+            statusChart = new Chart(statusCanvas.getContext("2d"), {
+                type: "doughnut",
+                data: {
+                    labels: ["Active", "In Shop", "Idle"],
+                    datasets: [
+                        {
+                            data: [dashboard.active_vehicles || 0, dashboard.in_shop || 0, dashboard.available_vehicles || 0],
+                            backgroundColor: ["#27ae60", "#ff6b00", "#95a5a6"],
+                        },
+                    ],
+                },
+            });
+        }
+
+        regionSelect?.addEventListener("change", render);
+        windowSelect?.addEventListener("change", render);
+
+        await render();
     }
 
     document.addEventListener("DOMContentLoaded", async () => {